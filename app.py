@@ -1,10 +1,27 @@
 import os
+import csv
 import fastf1
+import hashlib
+import hmac
+import io
+import itertools
 import json
+import random
+import re
+import secrets
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import openai
 from dotenv import load_dotenv
-from flask import Flask, jsonify, request
+from flask import Flask, Response, request, g, has_app_context, has_request_context, send_file, stream_with_context
+from flask import jsonify as flask_jsonify
 import mysql.connector
+import mysql.connector.pooling
+import numpy as np
 import unicodedata
 
 load_dotenv(".env")
@@ -13,15 +30,1297 @@ openai.api_key = os.getenv("OPENAI_API_KEY")
 
 app = Flask(__name__)
 
+# Read-only routes run against DB_BACKEND: "mysql" (default) or "sqlite", an embedded
+# file built from the same schema with `python ingest.py --export-sqlite f1.sqlite`.
+# MySQL stays the store for the what-if tables, see get_mysql_connection().
+DB_BACKEND = os.getenv("DB_BACKEND", "mysql").lower()
+EMBEDDED_DB_PATH = os.getenv("EMBEDDED_DB_PATH", "f1.sqlite")
+DB_ERRORS = (mysql.connector.Error, sqlite3.Error)
+
 # Database connection function
 def get_db_connection():
-    return mysql.connector.connect(
-        host=os.getenv("DB_HOST"),
-        user=os.getenv("DB_USER"),
-        password=os.getenv("DB_PASSWORD"),
-        database=os.getenv("DB_NAME")       
+    # Batched requests reuse the connection opened by the batch handler
+    shared = g.get("shared_connection") if has_app_context() else None
+    if shared is not None:
+        return shared
+    if DB_BACKEND == "sqlite":
+        return ManagedConnection(EmbeddedConnection(EMBEDDED_DB_PATH))
+    return get_mysql_connection()
+
+# Pooled so prepared statements (see fetch_prepared) outlive a single request. Sessions
+# aren't reset on checkout, which would deallocate them; ManagedConnection.close()
+# rolls back and clears its session settings instead. DB_POOL_SIZE=0 disables pooling.
+DB_POOL_SIZE = min(int(os.getenv("DB_POOL_SIZE", 8)), 32)  # mysql.connector's maximum
+_mysql_pool = None
+_mysql_pool_lock = threading.Lock()
+
+# With the pool exhausted, up to DB_POOL_OVERFLOW unpooled connections are opened on
+# top of it; past that, requests get a 503 rather than piling sessions onto the server.
+DB_POOL_OVERFLOW = int(os.getenv("DB_POOL_OVERFLOW", 8))
+DB_BUSY_RETRY_AFTER = int(os.getenv("DB_BUSY_RETRY_AFTER", 1))
+_overflow_slots = threading.BoundedSemaphore(max(DB_POOL_OVERFLOW, 0))
+
+class DatabaseBusy(Exception):
+    """Every pooled and overflow MySQL connection is in use."""
+
+def mysql_config():
+    return {
+        "host": os.getenv("DB_HOST"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+        "database": os.getenv("DB_NAME")
+    }
+
+def get_mysql_connection():
+    global _mysql_pool
+    if DB_POOL_SIZE <= 0:
+        return ManagedConnection(mysql.connector.connect(**mysql_config()))
+
+    with _mysql_pool_lock:
+        if _mysql_pool is None:
+            _mysql_pool = mysql.connector.pooling.MySQLConnectionPool(
+                pool_name="f1", pool_size=DB_POOL_SIZE, pool_reset_session=False, **mysql_config()
+            )
+    try:
+        return ManagedConnection(_mysql_pool.get_connection(), pooled=True)
+    except mysql.connector.errors.PoolError:
+        pass
+    # every pooled connection is checked out; don't make the request wait for one
+    if not _overflow_slots.acquire(blocking=False):
+        metrics.incr("db.pool.busy")
+        raise DatabaseBusy()
+    metrics.incr("db.pool.overflow")
+    try:
+        return ManagedConnection(mysql.connector.connect(**mysql_config()), overflow=True)
+    except Exception:
+        _overflow_slots.release()
+        raise
+
+# Hot queries, run with ManagedConnection.fetch_prepared(): prepared once per pooled
+# MySQL connection and fetched as plain tuples, with no dict built per row.
+STATEMENTS = {}
+
+def statement(name, sql):
+    """Register `sql` as a prepared statement; returns `name` for fetch_prepared()."""
+    STATEMENTS[name] = sql
+    return name
+
+class QueryDeadlineExceeded(Exception):
+    """The request ran past its time budget (see ROUTE_DEADLINES_MS)."""
+
+MYSQL_QUERY_TIMEOUT = 3024  # ER_QUERY_TIMEOUT, raised when MAX_EXECUTION_TIME is hit
+SELECT_PREFIX = re.compile(r"^\s*SELECT\b", re.IGNORECASE)
+
+def server_session(raw):
+    """
+    Per-session state kept on a raw MySQL connection: prepared cursors by statement
+    name and the MAX_EXECUTION_TIME in effect. Reset when the pool reconnects,
+    since the new server session has neither.
+    """
+    session = raw.__dict__.get("_f1_session")
+    if session is None or session["id"] != raw.connection_id:
+        session = raw.__dict__["_f1_session"] = {"id": raw.connection_id, "statements": {}, "limit": 0}
+    return session
+
+class ManagedConnection:
+    """
+    Every connection get_db_connection / get_mysql_connection hands out.
+    Its cursors enforce the request's deadline (unless `enforce_deadline` is off),
+    and whatever a handler leaves open (e.g. after an exception) is closed when the
+    request ends, unless it's `request_scoped=False` and closed by its owner.
+    """
+    def __init__(self, connection, pooled=False, enforce_deadline=True, overflow=False, request_scoped=True):
+        self._connection = connection
+        self._pooled = pooled
+        self._overflow = overflow  # holds one of the DB_POOL_OVERFLOW slots until closed
+        self._enforce_deadline = enforce_deadline
+        self._session_limit = False
+        self.closed = False
+        if has_request_context():
+            if request_scoped:
+                request.environ.setdefault("f1.connections", []).append(self)
+            deadline = request_deadline()
+            if deadline is not None and enforce_deadline and isinstance(connection, EmbeddedConnection):
+                connection.set_deadline(deadline)
+
+    def cursor(self, *args, **kwargs):
+        use_hints = not isinstance(self._connection, EmbeddedConnection)
+        return DeadlineCursor(self._connection.cursor(*args, **kwargs), use_hints, self._enforce_deadline)
+
+    def fetch_prepared(self, name, params=()):
+        """
+        Run the statement registered as `name` and return its rows as tuples.
+        On MySQL the statement is prepared on first use and its cursor kept on the
+        underlying connection, so later calls through the pool skip the parse; the
+        deadline is applied with SET SESSION MAX_EXECUTION_TIME since a hint would
+        change the statement text. On SQLite it is a plain query: each request
+        opens its own connection, so there is nothing to reuse across requests.
+        A statement that fails (e.g. one prepared before the pool reconnected) is
+        prepared again and retried once.
+        """
+        sql = STATEMENTS[name]
+        remaining = remaining_seconds()
+        if remaining is not None and remaining <= 0:
+            raise QueryDeadlineExceeded()
+
+        if isinstance(self._connection, EmbeddedConnection):
+            cursor = self.cursor()
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+            cursor.close()
+            return rows
+
+        profile = current_profile()
+        entry = profile.start_query(sql, params, prepared=True) if profile is not None else None
+
+        raw = getattr(self._connection, "_cnx", self._connection)  # unwrap a pooled connection
+        if remaining is not None:
+            self._cap_session_limit(raw, max(1, int(remaining * 1000)))
+
+        for attempt in (1, 2):
+            statements = server_session(raw)["statements"]
+            cursor = statements.get(name)
+            if cursor is None:
+                cursor = statements[name] = raw.cursor(prepared=True)
+                metrics.incr("db.statements.prepared")
+            try:
+                cursor.execute(sql, params)
+                rows = cursor.fetchall()
+                break
+            except mysql.connector.Error as e:
+                statements.pop(name, None)
+                if e.errno != MYSQL_QUERY_TIMEOUT and attempt == 1:
+                    metrics.incr("db.statements.retried")
+                    continue
+                if entry is not None:
+                    profile.end_query(entry, error=e)
+                if e.errno == MYSQL_QUERY_TIMEOUT:
+                    raise QueryDeadlineExceeded() from e
+                raise
+        if entry is not None:
+            profile.end_query(entry, rows=len(rows))
+        metrics.incr("db.statements.executed")
+        metrics.incr("db.statements.rows", len(rows))
+        return rows
+
+    def _cap_session_limit(self, raw, ms):
+        """
+        Keep the session's MAX_EXECUTION_TIME within ~10% above `ms`. Each SET is a
+        round trip, so it's only sent when the limit in effect is unset, too tight,
+        or would let a statement overshoot the budget by more than that.
+        """
+        current = server_session(raw)["limit"]
+        if current and ms <= current <= ms + max(50, ms // 10):
+            return
+        self._set_session_limit(ms)
+
+    def _set_session_limit(self, ms):
+        cursor = self._connection.cursor()
+        cursor.execute("SET SESSION MAX_EXECUTION_TIME = %s", (ms,))
+        cursor.close()
+        self._session_limit = bool(ms)
+        server_session(getattr(self._connection, "_cnx", self._connection))["limit"] = ms
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            if self._pooled:
+                try:
+                    # the next checkout must not see this request's transaction or limits
+                    if self._connection.in_transaction:
+                        self._connection.rollback()
+                    if self._session_limit:
+                        self._set_session_limit(0)
+                except mysql.connector.Error:
+                    pass
+            try:
+                self._connection.close()
+            finally:
+                if self._overflow:
+                    _overflow_slots.release()
+
+class DeadlineCursor:
+    """
+    Refuses to start a query once the request's budget is spent and, on MySQL, caps
+    each SELECT at the remaining budget with a MAX_EXECUTION_TIME hint so the server
+    stops working on it too.
+    """
+    def __init__(self, cursor, use_hints, enforce=True):
+        self._cursor = cursor
+        self._use_hints = use_hints
+        self._enforce = enforce
+        self._profile = current_profile()
+        self._profiled = None  # timeline entry of the last statement, when profiling
+
+    def execute(self, sql, params=None):
+        remaining = remaining_seconds() if self._enforce else None
+        if remaining is not None:
+            if remaining <= 0:
+                raise QueryDeadlineExceeded()
+            if self._use_hints:
+                hint = f"SELECT /*+ MAX_EXECUTION_TIME({max(1, int(remaining * 1000))}) */"
+                sql = SELECT_PREFIX.sub(hint, sql, count=1)
+        if self._profile is not None:
+            self._profiled = self._profile.start_query(sql, params)
+        try:
+            result = self._cursor.execute(sql, params)
+        except mysql.connector.Error as e:
+            self._end_profiled(error=e)
+            if e.errno == MYSQL_QUERY_TIMEOUT:
+                raise QueryDeadlineExceeded() from e
+            raise
+        except sqlite3.OperationalError as e:
+            self._end_profiled(error=e)
+            if "interrupted" in str(e):
+                raise QueryDeadlineExceeded() from e
+            raise
+        self._end_profiled()
+        return result
+
+    # Unbuffered results arrive while fetching, so a profiled statement's time runs to its fetch
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._end_profiled(rows=len(rows))
+        return rows
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        self._end_profiled()
+        return row
+
+    def _end_profiled(self, **outcome):
+        if self._profiled is not None:
+            self._profile.end_query(self._profiled, **outcome)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+def _sqlite_regexp(pattern, value):
+    # SQLite evaluates `value REGEXP pattern` as regexp(pattern, value)
+    return value is not None and re.search(pattern, str(value)) is not None
+
+def _sqlite_concat(*parts):
+    # MySQL's CONCAT is NULL as soon as one argument is
+    if any(part is None for part in parts):
+        return None
+    return "".join(str(part) for part in parts)
+
+def _sqlite_dict_row(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+class EmbeddedConnection:
+    """
+    A read-only sqlite3 connection behind the slice of the mysql.connector API the
+    routes use: cursor(dictionary=True), %s placeholders, REGEXP and CONCAT.
+    """
+    def __init__(self, path):
+        self._connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self._connection.create_function("REGEXP", 2, _sqlite_regexp, deterministic=True)
+        self._connection.create_function("CONCAT", -1, _sqlite_concat, deterministic=True)
+
+    def cursor(self, dictionary=False, **kwargs):
+        cursor = self._connection.cursor()
+        if dictionary:
+            cursor.row_factory = _sqlite_dict_row
+        return EmbeddedCursor(cursor)
+
+    def set_deadline(self, deadline):
+        # SQLite has no server to cancel; a non-zero return interrupts the running statement
+        self._connection.set_progress_handler(lambda: time.monotonic() >= deadline, 10000)
+
+    def commit(self):
+        self._connection.commit()
+
+    def close(self):
+        self._connection.close()
+
+class EmbeddedCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, sql, params=()):
+        self._cursor.execute(sql.replace("%s", "?"), tuple(params or ()))
+
+    def __getattr__(self, name):
+        # fetchone / fetchall / fetchmany / close / description / rowcount
+        return getattr(self._cursor, name)
+
+class SharedConnection:
+    """
+    Wraps a connection that several handlers use in turn.
+    close() is a no-op so a handler can't close it under the others.
+    """
+    def __init__(self, connection):
+        self._connection = connection
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def close(self):
+        pass
+
+# Sparse fieldsets: /api/f1/...?fields=driverId,points
+def requested_fields():
+    """The set of field names asked for with `fields=`, or None for everything."""
+    if not has_request_context() or not request.path.startswith('/api/f1/'):
+        return None
+    fields = {f.strip() for f in request.args.get('fields', '').split(',') if f.strip()}
+    return fields or None
+
+def wanted(fields, *names):
+    """True if no fieldset was requested or any of `names` is part of it."""
+    return fields is None or any(name in fields for name in names)
+
+def prune_fields(value, fields):
+    """
+    Keep only the keys named in `fields`, plus the containers leading to them.
+    A requested key keeps its whole value, e.g. fields=Driver keeps every Driver attribute.
+    """
+    if isinstance(value, dict):
+        pruned = {}
+        for key, item in value.items():
+            if key in fields:
+                pruned[key] = item
+            elif isinstance(item, (dict, list)):
+                item = prune_fields(item, fields)
+                if item:
+                    pruned[key] = item
+        return pruned
+
+    if isinstance(value, list):
+        pruned = (prune_fields(item, fields) for item in value if isinstance(item, (dict, list)))
+        return [item for item in pruned if item]
+
+    return value
+
+def jsonify(*args, **kwargs):
+    """flask.jsonify, trimmed to the requested sparse fieldset (error bodies are left alone)."""
+    fields = requested_fields()
+    if fields and len(args) == 1 and not kwargs and isinstance(args[0], (dict, list)):
+        body = args[0]
+        if not (isinstance(body, dict) and "error" in body):
+            args = (prune_fields(body, fields),)
+    return flask_jsonify(*args, **kwargs)
+
+def object_bytes(value, _seen=None):
+    """
+    Memory held by `value`: NumPy arrays by their buffer, containers by their own
+    size plus their contents (each object counted once).
+    """
+    seen = _seen if _seen is not None else set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    size = sys.getsizeof(value)
+    if isinstance(value, np.ndarray):
+        # getsizeof misses the buffer of views; count the data itself
+        return size + (value.nbytes if value.base is not None else 0)
+    if isinstance(value, dict):
+        size += sum(object_bytes(k, seen) + object_bytes(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(object_bytes(item, seen) for item in value)
+    return size
+
+class ByteBudgetLRU:
+    """
+    Thread-safe LRU bounded by the measured size of its values (see object_bytes),
+    and optionally by entry count. Reports cache.<name>.hits/misses/evictions and
+    the bytes/entries gauges through `metrics`.
+    """
+    def __init__(self, name, max_bytes, max_entries=None):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key => (value, size, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] < time.monotonic():
+                self._drop(key)
+                entry = None
+            if entry is None:
+                metrics.incr(f"cache.{self.name}.misses")
+                return None
+            self._entries.move_to_end(key)
+        metrics.incr(f"cache.{self.name}.hits")
+        return entry[0]
+
+    def set(self, key, value, ttl=None):
+        size = object_bytes(value)
+        if size > self.max_bytes:
+            metrics.incr(f"cache.{self.name}.too_large")
+            return
+        expires_at = time.monotonic() + ttl if ttl is not None else float("inf")
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, size, expires_at)
+            self._bytes += size
+            while self._bytes > self.max_bytes or (self.max_entries and len(self._entries) > self.max_entries):
+                self._drop(next(iter(self._entries)))
+                metrics.incr(f"cache.{self.name}.evictions")
+            self._report()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._report()
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+        self._report()
+
+    def _report(self):
+        metrics.set(f"cache.{self.name}.bytes", self._bytes)
+        metrics.set(f"cache.{self.name}.entries", len(self._entries))
+
+# Response cache for the /api/f1 GET routes, keyed by (route, args, data_version).
+# Bumping the data version is the one global invalidation: every older entry stops matching.
+class LRUCacheBackend:
+    """In-process LRU under a byte budget. Each worker keeps its own entries and its own data version."""
+    shared = False
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_entries=None):
+        self._entries = ByteBudgetLRU("response", max_bytes, max_entries)
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self._entries.get(key)
+
+    def set(self, key, value, ttl):
+        self._entries.set(key, value, ttl)
+
+    def get_version(self):
+        return self._version
+
+    def bump_version(self):
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+            return self._version
+
+    def claim(self, name, ttl):
+        # entries are per worker, so every worker does its own work
+        return True
+
+class RedisCacheBackend:
+    """
+    Any Redis-protocol server, shared by every worker so one bump invalidates them all.
+    Pass `client` to use a stand-in (anything with get/set/incr) instead of redis-py.
+    """
+    shared = True
+
+    def __init__(self, url=None, client=None, prefix="f1:"):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self._client = client
+        self._prefix = prefix
+
+    def get(self, key):
+        return self._client.get(self._prefix + key)
+
+    def set(self, key, value, ttl):
+        self._client.set(self._prefix + key, value, ex=ttl)
+
+    def get_version(self):
+        return int(self._client.get(self._prefix + "data_version") or 0)
+
+    def bump_version(self):
+        return int(self._client.incr(self._prefix + "data_version"))
+
+    def claim(self, name, ttl):
+        """True for the first worker to claim `name` within `ttl` seconds, across all workers."""
+        return bool(self._client.set(self._prefix + "claim:" + name, os.getpid(), nx=True, ex=ttl))
+
+    def get_counter(self, name):
+        """
+        Current value of counter `name`. One that doesn't exist (new, or evicted) starts
+        at the clock in ns, so it never comes back to a value already used in a key.
+        """
+        key = self._prefix + "counter:" + name
+        value = self._client.get(key)
+        if value is None:
+            self._client.set(key, time.time_ns(), nx=True)
+            value = self._client.get(key)
+        return int(value)
+
+    def incr_counter(self, name):
+        self.get_counter(name)
+        return int(self._client.incr(self._prefix + "counter:" + name))
+
+def make_cache_backend():
+    backend = os.getenv("CACHE_BACKEND", "none").lower()
+    if backend == "lru":
+        return LRUCacheBackend(
+            int(os.getenv("CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+            int(os.getenv("CACHE_MAX_ENTRIES", 0)) or None
+        )
+    if backend == "redis":
+        return RedisCacheBackend(os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0"))
+    return None
+
+response_cache = make_cache_backend()
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", 3600))
+
+DATA_VERSION_POLL_SECONDS = float(os.getenv("DATA_VERSION_POLL_SECONDS", 5))
+_loaded_version = {"value": 0, "checked_at": float("-inf")}
+
+def loaded_data_version():
+    """
+    The version ingest.py bumps in the data_version table after every load.
+    Re-read at most every DATA_VERSION_POLL_SECONDS, so workers that can't see
+    each other's cache still stop serving pre-load responses.
+    """
+    now = time.monotonic()
+    if now - _loaded_version["checked_at"] >= DATA_VERSION_POLL_SECONDS:
+        first_check = _loaded_version["checked_at"] == float("-inf")
+        _loaded_version["checked_at"] = now
+        try:
+            connection = get_db_connection()
+            cursor = connection.cursor()
+            cursor.execute("SELECT version FROM data_version WHERE id = 1")
+            row = cursor.fetchone()
+            cursor.close()
+            connection.close()
+            version = row[0] if row else 0
+            changed = version != _loaded_version["value"] and not first_check
+            _loaded_version["value"] = version
+            if changed:
+                # a load just landed: refill with the new data, under the new version's keys
+                start_search_index_build()
+                start_cache_warming()
+        except DB_ERRORS:
+            pass  # no data_version table yet, i.e. nothing ingested
+    return _loaded_version["value"]
+
+def data_version():
+    """The current data version: last ingest + cache-side bumps."""
+    if response_cache is None:
+        return "0"
+    return f"{loaded_data_version()}.{response_cache.get_version()}"
+
+def invalidate_response_cache():
+    """
+    Call whenever race data is reloaded. What-if edits don't need it: cached
+    what-if responses are keyed by their scenario chain's edit counters instead.
+    """
+    if response_cache is not None:
+        return response_cache.bump_version()
+    return 0
+
+def response_cache_key():
+    if (response_cache is None or request.method != 'GET'
+            or not request.path.startswith('/api/f1/')
+            or request.headers.get('Cache-Control') == 'no-cache'
+            or current_profile() is not None):
+        return None
+    if request.endpoint in COLUMNAR_ROUTES and negotiate_columnar_format() != "json":
+        return None  # only JSON bodies are cached
+    suffix = ""
+    scenario_id = (request.view_args or {}).get("scenario_id")
+    if scenario_id is not None:
+        # An edit changes the key on every worker, and only for scenarios whose chain it touches
+        revisions = whatif_cache_version(scenario_id)
+        if revisions is None:
+            return None
+        suffix = f"#{revisions}"
+    return response_cache_key_for(request.path, request.args.items(multi=True), suffix)
+
+def response_cache_key_for(path, arg_items, suffix=""):
+    """Cache key of a GET of `path` with these (name, value) args; also used by asgi.py."""
+    args = "&".join(f"{k}={v}" for k, v in sorted(arg_items))
+    raw = f"{path}?{args}@{data_version()}{suffix}"
+    return "resp:" + hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+def whatif_cache_version(scenario_id):
+    """
+    "id:counter,..." along the scenario's chain (see bump_scenario_revision), or None
+    to leave the response uncached. Counters and the chain are read from the cache
+    backend, so a hit needs no database round trip. A per-worker backend can't see
+    edits made on other workers, so what-if responses are only cached on a shared one.
+    """
+    if not response_cache.shared:
+        return None
+    chain = cached_scenario_chain(scenario_id)
+    if chain is None:
+        return None
+    return ",".join(f"{s_id}:{response_cache.get_counter(f'whatif:{s_id}')}" for s_id in chain)
+
+_warm_on_start = {"pending": True}
+
+# Registered first: a worker whose first request is a cache hit or gets shed
+# by admission control must still start warming
+@app.before_request
+def warm_cache_on_start():
+    # First request a worker sees; importing app.py (e.g. from ingest.py) mustn't start it
+    if _warm_on_start["pending"]:
+        _warm_on_start["pending"] = False
+        start_search_index_build()
+        start_cache_warming()
+
+@app.before_request
+def serve_cached_response():
+    key = response_cache_key()
+    if key is None:
+        return None
+    body = response_cache.get(key)
+    if body is not None:
+        response = app.response_class(body, mimetype="application/json")
+        response.headers["X-Cache"] = "HIT"
+        return response
+    request.environ["f1.cache_key"] = key
+    return None
+
+@app.after_request
+def store_cached_response(response):
+    key = request.environ.pop("f1.cache_key", None)
+    if (key and response.status_code == 200 and response.mimetype == "application/json"
+            and not response.is_streamed):
+        response_cache.set(key, response.get_data(), CACHE_TTL_SECONDS)
+        response.headers["X-Cache"] = "MISS"
+    return response
+
+class Metrics:
+    """Process-local counters and gauges, served at /api/metrics.json."""
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self._values[name] = self._values.get(name, 0) + amount
+
+    def set(self, name, value):
+        with self._lock:
+            self._values[name] = value
+
+    def snapshot(self):
+        with self._lock:
+            return dict(sorted(self._values.items()))
+
+metrics = Metrics()
+
+# Admission control: every endpoint belongs to a cost class with its own concurrency
+# limit and bounded queue, so a burst of expensive requests can't starve cheap ones.
+# The limits are per process: N worker processes admit up to N times each limit.
+# They only take effect with threaded workers (gunicorn --threads/gthread, or the
+# ASGI server); a sync worker runs one request at a time and never reaches them.
+# A queued request holds its worker thread while it waits, so size the queues
+# against the thread count as well as against the load.
+class AdmissionGate:
+    """At most `limit` requests run at once; up to `queue` more wait up to `timeout` seconds."""
+    def __init__(self, name, limit, queue, timeout, retry_after):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.active = 0
+        self.waiting = 0
+        self._cond = threading.Condition()
+
+    def _report(self):
+        metrics.set(f"admission.{self.name}.active", self.active)
+        metrics.set(f"admission.{self.name}.queued", self.waiting)
+
+    def acquire(self):
+        with self._cond:
+            if self.active < self.limit:
+                return self._admit()
+            if self.waiting >= self.queue:
+                return self._reject()
+
+            self.waiting += 1
+            self._report()
+            deadline = time.monotonic() + self.timeout
+            try:
+                while self.active >= self.limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return self._reject()
+                    self._cond.wait(remaining)
+                return self._admit()
+            finally:
+                self.waiting -= 1
+                self._report()
+
+    def _admit(self):
+        self.active += 1
+        metrics.incr(f"admission.{self.name}.admitted")
+        self._report()
+        return True
+
+    def _reject(self):
+        metrics.incr(f"admission.{self.name}.rejected")
+        return False
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self._report()
+            self._cond.notify()
+
+def make_admission_gate(name, limit, queue, timeout, retry_after):
+    prefix = f"ADMISSION_{name.upper()}_"
+    return AdmissionGate(
+        name,
+        int(os.getenv(prefix + "CONCURRENCY", limit)),
+        int(os.getenv(prefix + "QUEUE", queue)),
+        float(os.getenv(prefix + "QUEUE_TIMEOUT", timeout)),
+        int(os.getenv(prefix + "RETRY_AFTER", retry_after))
+    )
+
+ADMISSION_GATES = {
+    "cheap":     make_admission_gate("cheap",     32, 64, 2.0, 1),
+    "standard":  make_admission_gate("standard",  16, 32, 5.0, 2),
+    "expensive": make_admission_gate("expensive",  4,  8, 10.0, 15),
+}
+
+# Endpoints not listed here are "standard"
+ROUTE_COST_CLASSES = {
+    "get_seasons":                       "cheap",
+    "get_season_races":                  "cheap",
+    "get_constructors":                  "cheap",
+    "get_drivers":                       "cheap",
+    "get_all_drivers":                   "cheap",
+    "get_all_constructors":              "cheap",
+    "search_names":                      "cheap",
+    "list_profiles":                     "cheap",
+    "get_profile":                       "cheap",
+    "multi_year_driver_comparison":      "expensive",
+    "multi_year_constructor_comparison": "expensive",
+    "ai_insights":                       "expensive",
+    "race_insights":                     "expensive",
+    "batch_requests":                    "expensive",
+    "export_table":                      "expensive",
+    "rescore_seasons":                   "expensive",
+    "simulate_scenario_championship":    "expensive",
+}
+
+# Never queued or shed
+ADMISSION_EXEMPT = {"get_metrics", "static"}
+
+@app.before_request
+def admit_request():
+    # Sub-requests of a batch already run under the batch's slot. Cache warm-up is
+    # already bounded by CACHE_WARM_WORKERS and must not be shed like client traffic.
+    if (request.endpoint in ADMISSION_EXEMPT or g.get("admission_held")
+            or request.environ.get("f1.cache_warm")):
+        return None
+
+    gate = ADMISSION_GATES[ROUTE_COST_CLASSES.get(request.endpoint, "standard")]
+    if not gate.acquire():
+        response = jsonify({"error": f"Server busy with {gate.name} requests, retry later"})
+        response.status_code = 503
+        response.headers["Retry-After"] = str(gate.retry_after)
+        return response
+
+    g.admission_held = True
+    request.environ["f1.admission_gate"] = gate
+    return None
+
+@app.teardown_request
+def release_admission(exc):
+    gate = request.environ.pop("f1.admission_gate", None)
+    if gate is not None:
+        g.pop("admission_held", None)
+        gate.release()
+
+# Per-route time budgets. Queries get the remaining budget as a MAX_EXECUTION_TIME hint
+# and no new query starts once it's spent, so the handler ends with a 504.
+DEADLINES_MS = {
+    "cheap":     int(os.getenv("DEADLINE_CHEAP_MS", 2000)),
+    "standard":  int(os.getenv("DEADLINE_STANDARD_MS", 10000)),
+    "expensive": int(os.getenv("DEADLINE_EXPENSIVE_MS", 30000)),
+}
+
+# Endpoint-specific budgets, on top of the cost class defaults.
+# DEADLINE_OVERRIDES_MS="multi_year_driver_comparison=20000,get_laptimes_for_round=5000"
+ROUTE_DEADLINES_MS = {
+    "ai_insights":   60000,
+    "race_insights": 60000,
+    "export_table":  int(os.getenv("EXPORT_DEADLINE_MS", 600000)),
+}
+for _override in filter(None, os.getenv("DEADLINE_OVERRIDES_MS", "").split(',')):
+    _endpoint, _ms = _override.split('=')
+    ROUTE_DEADLINES_MS[_endpoint.strip()] = int(_ms)
+
+def route_budget_ms(endpoint):
+    return ROUTE_DEADLINES_MS.get(endpoint, DEADLINES_MS[ROUTE_COST_CLASSES.get(endpoint, "standard")])
+
+def request_deadline():
+    """time.monotonic() value the current request must finish by, or None."""
+    return request.environ.get("f1.deadline") if has_request_context() else None
+
+def remaining_seconds():
+    deadline = request_deadline()
+    return None if deadline is None else deadline - time.monotonic()
+
+def check_deadline():
+    """For long loops between queries: stop once the request's budget is spent."""
+    remaining = remaining_seconds()
+    if remaining is not None and remaining <= 0:
+        raise QueryDeadlineExceeded()
+
+@app.before_request
+def start_deadline():
+    if request.endpoint in ADMISSION_EXEMPT:
+        return None
+    budget_ms = route_budget_ms(request.endpoint)
+    request.environ["f1.budget_ms"] = budget_ms
+    deadline = time.monotonic() + budget_ms / 1000
+    # Sub-requests of a batch can't outlive the batch
+    parent = request.environ.get("f1.parent_deadline")
+    request.environ["f1.deadline"] = deadline if parent is None else min(deadline, parent)
+    return None
+
+@app.errorhandler(DatabaseBusy)
+def database_busy(e):
+    response = jsonify({"error": "Database busy, retry later"})
+    response.status_code = 503
+    response.headers["Retry-After"] = str(DB_BUSY_RETRY_AFTER)
+    return response
+
+@app.errorhandler(QueryDeadlineExceeded)
+def deadline_exceeded(e):
+    budget_ms = request.environ.get("f1.budget_ms")
+    return jsonify({"error": f"Request exceeded its time budget of {budget_ms} ms and was cancelled"}), 504
+
+@app.teardown_request
+def close_leftover_connections(exc):
+    for connection in request.environ.pop("f1.connections", []):
+        connection.close()
+
+class RequestLogMiddleware:
+    """
+    Appends one JSON line per request (route, params, status, timing) to `path`,
+    the input for `python loadtest.py replay`. Enabled with REQUEST_LOG_PATH.
+    """
+    def __init__(self, wsgi_app, path):
+        self.wsgi_app = wsgi_app
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        started_at = time.time()
+        started = time.perf_counter()
+        status = {}
+
+        def logging_start_response(status_line, headers, exc_info=None):
+            status["code"] = int(status_line.split(" ", 1)[0])
+            return start_response(status_line, headers, exc_info)
+
+        body = self.wsgi_app(environ, logging_start_response)
+        try:
+            yield from body
+        finally:
+            if hasattr(body, "close"):
+                body.close()
+            self._write(environ, started_at, time.perf_counter() - started, status.get("code"))
+
+    def _write(self, environ, started_at, duration, status):
+        try:
+            rule, _ = app.url_map.bind_to_environ(environ).match(return_rule=True)
+            route = rule.rule
+        except Exception:
+            route = None  # 404 / 405
+        self.write_entry(
+            environ.get("REQUEST_METHOD"), environ.get("PATH_INFO"), environ.get("QUERY_STRING", ""),
+            route, started_at, duration, status
+        )
+
+    def write_entry(self, method, path, query, route, started_at, duration, status):
+        """Append one log line; asgi.py calls this for the routes it serves itself."""
+        line = json.dumps({
+            "ts": round(started_at, 6),
+            "method": method,
+            "path": path,
+            "query": query,
+            "route": route,
+            "status": status,
+            "duration_ms": round(duration * 1000, 3)
+        })
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+request_log = None
+if os.getenv("REQUEST_LOG_PATH"):
+    request_log = RequestLogMiddleware(app.wsgi_app, os.getenv("REQUEST_LOG_PATH"))
+    app.wsgi_app = request_log
+
+# On-demand profiling. A request is profiled when it carries X-F1-Profile: <PROFILE_TOKEN>,
+# or at random with probability PROFILE_SAMPLE_RATE. A sampler thread records the stacks
+# of the request's thread every PROFILE_INTERVAL_MS, its cursors log each statement, and
+# the result is written to PROFILE_DIR for /api/profiles. With neither setting, the
+# middleware isn't installed at all.
+def check_profile_settings(token, sample_rate):
+    """
+    PROFILE_SAMPLE_RATE, refused at startup without PROFILE_TOKEN: /api/profiles
+    would be closed, so samples would only cost time and disk.
+    """
+    if not 0 <= sample_rate <= 1:
+        raise ValueError(f"PROFILE_SAMPLE_RATE: {sample_rate} is not between 0 and 1")
+    if sample_rate and not token:
+        raise ValueError("PROFILE_SAMPLE_RATE needs PROFILE_TOKEN, which /api/profiles is read with")
+    return sample_rate
+
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+PROFILE_SAMPLE_RATE = check_profile_settings(PROFILE_TOKEN, float(os.getenv("PROFILE_SAMPLE_RATE", 0)))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", 5))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", 200))
+# PROFILE_DIR is pruned every this many saves, so it holds up to PROFILE_KEEP + PROFILE_PRUNE_EVERY
+PROFILE_PRUNE_EVERY = max(1, PROFILE_KEEP // 10)
+_profiles_saved = itertools.count(1)
+PROFILE_SQL_CHARS = 500
+PROFILE_ID = re.compile(r"^\d+-[0-9a-f]+$")
+
+def current_profile():
+    """The RequestProfile of the request being handled, or None."""
+    return request.environ.get("f1.profile") if has_request_context() else None
+
+def folded_frame(frame):
+    """Root-first 'func (file:line);...' stack, the folded format flamegraph tools read."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+class RequestProfile:
+    """Stack samples of one request's thread plus its SQL timeline."""
+    def __init__(self, environ, trigger):
+        self.id = f"{time.time_ns() // 1_000_000}-{secrets.token_hex(4)}"
+        self.trigger = trigger
+        self.method = environ.get("REQUEST_METHOD")
+        self.path = environ.get("PATH_INFO")
+        self.query = environ.get("QUERY_STRING", "")
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.duration = None
+        self.thread_id = threading.get_ident()
+        self.stacks = Counter()
+        self.samples = 0
+        self.queries = []
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name=f"profile-{self.id}", daemon=True)
+
+    def start(self):
+        self._sampler.start()
+
+    def stop(self):
+        self.duration = time.perf_counter() - self.started
+        self._stop.set()
+        self._sampler.join()
+
+    def _sample(self):
+        interval = PROFILE_INTERVAL_MS / 1000
+        while not self._stop.wait(interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[folded_frame(frame)] += 1
+                self.samples += 1
+
+    def start_query(self, sql, params, prepared=False):
+        entry = {
+            "startMs": round((time.perf_counter() - self.started) * 1000, 3),
+            "durationMs": None,
+            "sql": " ".join(sql.split())[:PROFILE_SQL_CHARS],
+            "params": [str(p) for p in params] if params else [],
+            "prepared": prepared
+        }
+        self.queries.append(entry)
+        return entry
+
+    def end_query(self, entry, rows=None, error=None):
+        entry["durationMs"] = round((time.perf_counter() - self.started) * 1000 - entry["startMs"], 3)
+        if rows is not None:
+            entry["rows"] = rows
+        if error is not None:
+            entry["error"] = str(error)
+
+    def to_dict(self, status):
+        return {
+            "id": self.id,
+            "trigger": self.trigger,
+            "method": self.method,
+            "path": self.path,
+            "query": self.query,
+            "status": status,
+            "startedAt": round(self.started_at, 6),
+            "durationMs": round(self.duration * 1000, 3),
+            "intervalMs": PROFILE_INTERVAL_MS,
+            "samples": self.samples,
+            "sqlMs": round(sum(q["durationMs"] or 0 for q in self.queries), 3),
+            "stacks": [{"stack": stack, "samples": n} for stack, n in self.stacks.most_common()],
+            "sql": self.queries
+        }
+
+def save_profile(profile, status):
+    """Write the profile to PROFILE_DIR, pruning it every PROFILE_PRUNE_EVERY saves."""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"{profile.id}.json")
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(profile.to_dict(status), f)
+    os.replace(path + ".tmp", path)
+
+    if next(_profiles_saved) % PROFILE_PRUNE_EVERY == 0:
+        prune_profiles()
+    metrics.incr(f"profile.{profile.trigger}")
+
+def prune_profiles():
+    """Delete all but the newest PROFILE_KEEP profiles; ids start with the time in ms."""
+    saved = sorted(name for name in os.listdir(PROFILE_DIR) if name.endswith(".json"))
+    for name in saved[:len(saved) - PROFILE_KEEP]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, name))
+        except OSError:
+            pass  # another worker pruned it first
+
+def profile_token_valid(token):
+    return bool(PROFILE_TOKEN and token) and hmac.compare_digest(token.encode(), PROFILE_TOKEN.encode())
+
+def profile_sampled():
+    return bool(PROFILE_SAMPLE_RATE) and random.random() < PROFILE_SAMPLE_RATE
+
+# asgi.py hands the requests it sampled to this app with X-F1-Profile-Sampled set to
+# this per-process key, so they're profiled without being drawn a second time
+PROFILE_FORWARD_KEY = secrets.token_hex(16)
+
+def profile_forwarded(environ):
+    marker = environ.get("HTTP_X_F1_PROFILE_SAMPLED")
+    return marker is not None and hmac.compare_digest(marker.encode(), PROFILE_FORWARD_KEY.encode())
+
+class ProfilingMiddleware:
+    """Profiles the requests chosen by PROFILE_TOKEN / PROFILE_SAMPLE_RATE; passes the rest straight through."""
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        if environ.get("PATH_INFO", "").startswith("/api/profiles"):
+            return self.wsgi_app(environ, start_response)
+        if profile_token_valid(environ.get("HTTP_X_F1_PROFILE")):
+            return self._profiled(environ, start_response, "requested")
+        if profile_forwarded(environ) or profile_sampled():
+            return self._profiled(environ, start_response, "sampled")
+        return self.wsgi_app(environ, start_response)
+
+    def _profiled(self, environ, start_response, trigger):
+        profile = RequestProfile(environ, trigger)
+        environ["f1.profile"] = profile
+        status = {}
+
+        def profiling_start_response(status_line, headers, exc_info=None):
+            status["code"] = int(status_line.split(" ", 1)[0])
+            return start_response(status_line, [*headers, ("X-F1-Profile-Id", profile.id)], exc_info)
+
+        profile.start()
+        body = None
+        try:
+            # streamed bodies (exports) are generated while being iterated, so profile that too
+            body = self.wsgi_app(environ, profiling_start_response)
+            yield from body
+        finally:
+            if hasattr(body, "close"):
+                body.close()
+            profile.stop()
+            save_profile(profile, status.get("code"))
+
+if PROFILE_TOKEN or PROFILE_SAMPLE_RATE:
+    app.wsgi_app = ProfilingMiddleware(app.wsgi_app)
+
+# 🔹 Standings engine: every round's table for a season from results + sprintresults.
+# What-if scenarios, title odds and rescoring use it; real seasons are served from the
+# published standings tables instead (see official_standings).
+
+SEASON_FINISHES_SQL = """
+    SELECT r.round, r.raceId, res.driverId, res.constructorId, res.position, res.points, 0 AS sprint,
+           d.forename, d.surname, c.name AS constructorName
+    FROM results res
+    JOIN races r        ON res.raceId        = r.raceId
+    JOIN drivers d      ON res.driverId      = d.driverId
+    JOIN constructors c ON res.constructorId = c.constructorId
+    WHERE r.year = %s AND r.round <= %s
+    UNION ALL
+    SELECT r.round, r.raceId, sr.driverId, sr.constructorId, NULL, sr.points, 1 AS sprint,
+           d.forename, d.surname, c.name AS constructorName
+    FROM sprintresults sr
+    JOIN races r        ON sr.raceId        = r.raceId
+    JOIN drivers d      ON sr.driverId      = d.driverId
+    JOIN constructors c ON sr.constructorId = c.constructorId
+    WHERE r.year = %s AND r.round <= %s
+"""
+
+SEASON_FINISHES = statement("season_finishes", SEASON_FINISHES_SQL)
+SEASON_FINISHES_COLUMNS = (
+    "round", "raceId", "driverId", "constructorId", "position", "points", "sprint",
+    "forename", "surname", "constructorName"
+)
+
+def season_finishes(connection, season, through_round=None):
+    """Every race and sprint finish of `season` up to `through_round`, one row each (sprint rows have no position)."""
+    through_round = through_round if through_round is not None else 999
+    rows = connection.fetch_prepared(SEASON_FINISHES, (season, through_round, season, through_round))
+    return [dict(zip(SEASON_FINISHES_COLUMNS, row)) for row in rows]
+
+def finish_positions(rows):
+    """Classified finishing positions as an int array, 0 for anyone not classified."""
+    return np.array([int(row["position"]) if str(row["position"]).isdigit() else 0 for row in rows], dtype=int)
+
+def compute_standings(round_nums, entity_ids, points, positions):
+    """
+    Championship table after every round from flat per-finish columns.
+    `positions` holds classified race finishes (0 for sprints and non-finishers); ties
+    on points go to countback: most wins, then most second places, and so on.
+    Returns (rounds, entities, points, ranks, wins) where the last three are
+    rounds x entities matrices, entities are in final-table order and rank 0 means
+    no result yet.
+    """
+    rounds, round_idx = np.unique(np.asarray(round_nums, dtype=int), return_inverse=True)
+    entities, entity_idx = np.unique(np.asarray(entity_ids, dtype=int), return_inverse=True)
+    round_idx, entity_idx = round_idx.ravel(), entity_idx.ravel()
+    positions = np.asarray(positions, dtype=int)
+    n_rounds, n_entities = len(rounds), len(entities)
+    if not n_rounds:
+        empty = np.zeros((0, 0), dtype=int)
+        return rounds, entities, empty.astype(float), empty, empty
+
+    cumulative = np.zeros((n_rounds, n_entities))
+    np.add.at(cumulative, (round_idx, entity_idx), np.asarray(points, dtype=float))
+    cumulative = np.cumsum(cumulative, axis=0)
+
+    # finishes[r, e, p] = finishes in position p+1 up to and including round r
+    depth = max(int(positions.max(initial=0)), 1)
+    placed = positions > 0
+    finishes = np.zeros((n_rounds, n_entities, depth), dtype=int)
+    np.add.at(finishes, (round_idx[placed], entity_idx[placed], positions[placed] - 1), 1)
+    finishes = np.cumsum(finishes, axis=0)
+
+    entered = np.zeros((n_rounds, n_entities), dtype=bool)
+    entered[round_idx, entity_idx] = True
+    entered = np.logical_or.accumulate(entered, axis=0)
+
+    # lexsort's last key is the primary one: entered, points, wins, seconds, ...
+    keys = [-finishes[..., p] for p in range(depth - 1, -1, -1)] + [-cumulative, ~entered]
+    order = np.lexsort(keys, axis=-1)
+    ranks = np.empty_like(order)
+    ranks[np.arange(n_rounds)[:, None], order] = np.arange(1, n_entities + 1)
+    ranks[~entered] = 0
+
+    final = order[-1]
+    return rounds, entities[final], cumulative[:, final], ranks[:, final], finishes[:, final, 0]
+
+def season_standings(rows, key):
+    """compute_standings over season_finishes rows, per `key` ("driverId" or "constructorId")."""
+    rows = [row for row in rows if row[key] is not None]
+    return compute_standings(
+        [row["round"] for row in rows],
+        [row[key] for row in rows],
+        [float(row["points"] or 0) for row in rows],
+        [0 if row["sprint"] else p for row, p in zip(rows, finish_positions(rows))]
     )
 
+def standings_at(standings, round_num=None):
+    """
+    [(entityId, position, points, wins)] in table order after `round_num` (default:
+    the last round with results); [] if that round has no results.
+    """
+    rounds, entities, points, ranks, wins = standings
+    hits = np.flatnonzero(rounds == round_num) if round_num is not None else np.arange(len(rounds))[-1:]
+    if not len(hits):
+        return []
+    r = hits[0]
+    return [
+        (int(entities[e]), int(ranks[r, e]), float(points[r, e]), int(wins[r, e]))
+        for e in np.argsort(ranks[r], kind="stable") if ranks[r, e]
+    ]
+
+def standings_long_form(standings):
+    """(round, entityId, points) arrays with a row per entity per round, each round in table order."""
+    rounds, entities, points, ranks, _ = standings
+    r, e = np.nonzero(ranks)
+    order = np.lexsort((ranks[r, e], r))
+    r, e = r[order], e[order]
+    return rounds[r], entities[e], points[r, e]
+
+# The published tables apply each era's rules, which summing results can't reproduce:
+# dropped scores before 1991, only a team's best car scoring before 1979, exclusions
+# such as 1997's. Real seasons are always read from them.
+OFFICIAL_STANDINGS = {
+    "driverId": statement("driver_standings", """
+        SELECT r.round, s.driverId, s.points, s.position, s.wins, d.forename, d.surname
+        FROM driverstandings s
+        JOIN races r   ON s.raceId   = r.raceId
+        JOIN drivers d ON s.driverId = d.driverId
+        WHERE r.year = %s
+    """),
+    "constructorId": statement("constructor_standings", """
+        SELECT r.round, s.constructorId, s.points, s.position, s.wins, c.name
+        FROM constructorstandings s
+        JOIN races r        ON s.raceId        = r.raceId
+        JOIN constructors c ON s.constructorId = c.constructorId
+        WHERE r.year = %s
+    """),
+}
+
+def official_standings(connection, season, key):
+    """
+    driverstandings / constructorstandings for `season` in the compute_standings shape,
+    plus entityId => (forename, surname) for drivers or => name for constructors.
+    A standing without a position (e.g. an exclusion) ranks after everyone classified.
+    """
+    rows = connection.fetch_prepared(OFFICIAL_STANDINGS[key], (season,))
+    rounds, round_idx = np.unique(np.array([row[0] for row in rows], dtype=int), return_inverse=True)
+    entities, entity_idx = np.unique(np.array([row[1] for row in rows], dtype=int), return_inverse=True)
+    round_idx, entity_idx = round_idx.ravel(), entity_idx.ravel()
+    n_rounds, n_entities = len(rounds), len(entities)
+
+    points = np.zeros((n_rounds, n_entities))
+    ranks = np.zeros((n_rounds, n_entities), dtype=int)
+    wins = np.zeros((n_rounds, n_entities), dtype=int)
+    points[round_idx, entity_idx] = [float(row[2] or 0) for row in rows]
+    ranks[round_idx, entity_idx] = [int(row[3]) if row[3] is not None else n_entities + 1 for row in rows]
+    wins[round_idx, entity_idx] = [int(row[4] or 0) for row in rows]
+
+    if key == "driverId":
+        names = {row[1]: (row[5], row[6]) for row in rows}
+    else:
+        names = {row[1]: row[5] for row in rows}
+
+    if n_rounds:
+        # entities in final-table order, anyone missing from the last table after the rest
+        final = np.where(ranks[-1] > 0, ranks[-1], n_entities + 2)
+        order = np.argsort(final, kind="stable")
+        entities, points, ranks, wins = entities[order], points[:, order], ranks[:, order], wins[:, order]
+    return (rounds, entities, points, ranks, wins), names
+
+# Standings of real seasons, per worker and under a byte budget; keyed by the
+# ingest data version, so a load simply stops matching the old entries.
+season_cache = ByteBudgetLRU("season", int(os.getenv("SEASON_CACHE_BYTES", 32 * 1024 * 1024)))
+
+def season_table(connection, season, key):
+    """
+    official_standings(), cached. Don't modify the result; it's shared between requests.
+    """
+    cache_key = (season, key, loaded_data_version())
+    cached = season_cache.get(cache_key)
+    if cached is None:
+        cached = official_standings(connection, season, key)
+        season_cache.set(cache_key, cached)
+    return cached
+
 # 🔹 1. Get available seasons
 @app.route('/api/f1/seasons.json')
 def get_seasons():
@@ -90,27 +1389,41 @@ def get_drivers(season):
 # 🔹 4. Get race results per season and round
 @app.route('/api/f1/<int:season>/<int:round>/results.json')
 def get_race_results(season, round):
+    fields = requested_fields()
+
+    # Only select (and LEFT JOIN) what the fieldset needs
+    columns = [
+        "races.raceId AS db_race_id",
+        "races.name AS raceName",
+        "races.round AS raceRound",
+        "circuits.name AS circuitName"
+    ]
+    if wanted(fields, "position"):
+        columns.append("results.position")
+    if wanted(fields, "points"):
+        columns.append("results.points")
+    if wanted(fields, "status"):
+        columns.append("COALESCE(status.status, 'Unknown') AS status")
+    if wanted(fields, "Driver", "driverId"):
+        columns.append("drivers.driverId")
+    if wanted(fields, "Driver", "givenName"):
+        columns.append("drivers.forename AS givenName")
+    if wanted(fields, "Driver", "familyName"):
+        columns.append("drivers.surname AS familyName")
+    if wanted(fields, "Constructor", "name"):
+        columns.append("constructors.name AS constructorName")
+    status_join = "LEFT JOIN status ON results.statusId = status.statusId" if wanted(fields, "status") else ""
+
     connection = get_db_connection()
     cursor = connection.cursor(dictionary=True)
-    cursor.execute("""
-        SELECT
-            races.raceId          AS db_race_id,
-            races.name            AS raceName,
-            races.round           AS raceRound,
-            circuits.name         AS circuitName,
-            results.position,
-            results.points,
-            COALESCE(status.status, 'Unknown') AS status,
-            drivers.driverId,
-            drivers.forename      AS givenName,
-            drivers.surname       AS familyName,
-            constructors.name     AS constructorName
+    cursor.execute(f"""
+        SELECT {", ".join(columns)}
         FROM results
         JOIN races        ON results.raceId       = races.raceId
         JOIN circuits     ON races.circuitId      = circuits.circuitId
         JOIN drivers      ON results.driverId     = drivers.driverId
         JOIN constructors ON results.constructorId = constructors.constructorId
-        LEFT JOIN status  ON results.statusId     = status.statusId
+        {status_join}
         WHERE races.year  = %s
           AND races.round = %s
     """, (season, round))
@@ -131,16 +1444,16 @@ def get_race_results(season, round):
 
     for row in rows:
         results_list.append({
-            "position": row["position"],
-            "points":   row["points"],
-            "status":   row["status"],
+            "position": row.get("position"),
+            "points":   row.get("points"),
+            "status":   row.get("status"),
             "Driver": {
-                "driverId":   row["driverId"],
-                "givenName":  row["givenName"],
-                "familyName": row["familyName"]
+                "driverId":   row.get("driverId"),
+                "givenName":  row.get("givenName"),
+                "familyName": row.get("familyName")
             },
             "Constructor": {
-                "name": row["constructorName"]
+                "name": row.get("constructorName")
             }
         })
 
@@ -171,19 +1484,14 @@ def get_race_results(season, round):
 @app.route('/api/f1/<int:season>/<int:round>/constructorStandings.json')
 def get_constructor_standings(season, round):
     connection = get_db_connection()
-    cursor = connection.cursor(dictionary=True)
-    cursor.execute("""
-        SELECT constructorstandings.constructorId, constructors.name, constructorstandings.points
-        FROM constructorstandings
-        JOIN constructors ON constructorstandings.constructorId = constructors.constructorId
-        JOIN races ON constructorstandings.raceId = races.raceId
-        WHERE races.year = %s AND races.round = %s;
-    """, (season, round))
-
-    standings = [{'Constructor': {"constructorId": row["constructorId"], "name": row["name"]}, "points": row["points"]} for row in cursor.fetchall()]
-    cursor.close()
+    table, names = season_table(connection, season, "constructorId")
     connection.close()
 
+    standings = [
+        {"Constructor": {"constructorId": c_id, "name": names[c_id]}, "points": pts}
+        for c_id, _, pts, _ in standings_at(table, round)
+    ]
+
     return jsonify({
         "MRData": {
             "series": "f1",
@@ -236,10 +1544,18 @@ def get_driver_results_table(season):
     
     races = {row["round"]: row["name"] for row in cursor.fetchall()}
 
+    fields = requested_fields()
+    columns = ["d.driverId", "r.round"]
+    if wanted(fields, "Driver", "givenName"):
+        columns.append("d.forename AS givenName")
+    if wanted(fields, "Driver", "familyName"):
+        columns.append("d.surname AS familyName")
+    if wanted(fields, "Races"):
+        columns.append("COALESCE(res.position, 'Ret') AS position")
+
     # Fetch driver positions per race
-    cursor.execute("""
-        SELECT d.driverId, d.forename AS givenName, d.surname AS familyName, 
-               r.round, COALESCE(res.position, 'Ret') AS position
+    cursor.execute(f"""
+        SELECT {", ".join(columns)}
         FROM results res
         JOIN drivers d ON res.driverId = d.driverId
         JOIN races r ON res.raceId = r.raceId
@@ -255,35 +1571,41 @@ def get_driver_results_table(season):
             driver_data[driver_id] = {
                 "Driver": {
                     "driverId": driver_id,
-                    "givenName": row["givenName"],
-                    "familyName": row["familyName"]
+                    "givenName": row.get("givenName"),
+                    "familyName": row.get("familyName")
                 },
                 "Races": {race_round: "" for race_round in races.keys()},
                 "TotalPoints": 0
             }
-        driver_data[driver_id]["Races"][row["round"]] = row["position"]
+        driver_data[driver_id]["Races"][row["round"]] = row.get("position", "")
 
-    # Fetch latest recorded cumulative points per driver
-    cursor.execute("""
-        SELECT ds.driverId, ds.points
-        FROM driverstandings ds
-        JOIN races r ON ds.raceId = r.raceId
-        WHERE r.year = %s AND r.round = (
-            SELECT MAX(round) FROM races WHERE year = %s
-        )
-        ORDER BY ds.points DESC;
-    """, (season, season))
+    # Order by the final table
+    standings, _ = season_table(connection, season, "driverId")
 
     sorted_driver_results = []
-    for row in cursor.fetchall():
-        driver_id = row["driverId"]
+    for driver_id, _, pts, _ in standings_at(standings):
         if driver_id in driver_data:
-            driver_data[driver_id]["TotalPoints"] = row["points"]
+            driver_data[driver_id]["TotalPoints"] = pts
             sorted_driver_results.append(driver_data[driver_id])
     
     cursor.close()
     connection.close()
 
+    fmt = negotiate_columnar_format()
+    if fmt != "json":
+        # one row per result: drivers in table order, then rounds
+        entries = [(entry, rnd, pos) for entry in sorted_driver_results
+                   for rnd, pos in entry["Races"].items() if pos != ""]
+        return columnar_response(fmt, f"driverResultsTable-{season}", {
+            "driverId": [entry["Driver"]["driverId"] for entry, _, _ in entries],
+            "givenName": [entry["Driver"]["givenName"] for entry, _, _ in entries],
+            "familyName": [entry["Driver"]["familyName"] for entry, _, _ in entries],
+            "round": [rnd for _, rnd, _ in entries],
+            "raceName": [races[rnd] for _, rnd, _ in entries],
+            "position": [None if pos is None else str(pos) for _, _, pos in entries],
+            "totalPoints": [float(entry["TotalPoints"]) for entry, _, _ in entries],
+        })
+
     return jsonify({
         "MRData": {
             "series": "f1",
@@ -299,32 +1621,20 @@ def get_driver_results_table(season):
 @app.route('/api/f1/<int:season>/<int:round>/driverStandings.json')
 def get_driver_standings(season, round):
     connection = get_db_connection()
-    cursor = connection.cursor(dictionary=True)
-    
-    cursor.execute("""
-        SELECT drivers.driverId, drivers.forename AS givenName, drivers.surname AS familyName, 
-               COALESCE(ds.points, 0) AS totalPoints
-        FROM drivers
-        JOIN driverstandings ds ON ds.driverId = drivers.driverId
-        JOIN races ON ds.raceId = races.raceId
-        WHERE races.year = %s AND races.round = %s
-        ORDER BY ds.points DESC;
-    """, (season, round))
+    table, names = season_table(connection, season, "driverId")
+    connection.close()
 
     standings = [
         {
             "Driver": {
-                "driverId": row["driverId"],
-                "givenName": row["givenName"],
-                "familyName": row["familyName"]
+                "driverId": d_id,
+                "givenName": names[d_id][0],
+                "familyName": names[d_id][1]
             },
-            "points": row["totalPoints"]
-        } for row in cursor.fetchall()
+            "points": pts
+        } for d_id, _, pts, _ in standings_at(table, round)
     ]
 
-    cursor.close()
-    connection.close()
-
     return jsonify({
         "MRData": {
             "series": "f1",
@@ -351,13 +1661,16 @@ def get_constructor_results_table(season):
     """, (season,))
     races = {row["round"]: row["name"] for row in cursor.fetchall()}
 
+    fields = requested_fields()
+    columns = ["c.constructorId", "r.round"]
+    if wanted(fields, "Constructor", "name"):
+        columns.append("c.name AS constructorName")
+    if wanted(fields, "Races"):
+        columns.append("COALESCE(res.position, 'Ret') AS position")
+
     # 2) Fetch ALL results for each constructor, for each round (one row per driver)
-    cursor.execute("""
-        SELECT c.constructorId,
-               c.name AS constructorName,
-               r.round,
-               COALESCE(res.position, 'Ret') AS position,
-               res.points
+    cursor.execute(f"""
+        SELECT {", ".join(columns)}
         FROM results res
         JOIN constructors c ON res.constructorId = c.constructorId
         JOIN races r        ON res.raceId       = r.raceId
@@ -375,38 +1688,41 @@ def get_constructor_results_table(season):
             constructor_data[constructor_id] = {
                 "Constructor": {
                     "constructorId": constructor_id,
-                    "name": row["constructorName"]
+                    "name": row.get("constructorName")
                 },
                 # Make each round an empty list so we can store multiple positions
                 "Races": {rnd: [] for rnd in races.keys()},
                 "TotalPoints": 0
             }
-        constructor_data[constructor_id]["Races"][round_num].append(row["position"])
+        if "position" in row:
+            constructor_data[constructor_id]["Races"][round_num].append(row["position"])
 
-    # 3) Now pull official final points from constructorStandings for sorting
-    cursor.execute("""
-        SELECT cs.constructorId, cs.points
-        FROM constructorstandings cs
-        JOIN races r ON cs.raceId = r.raceId
-        WHERE r.year = %s
-          AND r.round = (
-              SELECT MAX(round)
-              FROM races
-              WHERE year = %s
-          )
-        ORDER BY cs.points DESC;
-    """, (season, season))
+    # 3) Now order by the final constructors' table
+    standings, _ = season_table(connection, season, "constructorId")
 
     sorted_constructor_results = []
-    for row in cursor.fetchall():
-        cid = row["constructorId"]
+    for cid, _, pts, _ in standings_at(standings):
         if cid in constructor_data:
-            constructor_data[cid]["TotalPoints"] = row["points"]
+            constructor_data[cid]["TotalPoints"] = pts
             sorted_constructor_results.append(constructor_data[cid])
 
     cursor.close()
     connection.close()
 
+    fmt = negotiate_columnar_format()
+    if fmt != "json":
+        # one row per car per round: constructors in table order, then rounds
+        entries = [(entry, rnd, pos) for entry in sorted_constructor_results
+                   for rnd, positions in entry["Races"].items() for pos in positions]
+        return columnar_response(fmt, f"constructorResultsTable-{season}", {
+            "constructorId": [entry["Constructor"]["constructorId"] for entry, _, _ in entries],
+            "name": [entry["Constructor"]["name"] for entry, _, _ in entries],
+            "round": [rnd for _, rnd, _ in entries],
+            "raceName": [races[rnd] for _, rnd, _ in entries],
+            "position": [None if pos is None else str(pos) for _, _, pos in entries],
+            "totalPoints": [float(entry["TotalPoints"]) for entry, _, _ in entries],
+        })
+
     return jsonify({
         "MRData": {
             "series": "f1",
@@ -538,6 +1854,79 @@ def get_constructors_in_year_range():
         }
     })
 
+def year_range(args, default_start, default_end=2050):
+    """(startYear, endYear) from the query args; ValueError if either isn't an integer. Also used by asgi.py."""
+    return int(args.get('startYear', default_start)), int(args.get('endYear', default_end))
+
+YEAR_RANGE_ERROR = "startYear and endYear must be integers"
+
+YEARS_IN_RANGE_SQL = """
+    SELECT DISTINCT year
+    FROM races
+    WHERE year BETWEEN %s AND %s
+    ORDER BY year ASC;
+"""
+
+# Per-(driver, season) and per-(constructor, season) summaries, maintained by ingest.py.
+# Columns are named after the comparison metrics, plus racePoints/raceCount for avgPointsPerRace.
+SEASON_STAT_METRICS = {"totalPoints", "avgFinish", "dnfs", "avgQual", "wins", "avgPointsPerRace"}
+
+def season_stats_sql(kind, count):
+    """
+    One indexed range scan for `count` entities of `kind` ("driver" or "constructor"),
+    each given by ref or numeric id.
+    Parameters: the ids twice, then startYear and endYear.
+    """
+    ids = ", ".join(["%s"] * count)
+    return f"""
+        SELECT e.{kind}Ref AS ref, st.{kind}Id AS id, st.year,
+               st.totalPoints, st.wins, st.dnfs, st.avgFinish, st.avgQual,
+               st.racePoints, st.raceCount
+        FROM {kind}_season_stats st
+        JOIN {kind}s e ON st.{kind}Id = e.{kind}Id
+        WHERE (e.{kind}Ref IN ({ids}) OR e.{kind}Id IN ({ids}))
+          AND st.year BETWEEN %s AND %s
+    """
+
+def season_stat_value(row, metric):
+    """Same values (and 0 vs 0.0) as compute_*_metric, read from a *_season_stats row."""
+    if metric not in SEASON_STAT_METRICS:
+        return 0
+    if metric == "avgPointsPerRace":
+        if row is None or not row["raceCount"]:
+            return 0
+        return float(row["racePoints"] or 0) / float(row["raceCount"])
+    if row is None:
+        return 0.0
+    return float(row[metric] or 0)
+
+def season_stats_comparison(rows, entity_ids, all_years, metric, id_key):
+    # refs compare case-insensitively in MySQL, so match them the same way here
+    by_entity_year = {}
+    for row in rows:
+        by_entity_year[(str(row["ref"]).lower(), row["year"])] = row
+        by_entity_year[(str(row["id"]), row["year"])] = row
+
+    results = {}
+    for entity in entity_ids:
+        results[entity] = {id_key: entity, "yearlyPoints": [], "totalPoints": 0}
+        for y in all_years:
+            val = season_stat_value(by_entity_year.get((entity.lower(), y)), metric)
+            results[entity]["yearlyPoints"].append({"year": y, "points": val})
+            results[entity]["totalPoints"] += val
+    return results
+
+def per_year_comparison(cursor, compute_metric, entity_ids, all_years, metric, id_key):
+    """The original one-query-per-(entity, year) path, used until the summary tables exist."""
+    results = {}
+    for entity in entity_ids:
+        results[entity] = {id_key: entity, "yearlyPoints": [], "totalPoints": 0}
+        for y in all_years:
+            val = compute_metric(cursor, entity, y, metric)
+            results[entity]["yearlyPoints"].append({"year": y, "points": val})
+            results[entity]["totalPoints"] += val
+    return results
+
 # 🔹 14. Multi-year Driver Comparison
 @app.route('/api/f1/multiYearDriverComparison')
 def multi_year_driver_comparison():
@@ -546,8 +1935,10 @@ def multi_year_driver_comparison():
       /api/f1/multiYearDriverComparison?drivers=hamilton,alonso&startYear=2018&endYear=2020&metric=avgFinish
     """
     drivers_param = request.args.get('drivers')
-    start_year = int(request.args.get('startYear', 1950))
-    end_year = int(request.args.get('endYear', 2050))
+    try:
+        start_year, end_year = year_range(request.args, 1950)
+    except ValueError:
+        return jsonify({"error": YEAR_RANGE_ERROR}), 400
     metric = request.args.get('metric', 'totalPoints')
 
     if not drivers_param:
@@ -557,26 +1948,16 @@ def multi_year_driver_comparison():
     connection = get_db_connection()
     cursor = connection.cursor(dictionary=True)
 
-    results = {}
     # For each driver, gather year range
-    cursor.execute("""
-        SELECT DISTINCT year
-        FROM races
-        WHERE year BETWEEN %s AND %s
-        ORDER BY year ASC;
-    """, (start_year, end_year))
+    cursor.execute(YEARS_IN_RANGE_SQL, (start_year, end_year))
     all_years = [row["year"] for row in cursor.fetchall()]
 
-    for driver in driver_ids:
-        results[driver] = {
-            "driverId": driver,
-            "yearlyPoints": [],
-            "totalPoints": 0
-        }
-        for y in all_years:
-            val = compute_driver_metric(cursor, driver, y, metric)
-            results[driver]["yearlyPoints"].append({"year": y, "points": val})
-            results[driver]["totalPoints"] += val
+    try:
+        cursor.execute(season_stats_sql("driver", len(driver_ids)), (*driver_ids, *driver_ids, start_year, end_year))
+        results = season_stats_comparison(cursor.fetchall(), driver_ids, all_years, metric, "driverId")
+    except DB_ERRORS:
+        # driver_season_stats not built yet (python ingest.py --refresh-stats)
+        results = per_year_comparison(cursor, compute_driver_metric, driver_ids, all_years, metric, "driverId")
 
     cursor.close()
     connection.close()
@@ -590,95 +1971,87 @@ def multi_year_driver_comparison():
         }
     })
 
-def compute_driver_metric(cursor, driverRefOrId, year, metric):
-    """Compute the chosen metric for one driver in one year."""
-    if metric == "totalPoints":
-        # Summation of points from driverstandings
-        cursor.execute("""
-            SELECT MAX(ds.points) AS val
-            FROM driverstandings ds
-            JOIN races r ON ds.raceId = r.raceId
-            JOIN drivers d ON ds.driverId = d.driverId
-            WHERE (d.driverRef = %s OR d.driverId = %s)
-              AND r.year = %s
-        """, (driverRefOrId, driverRefOrId, year))
-        row = cursor.fetchone()
-        return float(row["val"] or 0)
-
-    elif metric == "avgFinish":
-        # average finishing position (exclude non-numeric positions, i.e. 'Ret')
-        cursor.execute("""
-            SELECT AVG(CASE WHEN res.position REGEXP '^[0-9]+$' THEN res.position+0 END) AS val
-            FROM results res
-            JOIN races r ON res.raceId = r.raceId
-            JOIN drivers d ON res.driverId = d.driverId
-            WHERE (d.driverRef = %s OR d.driverId = %s)
-              AND r.year = %s
-        """, (driverRefOrId, driverRefOrId, year))
-        row = cursor.fetchone()
-        return float(row["val"] or 0)
-
-    elif metric == "dnfs":
-        # number of DNFs -> check status or position
-        cursor.execute("""
-            SELECT COUNT(*) AS val
-            FROM results res
-            JOIN races r ON res.raceId = r.raceId
-            JOIN drivers d ON res.driverId = d.driverId
-            LEFT JOIN status s ON res.statusId = s.statusId
-            WHERE (d.driverRef = %s OR d.driverId = %s)
-              AND r.year = %s
-              AND (
-                s.status LIKE 'Ret%' OR s.status IN ('Crash','Engine','Accident')
-                OR res.position = 'Ret'
-                OR res.position REGEXP '[^0-9]+'
-              )
-        """, (driverRefOrId, driverRefOrId, year))
-        row = cursor.fetchone()
-        return float(row["val"])
-
-    elif metric == "avgQual":
-        # average grid position
-        cursor.execute("""
-            SELECT AVG(NULLIF(res.grid, 0)) AS val
-            FROM results res
-            JOIN races r ON res.raceId = r.raceId
-            JOIN drivers d ON res.driverId = d.driverId
-            WHERE (d.driverRef = %s OR d.driverId = %s)
-              AND r.year = %s
-        """, (driverRefOrId, driverRefOrId, year))
-        row = cursor.fetchone()
-        return float(row["val"] or 0)
-
-    elif metric == "wins":
-        # finishing position = 1
-        cursor.execute("""
-            SELECT COUNT(*) AS val
-            FROM results res
-            JOIN races r ON res.raceId = r.raceId
-            JOIN drivers d ON res.driverId = d.driverId
-            WHERE (d.driverRef = %s OR d.driverId = %s)
-              AND r.year = %s
-              AND res.position = '1'
-        """, (driverRefOrId, driverRefOrId, year))
-        row = cursor.fetchone()
-        return float(row["val"] or 0)
-
-    elif metric == "avgPointsPerRace":
-        cursor.execute("""
-            SELECT SUM(res.points) AS totalPts, COUNT(*) AS raceCount
-            FROM results res
-            JOIN races r ON res.raceId = r.raceId
-            JOIN drivers d ON res.driverId = d.driverId
-            WHERE (d.driverRef = %s OR d.driverId = %s)
-              AND r.year = %s
-        """, (driverRefOrId, driverRefOrId, year))
-        row = cursor.fetchone()
-        if row["raceCount"] == 0:
+# One query per metric, all taking (driverRef or driverId, driverRef or driverId, year)
+DRIVER_METRIC_SQL = {
+    # Summation of points from driverstandings
+    "totalPoints": """
+        SELECT MAX(ds.points) AS val
+        FROM driverstandings ds
+        JOIN races r ON ds.raceId = r.raceId
+        JOIN drivers d ON ds.driverId = d.driverId
+        WHERE (d.driverRef = %s OR d.driverId = %s)
+          AND r.year = %s
+    """,
+    # average finishing position (exclude non-numeric positions, i.e. 'Ret')
+    "avgFinish": """
+        SELECT AVG(CASE WHEN res.position REGEXP '^[0-9]+$' THEN res.position+0 END) AS val
+        FROM results res
+        JOIN races r ON res.raceId = r.raceId
+        JOIN drivers d ON res.driverId = d.driverId
+        WHERE (d.driverRef = %s OR d.driverId = %s)
+          AND r.year = %s
+    """,
+    # number of DNFs -> check status or position
+    "dnfs": """
+        SELECT COUNT(*) AS val
+        FROM results res
+        JOIN races r ON res.raceId = r.raceId
+        JOIN drivers d ON res.driverId = d.driverId
+        LEFT JOIN status s ON res.statusId = s.statusId
+        WHERE (d.driverRef = %s OR d.driverId = %s)
+          AND r.year = %s
+          AND (
+            s.status LIKE 'Ret%' OR s.status IN ('Crash','Engine','Accident')
+            OR res.position = 'Ret'
+            OR res.position REGEXP '[^0-9]+'
+          )
+    """,
+    # average grid position
+    "avgQual": """
+        SELECT AVG(NULLIF(res.grid, 0)) AS val
+        FROM results res
+        JOIN races r ON res.raceId = r.raceId
+        JOIN drivers d ON res.driverId = d.driverId
+        WHERE (d.driverRef = %s OR d.driverId = %s)
+          AND r.year = %s
+    """,
+    # finishing position = 1
+    "wins": """
+        SELECT COUNT(*) AS val
+        FROM results res
+        JOIN races r ON res.raceId = r.raceId
+        JOIN drivers d ON res.driverId = d.driverId
+        WHERE (d.driverRef = %s OR d.driverId = %s)
+          AND r.year = %s
+          AND res.position = '1'
+    """,
+    "avgPointsPerRace": """
+        SELECT SUM(res.points) AS totalPts, COUNT(*) AS raceCount
+        FROM results res
+        JOIN races r ON res.raceId = r.raceId
+        JOIN drivers d ON res.driverId = d.driverId
+        WHERE (d.driverRef = %s OR d.driverId = %s)
+          AND r.year = %s
+    """
+}
+
+def metric_value(row, metric):
+    """Turn the row returned by a *_METRIC_SQL query into the metric value."""
+    if row is None:
+        return 0
+    if metric == "avgPointsPerRace":
+        if not row["raceCount"]:
             return 0
         return float(row["totalPts"] or 0) / float(row["raceCount"])
+    return float(row["val"] or 0)
 
-    return 0
+def compute_driver_metric(cursor, driverRefOrId, year, metric):
+    """Compute the chosen metric for one driver in one year."""
+    sql = DRIVER_METRIC_SQL.get(metric)
+    if sql is None:
+        return 0
+    cursor.execute(sql, (driverRefOrId, driverRefOrId, year))
+    return metric_value(cursor.fetchone(), metric)
 
 #🔹 15. Multi-year Constructor Comparison
 @app.route('/api/f1/multiYearConstructorComparison')
@@ -687,8 +2060,10 @@ def multi_year_constructor_comparison():
     /api/f1/multiYearConstructorComparison?teams=mercedes,ferrari&startYear=2018&endYear=2020&metric=dnfs
     """
     teams_param = request.args.get('teams')
-    start_year = int(request.args.get('startYear', 1958))
-    end_year = int(request.args.get('endYear', 2050))
+    try:
+        start_year, end_year = year_range(request.args, 1958)
+    except ValueError:
+        return jsonify({"error": YEAR_RANGE_ERROR}), 400
     metric = request.args.get('metric', 'totalPoints')
 
     if not teams_param:
@@ -700,25 +2075,15 @@ def multi_year_constructor_comparison():
     cursor = connection.cursor(dictionary=True)
 
     # gather all relevant years in [start_year, end_year]
-    cursor.execute("""
-        SELECT DISTINCT year
-        FROM races
-        WHERE year BETWEEN %s AND %s
-        ORDER BY year ASC;
-    """, (start_year, end_year))
+    cursor.execute(YEARS_IN_RANGE_SQL, (start_year, end_year))
     all_years = [row["year"] for row in cursor.fetchall()]
 
-    results = {}
-    for team in team_ids:
-        results[team] = {
-            "constructorId": team,
-            "yearlyPoints": [],
-            "totalPoints": 0
-        }
-        for y in all_years:
-            val = compute_constructor_metric(cursor, team, y, metric)
-            results[team]["yearlyPoints"].append({"year": y, "points": val})
-            results[team]["totalPoints"] += val
+    try:
+        cursor.execute(season_stats_sql("constructor", len(team_ids)), (*team_ids, *team_ids, start_year, end_year))
+        results = season_stats_comparison(cursor.fetchall(), team_ids, all_years, metric, "constructorId")
+    except DB_ERRORS:
+        # constructor_season_stats not built yet (python ingest.py --refresh-stats)
+        results = per_year_comparison(cursor, compute_constructor_metric, team_ids, all_years, metric, "constructorId")
 
     cursor.close()
     connection.close()
@@ -733,107 +2098,151 @@ def multi_year_constructor_comparison():
     })
 
 
+# Same shape as DRIVER_METRIC_SQL, keyed on (constructorRef or constructorId) instead
+CONSTRUCTOR_METRIC_SQL = {
+    # sum from constructorstandings for that year
+    "totalPoints": """
+        SELECT MAX(cs.points) AS val
+        FROM constructorstandings cs
+        JOIN races r ON cs.raceId = r.raceId
+        JOIN constructors c ON cs.constructorId = c.constructorId
+        WHERE (c.constructorRef = %s OR c.constructorId = %s)
+          AND r.year = %s
+    """,
+    # average finishing position for all drivers in this constructor for each race
+    # we'll assume results has a numeric 'position' or 'Ret'
+    "avgFinish": """
+        SELECT AVG(CASE WHEN res.position REGEXP '^[0-9]+$' THEN res.position+0 END) AS val
+        FROM results res
+        JOIN races r ON res.raceId = r.raceId
+        JOIN constructors c ON res.constructorId = c.constructorId
+        WHERE (c.constructorRef = %s OR c.constructorId = %s)
+          AND r.year = %s
+    """,
+    # number of DNFs among all drivers in that constructor
+    "dnfs": """
+        SELECT COUNT(*) AS val
+        FROM results res
+        JOIN races r ON res.raceId = r.raceId
+        JOIN constructors c ON res.constructorId = c.constructorId
+        LEFT JOIN status s ON res.statusId = s.statusId
+        WHERE (c.constructorRef = %s OR c.constructorId = %s)
+          AND r.year = %s
+          AND (
+            s.status LIKE 'Ret%'
+            OR s.status IN ('Crash','Engine','Accident')
+            OR res.position = 'Ret'
+            OR res.position REGEXP '[^0-9]+'
+          )
+    """,
+    # average grid for all constructor's cars
+    "avgQual": """
+        SELECT AVG(NULLIF(res.grid, 0)) AS val
+        FROM results res
+        JOIN races r ON res.raceId = r.raceId
+        JOIN constructors c ON res.constructorId = c.constructorId
+        WHERE (c.constructorRef = %s OR c.constructorId = %s)
+          AND r.year = %s
+    """,
+    # count how many times any driver for this constructor finished 1st
+    "wins": """
+        SELECT COUNT(*) AS val
+        FROM results res
+        JOIN races r ON res.raceId = r.raceId
+        JOIN constructors c ON res.constructorId = c.constructorId
+        WHERE (c.constructorRef = %s OR c.constructorId = %s)
+          AND r.year = %s
+          AND res.position = '1'
+    """,
+    # total points / total races for that constructor
+    "avgPointsPerRace": """
+        SELECT SUM(res.points) AS totalPts, COUNT(*) AS raceCount
+        FROM results res
+        JOIN races r ON res.raceId = r.raceId
+        JOIN constructors c ON res.constructorId = c.constructorId
+        WHERE (c.constructorRef = %s OR c.constructorId = %s)
+          AND r.year = %s
+    """
+}
+
 def compute_constructor_metric(cursor, constructorRefOrId, year, metric):
     """
     Compute the chosen metric for a single constructor in a single year.
     """
-    if metric == "totalPoints":
-        # sum from constructorstandings for that year
-        cursor.execute("""
-            SELECT MAX(cs.points) AS val
-            FROM constructorstandings cs
-            JOIN races r ON cs.raceId = r.raceId
-            JOIN constructors c ON cs.constructorId = c.constructorId
-            WHERE (c.constructorRef = %s OR c.constructorId = %s)
-              AND r.year = %s
-        """, (constructorRefOrId, constructorRefOrId, year))
-        row = cursor.fetchone()
-        return float(row["val"] or 0)
-
-    elif metric == "avgFinish":
-        # average finishing position for all drivers in this constructor for each race
-        # we'll assume results has a numeric 'position' or 'Ret'
-        cursor.execute("""
-            SELECT AVG(CASE WHEN res.position REGEXP '^[0-9]+$' THEN res.position+0 END) AS val
-            FROM results res
-            JOIN races r ON res.raceId = r.raceId
-            JOIN constructors c ON res.constructorId = c.constructorId
-            WHERE (c.constructorRef = %s OR c.constructorId = %s)
-              AND r.year = %s
-        """, (constructorRefOrId, constructorRefOrId, year))
-        row = cursor.fetchone()
-        return float(row["val"] or 0)
-
-    elif metric == "dnfs":
-        # number of DNFs among all drivers in that constructor
-        cursor.execute("""
-            SELECT COUNT(*) AS val
-            FROM results res
-            JOIN races r ON res.raceId = r.raceId
-            JOIN constructors c ON res.constructorId = c.constructorId
-            LEFT JOIN status s ON res.statusId = s.statusId
-            WHERE (c.constructorRef = %s OR c.constructorId = %s)
-              AND r.year = %s
-              AND (
-                s.status LIKE 'Ret%'
-                OR s.status IN ('Crash','Engine','Accident')
-                OR res.position = 'Ret'
-                OR res.position REGEXP '[^0-9]+'
-              )
-        """, (constructorRefOrId, constructorRefOrId, year))
-        row = cursor.fetchone()
-        return float(row["val"] or 0)
-
-    elif metric == "avgQual":
-        # average grid for all constructor's cars
-        cursor.execute("""
-            SELECT AVG(NULLIF(res.grid, 0)) AS val
-            FROM results res
-            JOIN races r ON res.raceId = r.raceId
-            JOIN constructors c ON res.constructorId = c.constructorId
-            WHERE (c.constructorRef = %s OR c.constructorId = %s)
-              AND r.year = %s
-        """, (constructorRefOrId, constructorRefOrId, year))
-        row = cursor.fetchone()
-        return float(row["val"] or 0)
-
-    elif metric == "wins":
-        # count how many times any driver for this constructor finished 1st
-        cursor.execute("""
-            SELECT COUNT(*) AS val
-            FROM results res
-            JOIN races r ON res.raceId = r.raceId
-            JOIN constructors c ON res.constructorId = c.constructorId
-            WHERE (c.constructorRef = %s OR c.constructorId = %s)
-              AND r.year = %s
-              AND res.position = '1'
-        """, (constructorRefOrId, constructorRefOrId, year))
-        row = cursor.fetchone()
-        return float(row["val"] or 0)
-
-    elif metric == "avgPointsPerRace":
-        # total points / total races for that constructor
-        cursor.execute("""
-            SELECT SUM(res.points) AS totalPts, COUNT(*) AS raceCount
-            FROM results res
-            JOIN races r ON res.raceId = r.raceId
-            JOIN constructors c ON res.constructorId = c.constructorId
-            WHERE (c.constructorRef = %s OR c.constructorId = %s)
-              AND r.year = %s
-        """, (constructorRefOrId, constructorRefOrId, year))
-        row = cursor.fetchone()
-        if not row["raceCount"]:
-            return 0
-        return float(row["totalPts"] or 0) / float(row["raceCount"])
-
-    return 0
+    sql = CONSTRUCTOR_METRIC_SQL.get(metric)
+    if sql is None:
+        return 0
+    cursor.execute(sql, (constructorRefOrId, constructorRefOrId, year))
+    return metric_value(cursor.fetchone(), metric)
 
 # 🔹 16. Get qualifying results for a specific season and round
+#     ?mode=gaps adds per-session gaps (ms) to pole, to the cutoff and to the team-mate
+QUALIFYING_SESSIONS = ("q1", "q2", "q3")
+
+def ms_or_none(value):
+    return None if np.isnan(value) else int(value)
+
+def derive_qualifying_ms(rows):
+    """
+    Fill q1_ms/q2_ms/q3_ms/best_ms from the q1/q2/q3 strings, the way ingest.py
+    does, for a database whose qualifying table doesn't have those columns yet.
+    """
+    from ingest import qualifying_ms  # ingest.py is the one parser of lap time strings
+    for row in rows:
+        row["q1_ms"], row["q2_ms"], row["q3_ms"], row["best_ms"] = qualifying_ms(row["q1"], row["q2"], row["q3"])
+    return rows
+
+def qualifying_gaps(rows):
+    """
+    Gaps for every driver in one qualifying, from the q1_ms/q2_ms/q3_ms columns
+    ingest.py fills in. One vectorized pass per session; all values in ms, NaN
+    where they don't apply:
+      toPole      - behind the fastest time of the session
+      toCutoff    - relative to the slowest time that still reached the next session
+      toTeammate  - relative to the other car of the same constructor
+    Returns {session: (times, to_pole, to_cutoff, to_teammate)} of arrays in row order.
+    """
+    times = {
+        session: np.array([np.nan if row[f"{session}_ms"] is None else row[f"{session}_ms"] for row in rows], dtype=float)
+        for session in QUALIFYING_SESSIONS
+    }
+    _, team_idx = np.unique(np.array([row["constructorId"] for row in rows], dtype=int), return_inverse=True)
+    team_idx = team_idx.ravel()
+
+    gaps = {}
+    for i, session in enumerate(QUALIFYING_SESSIONS):
+        ms = times[session]
+        timed = ~np.isnan(ms)
+        to_pole = ms - np.nanmin(ms) if timed.any() else np.full(len(ms), np.nan)
+
+        cutoff = np.nan
+        if i + 1 < len(QUALIFYING_SESSIONS):
+            advanced = timed & ~np.isnan(times[QUALIFYING_SESSIONS[i + 1]])
+            if advanced.any():
+                cutoff = ms[advanced].max()
+        to_cutoff = ms - cutoff
+
+        # with exactly two timed cars in a team, the team-mate's time is team total - own time
+        team_total = np.bincount(team_idx, weights=np.where(timed, ms, 0.0))
+        team_timed = np.bincount(team_idx, weights=timed.astype(float))
+        to_teammate = np.where(timed & (team_timed[team_idx] == 2), 2 * ms - team_total[team_idx], np.nan)
+
+        gaps[session] = (ms, to_pole, to_cutoff, to_teammate)
+    return gaps
+
 @app.route('/api/f1/<int:season>/<int:round>/qualifying.json')
 def get_qualifying_results(season, round):
+    with_gaps = request.args.get('mode') == 'gaps'
+    ms_columns = """
+            qualifying.constructorId,
+            qualifying.q1_ms,
+            qualifying.q2_ms,
+            qualifying.q3_ms,
+            qualifying.best_ms,""" if with_gaps else ""
+
     connection = get_db_connection()
     cursor = connection.cursor(dictionary=True)
-    cursor.execute("""
+    query = """
         SELECT
             races.name       AS raceName,
             races.round      AS raceRound,
@@ -841,7 +2250,7 @@ def get_qualifying_results(season, round):
             qualifying.position AS qualPosition,
             qualifying.q1,
             qualifying.q2,
-            qualifying.q3,
+            qualifying.q3,{}
             drivers.driverId,         -- Return numeric driverId
             drivers.forename  AS givenName,
             drivers.surname   AS familyName,
@@ -854,17 +2263,25 @@ def get_qualifying_results(season, round):
         WHERE races.year  = %s
           AND races.round = %s
         ORDER BY qualifying.position
-    """, (season, round))
-
-    rows = cursor.fetchall()
+    """
+    try:
+        cursor.execute(query.format(ms_columns), (season, round))
+        rows = cursor.fetchall()
+    except DB_ERRORS:
+        if not with_gaps:
+            raise
+        # q*_ms not added yet (python ingest.py); parse the time strings instead
+        cursor.execute(query.format("\n            qualifying.constructorId,"), (season, round))
+        rows = derive_qualifying_ms(cursor.fetchall())
     cursor.close()
     connection.close()
 
     results = []
     race_name = "Unknown"
     race_round = "Unknown"
+    gaps = qualifying_gaps(rows) if with_gaps and rows else None
 
-    for row in rows:
+    for i, row in enumerate(rows):
         race_name = row["raceName"]
         race_round = row["raceRound"]
         results.append({
@@ -881,6 +2298,17 @@ def get_qualifying_results(season, round):
                 "name": row["constructorName"]
             }
         })
+        if gaps is not None:
+            results[-1]["bestMs"] = row["best_ms"]
+            results[-1]["gaps"] = {
+                session: {
+                    "ms":         ms_or_none(ms[i]),
+                    "toPole":     ms_or_none(to_pole[i]),
+                    "toCutoff":   ms_or_none(to_cutoff[i]),
+                    "toTeammate": ms_or_none(to_teammate[i])
+                }
+                for session, (ms, to_pole, to_cutoff, to_teammate) in gaps.items()
+            }
 
     return jsonify({
         "MRData": {
@@ -991,19 +2419,19 @@ def get_driver_results_for_round(season, round):
         table_name   = 'results'
         position_col = 'results.position'
         points_col   = 'results.points'
-        status_col   = 'COALESCE(status.status, "Unknown") AS sessionStatus'
+        status_col   = "COALESCE(status.status, 'Unknown') AS sessionStatus"
         status_join  = 'LEFT JOIN status ON results.statusId = status.statusId'
     elif session_type == 'qualifying':
         table_name   = 'qualifying'
         position_col = 'qualifying.position'
         points_col   = '0 AS points'
-        status_col   = '"Qualifying" AS sessionStatus'
+        status_col   = "'Qualifying' AS sessionStatus"
         status_join  = ''
     elif session_type == 'sprint':
         table_name   = 'sprintresults'
         position_col = 'sprintresults.position'
         points_col   = 'sprintresults.points'
-        status_col   = 'COALESCE(status.status, "Unknown") AS sessionStatus'
+        status_col   = "COALESCE(status.status, 'Unknown') AS sessionStatus"
         status_join  = 'LEFT JOIN status ON sprintresults.statusId = status.statusId'
     else:
         cursor.close()
@@ -1063,109 +2491,118 @@ def get_driver_results_for_round(season, round):
     })
 
 # 🔹 19. Get all constructor standings for a specific season
+#     ?format=matrix returns one constructor table plus a rounds x constructors points matrix
 @app.route('/api/f1/<int:season>/allConstructorStandings.json')
 def get_all_constructor_standings(season):
     connection = get_db_connection()
-    cursor = connection.cursor(dictionary=True)
+    standings, names = season_table(connection, season, "constructorId")
+    connection.close()
 
-    cursor.execute("""
-        SELECT r.round, cs.constructorId, c.name AS constructorName, cs.points
-        FROM constructorstandings cs
-        JOIN races r ON cs.raceId = r.raceId
-        JOIN constructors c ON cs.constructorId = c.constructorId
-        WHERE r.year = %s
-        ORDER BY r.round ASC;
-    """, (season,))
+    rounds, constructor_ids, matrix, _, _ = standings
 
-    data = cursor.fetchall()
-    cursor.close()
-    connection.close()
+    if request.args.get('format') == 'matrix':
+        return jsonify({
+            "season": season,
+            "format": "matrix",
+            "rounds": rounds.tolist(),
+            "constructors": [{"constructorId": c_id, "constructorName": names[c_id]} for c_id in constructor_ids.tolist()],
+            "points": matrix.tolist()
+        })
 
-    standings_by_round = {}
-    for row in data:
-        round_num = row['round']
-        standings_by_round.setdefault(round_num, []).append({
-            "constructorId": row["constructorId"],
-            "constructorName": row["constructorName"],
-            "points": float(row["points"])
+    fmt = negotiate_columnar_format()
+    if fmt != "json":
+        round_col, id_col, points_col = standings_long_form(standings)
+        return columnar_response(fmt, f"allConstructorStandings-{season}", {
+            "round": round_col,
+            "constructorId": id_col,
+            "constructorName": [names[c_id] for c_id in id_col.tolist()],
+            "points": points_col,
         })
 
+    standings_by_round = {}
+    for round_num in rounds.tolist():
+        standings_by_round[round_num] = [
+            {"constructorId": c_id, "constructorName": names[c_id], "points": pts}
+            for c_id, _, pts, _ in standings_at(standings, round_num)
+        ]
+
     return jsonify({"season": season, "standings": standings_by_round})
 
 # 🔹 20. Get all driver standings for a specific season
+#     ?format=matrix returns one driver table plus a rounds x drivers points matrix
 @app.route('/api/f1/<int:season>/allDriverStandings.json')
 def get_all_driver_standings(season):
     connection = get_db_connection()
-    cursor = connection.cursor(dictionary=True)
+    standings, names = season_table(connection, season, "driverId")
+    connection.close()
 
-    cursor.execute("""
-        SELECT r.round, ds.driverId, d.forename, d.surname, ds.points
-        FROM driverstandings ds
-        JOIN races r ON ds.raceId = r.raceId
-        JOIN drivers d ON ds.driverId = d.driverId
-        WHERE r.year = %s
-        ORDER BY r.round ASC;
-    """, (season,))
+    rounds, driver_ids, matrix, _, _ = standings
+
+    if request.args.get('format') == 'matrix':
+        return jsonify({
+            "season": season,
+            "format": "matrix",
+            "rounds": rounds.tolist(),
+            "drivers": [
+                {"driverId": d_id, "givenName": names[d_id][0], "familyName": names[d_id][1]}
+                for d_id in driver_ids.tolist()
+            ],
+            "points": matrix.tolist()
+        })
 
-    data = cursor.fetchall()
-    cursor.close()
-    connection.close()
+    fmt = negotiate_columnar_format()
+    if fmt != "json":
+        round_col, id_col, points_col = standings_long_form(standings)
+        return columnar_response(fmt, f"allDriverStandings-{season}", {
+            "round": round_col,
+            "driverId": id_col,
+            "givenName": [names[d_id][0] for d_id in id_col.tolist()],
+            "familyName": [names[d_id][1] for d_id in id_col.tolist()],
+            "points": points_col,
+        })
 
     standings_by_round = {}
-    for row in data:
-        round_num = row['round']
-        standings_by_round.setdefault(round_num, []).append({
-            "driverId": row["driverId"],
-            "givenName": row["forename"],
-            "familyName": row["surname"],
-            "points": float(row["points"])
-        })
+    for round_num in rounds.tolist():
+        standings_by_round[round_num] = [
+            {
+                "driverId": d_id,
+                "givenName": names[d_id][0],
+                "familyName": names[d_id][1],
+                "points": pts
+            }
+            for d_id, _, pts, _ in standings_at(standings, round_num)
+        ]
 
     return jsonify({"season": season, "standings": standings_by_round})
 
 
 # 🔹 21. Get all laptimes for a specific season and round
+LAPTIMES = statement("laptimes", """
+    SELECT drivers.forename, drivers.surname, lt.lap, lt.time
+    FROM laptimes lt
+    JOIN races r      ON lt.raceId   = r.raceId
+    JOIN drivers      ON lt.driverId = drivers.driverId
+    WHERE r.year  = %s
+      AND r.round = %s
+    ORDER BY lt.lap ASC, lt.position ASC
+""")
+
 @app.route('/api/f1/<int:season>/<int:round>/laptimes.json')
 def get_laptimes_for_round(season, round):
     connection = get_db_connection()
-    cursor = connection.cursor(dictionary=True)
-
-    query = """
-        SELECT
-            lt.driverId,
-            drivers.forename,
-            drivers.surname,
-            lt.lap,
-            lt.position,
-            lt.time,
-            lt.milliseconds
-        FROM laptimes lt
-        JOIN races r      ON lt.raceId   = r.raceId
-        JOIN drivers      ON lt.driverId = drivers.driverId
-        WHERE r.year  = %s
-          AND r.round = %s
-        ORDER BY lt.lap ASC, lt.position ASC
-    """
-    cursor.execute(query, (season, round))
-    rows = cursor.fetchall()
-    cursor.close()
+    rows = connection.fetch_prepared(LAPTIMES, (season, round))
     connection.close()
 
-    # Group lap times by driver
+    # Group lap times by driver; rows come lap by lap, so each driver's laps are in order
     lapData = {}
-    for row in rows:
-        fullName = f"{row['forename']} {row['surname']}"
+    for forename, surname, lap, time_text in rows:
+        fullName = f"{forename} {surname}"
         if fullName not in lapData:
             lapData[fullName] = {
                 "driverName": fullName,
                 "laps": []
             }
-        lapData[fullName]["laps"].append({
-            "lap": row["lap"],
-            "time": row["time"]
-        })
-    for driver in lapData:
-        lapData[driver]["laps"].sort(key=lambda x: x["lap"])
+        lapData[fullName]["laps"].append({"lap": lap, "time": time_text})
 
     return jsonify({
         "season": season,
@@ -1411,10 +2848,10 @@ def head_to_head_constructors(season):
     result_array = [h2h_data[k] for k in sorted(h2h_data.keys())]
     return jsonify(result_array)
 
-# 🔹 25. Get AI insights based on standings data
-@app.route('/api/ai/insights', methods=['POST'])
-def ai_insights():
-    payload = request.get_json()
+AI_MODEL = "gpt-4o-mini"
+
+def insights_messages(payload):
+    """Chat messages for /api/ai/insights."""
     season = payload.get("season")
     insight_type = payload.get("type")       
     user_query = payload.get("query")
@@ -1428,25 +2865,14 @@ def ai_insights():
 
     data_str = json.dumps(standings_data)
 
-    try:
-        response = openai.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user",   "content": f"Here is the data:\n{data_str}"},
-                {"role": "user",   "content": f"Question: {user_query}"}
-            ]
-        )
-        answer = response.choices[0].message.content
-    except Exception as e:
-        return jsonify({"response": f"Error generating insights: {e}"}), 500
-
-    return jsonify({"response": answer})
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user",   "content": f"Here is the data:\n{data_str}"},
+        {"role": "user",   "content": f"Question: {user_query}"}
+    ]
 
-# 🔹 26. Get AI insights based on race data
-@app.route('/api/ai/raceInsights', methods=['POST'])
-def race_insights():
-    payload = request.get_json()
+def race_insights_messages(payload):
+    """Chat messages for /api/ai/raceInsights."""
     season = payload['season']
     round_ = payload['round']
     user_q = payload['query']
@@ -1458,16 +2884,40 @@ def race_insights():
         "Answer the user's question with insightful commentary."
     )
 
-    messages = [
+    return [
         { "role": "system", "content": system_prompt },
         { "role": "user",   "content": "Here is the data:\n" + json.dumps(data) },
         { "role": "user",   "content": "Question: " + user_q }
     ]
 
+# 🔹 25. Get AI insights based on standings data
+@app.route('/api/ai/insights', methods=['POST'])
+def ai_insights():
+    payload = request.get_json()
+
+    try:
+        response = openai.chat.completions.create(
+            model=AI_MODEL,
+            messages=insights_messages(payload),
+            timeout=remaining_seconds()
+        )
+        answer = response.choices[0].message.content
+    except Exception as e:
+        return jsonify({"response": f"Error generating insights: {e}"}), 500
+
+    return jsonify({"response": answer})
+
+# 🔹 26. Get AI insights based on race data
+@app.route('/api/ai/raceInsights', methods=['POST'])
+def race_insights():
+    payload = request.get_json()
+    messages = race_insights_messages(payload)
+
     try:
         response = openai.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=messages
+            model=AI_MODEL,
+            messages=messages,
+            timeout=remaining_seconds()
         )
         ans = response.choices[0].message.content
     except Exception as e:
@@ -1476,47 +2926,1096 @@ def race_insights():
     return jsonify({ "response": ans })
 
 # 🔹 27. Average grid-vs-finish data for a whole season
+GRID_VS_FINISH = statement("grid_vs_finish", """
+    SELECT d.driverId,
+           CONCAT(d.forename,' ',d.surname)   AS driverName,
+           AVG(NULLIF(res.grid,0))            AS avgGrid,
+           AVG(
+               CASE
+                 WHEN res.position REGEXP '^[0-9]+$'
+                 THEN res.position+0
+               END
+           )                                  AS avgFinish,
+           COUNT(*)                           AS racesCnt
+    FROM results  res
+    JOIN races    r  ON res.raceId  = r.raceId
+    JOIN drivers  d  ON res.driverId = d.driverId
+    WHERE r.year = %s
+    GROUP BY d.driverId
+    HAVING racesCnt > 0
+    ORDER BY avgGrid ASC
+""")
+
 @app.route('/api/f1/<int:season>/gridVsFinish.json')
 def grid_vs_finish(season):
     conn = get_db_connection()
-    cur  = conn.cursor(dictionary=True)
-    cur.execute("""
-        SELECT d.driverId,
-               CONCAT(d.forename,' ',d.surname)   AS driverName,
-               AVG(NULLIF(res.grid,0))            AS avgGrid,
-               AVG(
-                   CASE
-                     WHEN res.position REGEXP '^[0-9]+$'
-                     THEN res.position+0
-                   END
-               )                                  AS avgFinish,
-               COUNT(*)                           AS racesCnt
-        FROM results  res
-        JOIN races    r  ON res.raceId  = r.raceId
-        JOIN drivers  d  ON res.driverId = d.driverId
-        WHERE r.year = %s
-        GROUP BY d.driverId
-        HAVING racesCnt > 0
-        ORDER BY avgGrid ASC
-    """, (season,))
-    rows = cur.fetchall()
-    cur.close()
+    rows = conn.fetch_prepared(GRID_VS_FINISH, (season,))
     conn.close()
 
     cleaned = []
-    for row in rows:
-        if row["avgGrid"] is None or row["avgFinish"] is None:
+    for driver_id, driver_name, avg_grid, avg_finish, races_cnt in rows:
+        if avg_grid is None or avg_finish is None:
             continue        # skip drivers with no valid numeric data
         cleaned.append({
-            "driverId":   row["driverId"],
-            "driverName": row["driverName"],
-            "avgGrid":    float(row["avgGrid"]),
-            "avgFinish":  float(row["avgFinish"]),
-            "races":      int(row["racesCnt"])
+            "driverId":   driver_id,
+            "driverName": driver_name,
+            "avgGrid":    float(avg_grid),
+            "avgFinish":  float(avg_finish),
+            "races":      int(races_cnt)
+        })
+
+    fmt = negotiate_columnar_format()
+    if fmt != "json":
+        return columnar_response(fmt, f"gridVsFinish-{season}", {
+            column: [entry[column] for entry in cleaned]
+            for column in ("driverId", "driverName", "avgGrid", "avgFinish", "races")
         })
 
     return jsonify({"season": season, "data": cleaned})
 
+# 🔹 28. Run several /api/f1 reads in one request
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", 20))
+
+@app.route('/api/f1/batch', methods=['POST'])
+def batch_requests():
+    """
+    Body:
+      {"requests": [
+          "/api/f1/2023/5/results.json",
+          {"path": "/api/f1/2023/5/driverResults.json", "args": {"session": "sprint"}}
+      ]}
+    Every sub-request runs on one shared DB connection and the responses
+    come back in the same order, e.g.
+      {"responses": [{"path": ..., "status": 200, "body": {...}}, ...]}
+    """
+    payload = request.get_json(silent=True) or {}
+    if not isinstance(payload, dict):
+        return jsonify({"error": "Body must be a JSON object with a requests array"}), 400
+    sub_requests = payload.get("requests")
+
+    if not isinstance(sub_requests, list) or not sub_requests:
+        return jsonify({"error": "requests must be a non-empty array"}), 400
+    if len(sub_requests) > BATCH_MAX_REQUESTS:
+        return jsonify({"error": f"At most {BATCH_MAX_REQUESTS} requests per batch"}), 400
+
+    parsed = []
+    for item in sub_requests:
+        if isinstance(item, str):
+            path, args = item, {}
+        elif isinstance(item, dict):
+            path, args = item.get("path"), item.get("args") or {}
+        else:
+            path, args = None, {}
+
+        if not isinstance(path, str) or not path.startswith('/api/f1/') or not isinstance(args, dict):
+            return jsonify({"error": f"Invalid batch entry: {item!r}"}), 400
+        if '?' in path and args:
+            return jsonify({"error": f"Use either a query string or args, not both: {path}"}), 400
+        if path.split('?', 1)[0] == '/api/f1/batch':
+            return jsonify({"error": "Batches can't be nested"}), 400
+        parsed.append((path, args))
+
+    connection = get_db_connection()
+    g.shared_connection = SharedConnection(connection)
+
+    responses = []
+    try:
+        for path, args in parsed:
+            responses.append(run_internal_request(path, args))
+    finally:
+        g.pop("shared_connection", None)
+        connection.close()
+
+    return jsonify({"responses": responses})
+
+def run_internal_request(path, args=None, warming=False):
+    """
+    Dispatch a GET for `path` through the app and return its status and JSON body.
+    `warming` marks a cache warm-up request, which skips admission control.
+    """
+    deadline = request_deadline()
+    profile = current_profile()
+    environ = {"f1.cache_warm": True} if warming else {}
+    if deadline is not None:
+        environ["f1.parent_deadline"] = deadline
+    if profile is not None:
+        environ["f1.profile"] = profile  # sub-request queries join the batch's SQL timeline
+    with app.test_request_context(path, method='GET', query_string=args or None, environ_base=environ or None):
+        try:
+            response = app.full_dispatch_request()
+        except Exception:
+            # Same as a top-level 500: logged with its traceback, no details in the body
+            app.log_exception(sys.exc_info())
+            return {"path": path, "status": 500, "body": {"error": "Internal Server Error"}}
+
+        return {
+            "path": path,
+            "status": response.status_code,
+            "body": response.get_json(silent=True)
+        }
+
+# 🔹 29. Accent-insensitive driver/constructor search
+#     /api/f1/search.json?q=raikkonen&type=drivers&limit=10
+# Letters NFKD doesn't decompose into base + accent
+FOLD_EXTRA = str.maketrans({"ø": "o", "ł": "l", "đ": "d", "æ": "ae", "œ": "oe", "ı": "i"})
+
+def fold_name(text):
+    """Lower-case, accent-free form of a name: 'Räikkönen' -> 'raikkonen'."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return stripped.casefold().translate(FOLD_EXTRA)
+
+def name_tokens(text):
+    return re.findall(r"[^\W_]+", fold_name(text))
+
+class NameSearchIndex:
+    """
+    Prefix index over folded name tokens. Every prefix of every token maps to
+    the entries containing it, so a lookup is one dict hit per query token.
+    """
+    def __init__(self, entries):
+        self.entries = entries
+        self.prefixes = {}
+        for idx, entry in enumerate(entries):
+            entry["folded"] = " ".join(name_tokens(entry["name"]))
+            entry["tokens"] = set(entry["folded"].split()) | set(name_tokens(entry["ref"]))
+            for token in entry["tokens"]:
+                for end in range(1, len(token) + 1):
+                    self.prefixes.setdefault(token[:end], set()).add(idx)
+
+    def search(self, query, kinds, limit):
+        tokens = name_tokens(query)
+        if not tokens:
+            return []
+
+        candidates = None
+        for token in tokens:
+            matches = self.prefixes.get(token, set())
+            candidates = matches if candidates is None else candidates & matches
+            if not candidates:
+                return []
+
+        folded_query = " ".join(tokens)
+        ranked = []
+        for idx in candidates:
+            entry = self.entries[idx]
+            if entry["type"] not in kinds:
+                continue
+            if entry["folded"] == folded_query:
+                score = 0       # exact name
+            elif all(token in entry["tokens"] for token in tokens):
+                score = 1       # every word matches a whole word
+            elif entry["folded"].startswith(folded_query):
+                score = 2       # name starts with the query
+            else:
+                score = 3       # word prefixes
+            ranked.append((score, len(entry["folded"]), entry["folded"], entry))
+
+        ranked.sort(key=lambda item: item[:3])
+        return [
+            {"type": entry["type"], entry["idKey"]: entry["id"], "ref": entry["ref"], "name": entry["name"], "score": score}
+            for score, _, _, entry in ranked[:limit]
+        ]
+
+_search_index = {"index": None, "version": None}
+_search_index_lock = threading.Lock()
+
+def get_search_index():
+    """Build the index on first use and again whenever ingest.py loads new data."""
+    version = loaded_data_version()
+    with _search_index_lock:
+        if _search_index["index"] is None or _search_index["version"] != version:
+            connection = get_db_connection()
+            cursor = connection.cursor(dictionary=True)
+            cursor.execute("SELECT driverId, driverRef, forename, surname FROM drivers")
+            entries = [
+                {"type": "driver", "idKey": "driverId", "id": row["driverId"], "ref": row["driverRef"],
+                 "name": f"{row['forename']} {row['surname']}"}
+                for row in cursor.fetchall()
+            ]
+            cursor.execute("SELECT constructorId, constructorRef, name FROM constructors")
+            entries += [
+                {"type": "constructor", "idKey": "constructorId", "id": row["constructorId"],
+                 "ref": row["constructorRef"], "name": row["name"]}
+                for row in cursor.fetchall()
+            ]
+            cursor.close()
+            connection.close()
+
+            _search_index["index"] = NameSearchIndex(entries)
+            _search_index["version"] = version
+        return _search_index["index"]
+
+def start_search_index_build():
+    """Build the search index in the background, so the first search doesn't pay for it."""
+    def build():
+        with app.app_context():
+            try:
+                get_search_index()
+            except DB_ERRORS:
+                pass  # the first search retries
+
+    threading.Thread(target=build, name="search-index", daemon=True).start()
+
+@app.route('/api/f1/search.json')
+def search_names():
+    query = request.args.get('q', '')
+    kind = request.args.get('type', 'all')
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+
+    kinds = {"drivers": {"driver"}, "constructors": {"constructor"}, "all": {"driver", "constructor"}}.get(kind)
+    if kinds is None:
+        return jsonify({"error": "type must be drivers, constructors or all"}), 400
+
+    matches = get_search_index().search(query, kinds, limit)
+
+    return jsonify({
+        "MRData": {
+            "series": "f1",
+            "query": query,
+            "SearchResults": matches
+        }
+    })
+
+# 🔹 30. Process metrics (admission queues, rejections, ...)
+@app.route('/api/metrics.json')
+def get_metrics():
+    return jsonify({"metrics": metrics.snapshot()})
+
+# 🔹 31. Re-score whole seasons under another points system
+#     /api/f1/rescore.json?startYear=1988&endYear=2008&system=2010
+#     /api/f1/rescore.json?startYear=2008&race=10,6,4,3,2,1&fastestLap=1
+POINTS_SYSTEMS = {
+    "1961": {"race": [9, 6, 4, 3, 2, 1]},
+    "1991": {"race": [10, 6, 4, 3, 2, 1]},
+    "2003": {"race": [10, 8, 6, 5, 4, 3, 2, 1]},
+    "2010": {"race": [25, 18, 15, 12, 10, 8, 6, 4, 2, 1]},
+    "2019": {"race": [25, 18, 15, 12, 10, 8, 6, 4, 2, 1], "fastestLap": 1},
+    "2022": {"race": [25, 18, 15, 12, 10, 8, 6, 4, 2, 1], "sprint": [8, 7, 6, 5, 4, 3, 2, 1], "fastestLap": 1},
+    "2025": {"race": [25, 18, 15, 12, 10, 8, 6, 4, 2, 1], "sprint": [8, 7, 6, 5, 4, 3, 2, 1]},
+}
+
+def resolve_points_system(args):
+    """
+    Named system from ?system= (default: current rules), with ?race=, ?sprint=,
+    ?fastestLap= and ?fastestLapTopN= overriding any part of it.
+    Raises KeyError for an unknown name, ValueError for a malformed list.
+    """
+    system = {"race": [], "sprint": [], "fastestLap": 0, "fastestLapTopN": 10}
+    system.update(POINTS_SYSTEMS[args.get('system', '2025')])
+    for key in ('race', 'sprint'):
+        if key in args:
+            system[key] = [float(p) for p in args[key].split(',') if p.strip()]
+    if 'fastestLap' in args:
+        system["fastestLap"] = float(args['fastestLap'])
+    if 'fastestLapTopN' in args:
+        system["fastestLapTopN"] = int(args['fastestLapTopN'])
+    return system
+
+def score_finishes(positions, table):
+    """Points for each finish under `table` (index 0 = P1); unclassified and out-of-table finishes score 0."""
+    padded = np.zeros(max(int(positions.max(initial=0)), len(table)) + 1)
+    padded[1:len(table) + 1] = table
+    return padded[positions]
+
+@app.route('/api/f1/rescore.json')
+def rescore_seasons():
+    """
+    Driver and constructor standings for every season in [startYear, endYear] as if
+    they had been scored under another points system. Every classified car counts
+    towards its constructor; historical dropped-score rules are not applied.
+    Ties are broken by countback through compute_standings.
+    """
+    try:
+        start_year = int(request.args.get('startYear', request.args.get('season', 0)))
+        end_year = int(request.args.get('endYear', start_year))
+        system = resolve_points_system(request.args)
+    except KeyError:
+        return jsonify({"error": f"Unknown points system; choose one of {', '.join(POINTS_SYSTEMS)}"}), 400
+    except ValueError:
+        return jsonify({"error": "startYear/endYear must be integers and points lists comma-separated numbers"}), 400
+    if not start_year:
+        return jsonify({"error": "startYear is required"}), 400
+
+    connection = get_db_connection()
+    cursor = connection.cursor(dictionary=True)
+
+    cursor.execute("""
+        SELECT r.year, r.round, res.driverId, res.constructorId, res.position, res.`rank` AS fastestLapRank
+        FROM results res
+        JOIN races r ON res.raceId = r.raceId
+        WHERE r.year BETWEEN %s AND %s
+    """, (start_year, end_year))
+    race_rows = cursor.fetchall()
+
+    sprint_rows = []
+    if system["sprint"]:
+        cursor.execute("""
+            SELECT r.year, r.round, sr.driverId, sr.constructorId, sr.position
+            FROM sprintresults sr
+            JOIN races r ON sr.raceId = r.raceId
+            WHERE r.year BETWEEN %s AND %s
+        """, (start_year, end_year))
+        sprint_rows = cursor.fetchall()
+
+    cursor.execute("""
+        SELECT DISTINCT d.driverId, d.forename, d.surname
+        FROM results res
+        JOIN races r   ON res.raceId   = r.raceId
+        JOIN drivers d ON res.driverId = d.driverId
+        WHERE r.year BETWEEN %s AND %s
+    """, (start_year, end_year))
+    drivers = {row["driverId"]: row for row in cursor.fetchall()}
+
+    cursor.execute("""
+        SELECT DISTINCT c.constructorId, c.name
+        FROM results res
+        JOIN races r        ON res.raceId        = r.raceId
+        JOIN constructors c ON res.constructorId = c.constructorId
+        WHERE r.year BETWEEN %s AND %s
+    """, (start_year, end_year))
+    constructors = {row["constructorId"]: row["name"] for row in cursor.fetchall()}
+
+    cursor.close()
+    connection.close()
+
+    # One flat column per attribute over every race and sprint finish in the range
+    race_positions = finish_positions(race_rows)
+    race_points = score_finishes(race_positions, system["race"])
+    if system["fastestLap"]:
+        fastest = np.array([str(row["fastestLapRank"]) == "1" for row in race_rows], dtype=bool)
+        eligible = fastest & (race_positions >= 1) & (race_positions <= system["fastestLapTopN"])
+        race_points = race_points + system["fastestLap"] * eligible
+
+    rows = race_rows + sprint_rows
+    sprint_positions = finish_positions(sprint_rows)
+    points = np.concatenate([race_points, score_finishes(sprint_positions, system["sprint"])])
+    # sprint wins don't count as wins
+    positions = np.concatenate([race_positions, np.zeros(len(sprint_rows), dtype=int)])
+    years = np.array([row["year"] for row in rows], dtype=int)
+    rounds = np.array([row["round"] for row in rows], dtype=int)
+    driver_ids = np.array([row["driverId"] for row in rows], dtype=int)
+    constructor_ids = np.array([row["constructorId"] for row in rows], dtype=int)
+
+    seasons = []
+    for season in np.unique(years).tolist():
+        check_deadline()
+        in_season = years == season
+        driver_standings = standings_at(compute_standings(
+            rounds[in_season], driver_ids[in_season], points[in_season], positions[in_season]
+        ))
+        constructor_standings = standings_at(compute_standings(
+            rounds[in_season], constructor_ids[in_season], points[in_season], positions[in_season]
+        ))
+        seasons.append({
+            "season": str(season),
+            "DriverStandings": [
+                {
+                    "position": str(i),
+                    "points": pts,
+                    "wins": wins,
+                    "Driver": {
+                        "driverId": d_id,
+                        "givenName": drivers[d_id]["forename"],
+                        "familyName": drivers[d_id]["surname"]
+                    }
+                }
+                for d_id, i, pts, wins in driver_standings
+            ],
+            "ConstructorStandings": [
+                {
+                    "position": str(i),
+                    "points": pts,
+                    "wins": wins,
+                    "Constructor": {"constructorId": c_id, "name": constructors[c_id]}
+                }
+                for c_id, i, pts, wins in constructor_standings
+            ]
+        })
+
+    return jsonify({
+        "MRData": {
+            "series": "f1",
+            "PointsSystem": system,
+            "StandingsTable": {
+                "startYear": str(start_year),
+                "endYear": str(end_year),
+                "StandingsLists": seasons
+            }
+        }
+    })
+
+# 🔹 32. Bulk export of whole tables or season ranges, streamed
+#     /api/f1/export/results.ndjson?startYear=1950&endYear=2024
+#     /api/f1/export/laptimes.csv?startYear=2023
+#     /api/f1/export/laptimes.parquet?startYear=2023       (Arrow/Parquet need pyarrow)
+#     /api/f1/2023/export/results   + Accept: application/vnd.apache.arrow.stream
+EXPORT_TABLES = {
+    # name in the URL => (table, alias)
+    "results":              ("results",              "res"),
+    "qualifying":           ("qualifying",           "q"),
+    "sprint":               ("sprintresults",        "sr"),
+    "laptimes":             ("laptimes",             "lt"),
+    "driverStandings":      ("driverstandings",      "ds"),
+    "constructorStandings": ("constructorstandings", "cs"),
+}
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+COLUMNAR_FORMATS = {
+    "arrow":   "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", 5000))
+# Arrow/Parquet files are written here once per (table, years, data version) and reused
+EXPORT_CACHE_DIR = os.getenv("EXPORT_CACHE_DIR", "export_cache")
+EXPORT_CACHE_MAX_FILES = int(os.getenv("EXPORT_CACHE_MAX_FILES", 64))
+EXPORT_CACHE_MAX_BYTES = int(os.getenv("EXPORT_CACHE_MAX_BYTES", 2 * 1024 * 1024 * 1024))
+
+def get_export_connection(streamed=False):
+    """
+    A connection of its own: a half-read unbuffered cursor must never go back to the pool.
+    A `streamed` one is read after the view returns, so the stream closes it rather
+    than the request teardown, and it runs without the request deadline.
+    """
+    if DB_BACKEND == "sqlite":
+        connection = EmbeddedConnection(EMBEDDED_DB_PATH)
+    else:
+        connection = mysql.connector.connect(**mysql_config())
+    return ManagedConnection(connection, enforce_deadline=not streamed, request_scoped=not streamed)
+
+def open_export(table, start_year, end_year, streamed=False):
+    """
+    Start the export query on an unbuffered cursor.
+    Returns (column names, generator of EXPORT_CHUNK_ROWS-row tuple batches); only one
+    batch is in memory at a time and the connection closes when the generator ends.
+    A `streamed` export is read at the client's pace, so its query runs without
+    the request deadline; a columnar build stays within it.
+    """
+    source, alias = EXPORT_TABLES[table]
+    connection = get_export_connection(streamed)
+    cursor = connection.cursor()
+    cursor.execute(f"""
+        SELECT r.year, r.round, {alias}.*
+        FROM {source} {alias}
+        JOIN races r ON {alias}.raceId = r.raceId
+        WHERE r.year BETWEEN %s AND %s
+        ORDER BY r.year, r.round
+    """, (start_year, end_year))
+    columns = [column[0] for column in cursor.description]
+
+    def batches():
+        try:
+            while True:
+                rows = cursor.fetchmany(EXPORT_CHUNK_ROWS)
+                if not rows:
+                    return
+                yield rows
+        finally:
+            try:
+                cursor.close()
+            except DB_ERRORS:
+                pass  # client went away mid-stream, rows left unread
+            connection.close()
+
+    return columns, batches()
+
+def ndjson_chunks(columns, batches):
+    for rows in batches:
+        yield "".join(json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in rows)
+
+def csv_chunks(columns, batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+    for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue()
+
+def column_array(pa, values, arrow_type):
+    """One column of a batch as `arrow_type`; strings absorb values of mixed type (SQLite)."""
+    try:
+        return pa.array(values, type=arrow_type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        if arrow_type != pa.string():
+            raise
+        return pa.array([None if v is None else str(v) for v in values], type=arrow_type)
+
+def column_buffer(pa, rows, index, arrow_type):
+    """
+    Column `index` of a batch of tuples as `arrow_type`. Numbers are copied into a
+    typed NumPy buffer plus a NULL mask, which Arrow takes without boxing each value.
+    """
+    if pa.types.is_integer(arrow_type) or pa.types.is_floating(arrow_type):
+        dtype, kinds = (np.int64, int) if pa.types.is_integer(arrow_type) else (np.float64, (int, float))
+        # NumPy would quietly truncate 1.5 or parse '7'; values of another type (SQLite) go to column_array
+        if all(row[index] is None or isinstance(row[index], kinds) for row in rows):
+            nulls = np.fromiter((row[index] is None for row in rows), dtype=bool, count=len(rows))
+            values = np.fromiter((0 if row[index] is None else row[index] for row in rows),
+                                 dtype=dtype, count=len(rows))
+            return pa.array(values, type=arrow_type, mask=nulls if nulls.any() else None)
+    return column_array(pa, [row[index] for row in rows], arrow_type)
+
+def write_columnar(columns, batches, fmt, path):
+    """
+    Write tuple batches straight into Arrow record batches, column by column, and
+    out to an Arrow IPC stream or Parquet file. The schema comes from the first
+    batch, with all-NULL columns typed as strings.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = writer = sink = None
+
+    def open_writer(schema):
+        nonlocal sink
+        if fmt == "parquet":
+            return pq.ParquetWriter(path, schema)
+        sink = pa.OSFile(path, "wb")
+        return pa.ipc.new_stream(sink, schema)
+
+    try:
+        for rows in batches:
+            if schema is None:
+                inferred = [pa.array([row[i] for row in rows]).type for i in range(len(columns))]
+                schema = pa.schema([
+                    pa.field(name, pa.string() if pa.types.is_null(arrow_type) else arrow_type)
+                    for name, arrow_type in zip(columns, inferred)
+                ])
+                writer = open_writer(schema)
+            batch = pa.RecordBatch.from_arrays(
+                [column_buffer(pa, rows, i, field.type) for i, field in enumerate(schema)], schema=schema
+            )
+            if fmt == "parquet":
+                writer.write_table(pa.Table.from_batches([batch]))
+            else:
+                writer.write_batch(batch)
+        if writer is None:
+            # no rows: still a valid, empty file with the column names
+            writer = open_writer(pa.schema([pa.field(name, pa.string()) for name in columns]))
+    finally:
+        if writer is not None:
+            writer.close()
+        if sink is not None:
+            sink.close()
+
+def cached_columnar_export(table, start_year, end_year, fmt):
+    """Path of the Arrow/Parquet file for this export, building it on first request."""
+    version = loaded_data_version()
+    path = os.path.join(EXPORT_CACHE_DIR, f"{table}-{start_year}-{end_year}-v{version}.{fmt}")
+    if os.path.exists(path):
+        metrics.incr("export.disk_cache.hit")
+        os.utime(path)  # mtime is the LRU clock for prune_export_cache
+        return path
+
+    metrics.incr("export.disk_cache.miss")
+    os.makedirs(EXPORT_CACHE_DIR, exist_ok=True)
+    columns, batches = open_export(table, start_year, end_year)
+    partial = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        write_columnar(columns, batches, fmt, partial)
+        os.replace(partial, path)  # atomic: concurrent builders just overwrite each other
+    finally:
+        batches.close()
+        if os.path.exists(partial):
+            os.remove(partial)
+    prune_export_cache(version)
+    return path
+
+def prune_export_cache(version):
+    """
+    Delete exports built from other data versions, then the least recently used
+    ones until EXPORT_CACHE_DIR is within EXPORT_CACHE_MAX_FILES and _MAX_BYTES.
+    """
+    current = f"-v{version}."
+    kept = []
+    for name in os.listdir(EXPORT_CACHE_DIR):
+        path = os.path.join(EXPORT_CACHE_DIR, name)
+        if name.endswith(".tmp"):
+            continue  # still being written
+        try:
+            if current not in name:
+                os.remove(path)
+                metrics.incr("export.disk_cache.evicted")
+                continue
+            stat = os.stat(path)
+        except OSError:
+            continue  # another worker got there first
+        kept.append((stat.st_mtime, stat.st_size, path))
+
+    kept.sort(reverse=True)  # most recently used first
+    total = 0
+    for i, (_, size, path) in enumerate(kept):
+        total += size
+        if i >= EXPORT_CACHE_MAX_FILES or total > EXPORT_CACHE_MAX_BYTES:
+            try:
+                os.remove(path)
+                metrics.incr("export.disk_cache.evicted")
+            except OSError:
+                pass
+
+def season_range():
+    """(first, last) season in races, or None if there are none."""
+    connection = get_db_connection()
+    cursor = connection.cursor()
+    cursor.execute("SELECT MIN(year), MAX(year) FROM races")
+    first, last = cursor.fetchone()
+    cursor.close()
+    connection.close()
+    return (first, last) if first is not None else None
+
+def negotiate_export_format():
+    """Pick a format from the Accept header; NDJSON unless something else is preferred."""
+    offered = {**EXPORT_FORMATS, **COLUMNAR_FORMATS}
+    best = request.accept_mimetypes.best_match(list(offered.values()), default=EXPORT_FORMATS["ndjson"])
+    return next(fmt for fmt, mimetype in offered.items() if mimetype == best)
+
+# The season tables below also answer in Arrow or Parquet when the Accept header
+# prefers it, as one flat row per entry of what the JSON nests
+COLUMNAR_ROUTES = {
+    "get_all_driver_standings", "get_all_constructor_standings",
+    "get_driver_results_table", "get_constructor_results_table", "grid_vs_finish",
+}
+
+def negotiate_columnar_format():
+    """Pick json, arrow or parquet from the Accept header; JSON wins ties and */*."""
+    offered = {"json": "application/json", **COLUMNAR_FORMATS}
+    best = request.accept_mimetypes.best_match(list(offered.values()), default=offered["json"])
+    return next(fmt for fmt, mimetype in offered.items() if mimetype == best)
+
+def columnar_response(fmt, name, columns):
+    """
+    `columns` (name => NumPy array or list) as an Arrow IPC stream or Parquet file
+    download called `name`.`fmt`.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        return jsonify({"error": "Arrow and Parquet responses need pyarrow installed"}), 406
+    table = pa.table({column: pa.array(values) for column, values in columns.items()})
+    sink = pa.BufferOutputStream()
+    if fmt == "parquet":
+        pq.write_table(table, sink)
+    else:
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    response = app.response_class(sink.getvalue().to_pybytes(), mimetype=COLUMNAR_FORMATS[fmt])
+    response.headers["Content-Disposition"] = f'attachment; filename="{name}.{fmt}"'
+    return response
+
+@app.after_request
+def vary_on_accept(response):
+    if request.endpoint in COLUMNAR_ROUTES:
+        response.vary.add("Accept")
+    return response
+
+@app.route('/api/f1/export/<table>.<fmt>')
+@app.route('/api/f1/export/<table>', defaults={"fmt": None})
+@app.route('/api/f1/<int:season>/export/<table>', defaults={"fmt": None})
+def export_table(table, fmt, season=None):
+    if fmt is None and '.' in table:
+        table, fmt = table.rsplit('.', 1)
+    if fmt is None:
+        fmt = negotiate_export_format()
+    if table not in EXPORT_TABLES:
+        return jsonify({"error": f"Unknown table; choose one of {', '.join(EXPORT_TABLES)}"}), 404
+    if fmt not in EXPORT_FORMATS and fmt not in COLUMNAR_FORMATS:
+        formats = ", ".join([*EXPORT_FORMATS, *COLUMNAR_FORMATS])
+        return jsonify({"error": f"Unknown format; choose one of {formats}"}), 404
+    try:
+        if season is not None:
+            start_year = end_year = season
+        else:
+            start_year = int(request.args.get('startYear', 1950))
+            end_year = int(request.args.get('endYear', request.args.get('startYear', 2050)))
+    except ValueError:
+        return jsonify({"error": "startYear and endYear must be integers"}), 400
+
+    # Clamp to the seasons that exist, so every out-of-range variant maps to one cached file
+    seasons = season_range()
+    if seasons is not None:
+        start_year, end_year = max(start_year, seasons[0]), min(end_year, seasons[1])
+    if seasons is None or start_year > end_year:
+        return jsonify({"error": "No seasons in that range"}), 404
+
+    filename = f"{table}-{start_year}-{end_year}.{fmt}"
+    if fmt in COLUMNAR_FORMATS:
+        try:
+            path = cached_columnar_export(table, start_year, end_year, fmt)
+        except ImportError:
+            return jsonify({"error": "Arrow and Parquet exports need pyarrow installed"}), 406
+        return send_file(path, mimetype=COLUMNAR_FORMATS[fmt], as_attachment=True, download_name=filename)
+
+    columns, batches = open_export(table, start_year, end_year, streamed=True)
+    chunks = ndjson_chunks if fmt == "ndjson" else csv_chunks
+
+    # No Content-Length: the body goes out with chunked transfer encoding as it's read
+    response = Response(stream_with_context(chunks(columns, batches)), mimetype=EXPORT_FORMATS[fmt])
+    response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+# 🔹 33. Season-wide qualifying pace per driver
+#     /api/f1/2023/qualifyingPace.json
+@app.route('/api/f1/<int:season>/qualifyingPace.json')
+def qualifying_pace(season):
+    """
+    Per driver over the season's qualifying sessions:
+      medianGapPct      - median of (best lap / fastest best lap of the weekend - 1) * 100
+      medianTeammateMs  - median gap to the team-mate in the last session both set a time in
+      aheadOfTeammate   - weekends where that gap was negative
+    """
+    connection = get_db_connection()
+    cursor = connection.cursor(dictionary=True)
+    query = """
+        SELECT r.round, q.driverId, q.constructorId, q.q1, q.q2, q.q3, {}
+               d.forename, d.surname
+        FROM qualifying q
+        JOIN races r   ON q.raceId   = r.raceId
+        JOIN drivers d ON q.driverId = d.driverId
+        WHERE r.year = %s
+        ORDER BY r.round
+    """
+    try:
+        cursor.execute(query.format("q.q1_ms, q.q2_ms, q.q3_ms, q.best_ms,"), (season,))
+        rows = cursor.fetchall()
+    except DB_ERRORS:
+        # q*_ms not added yet (python ingest.py); parse the time strings instead
+        cursor.execute(query.format(""), (season,))
+        rows = derive_qualifying_ms(cursor.fetchall())
+    cursor.close()
+    connection.close()
+
+    by_round = {}
+    for row in rows:
+        by_round.setdefault(row["round"], []).append(row)
+
+    pace = {}  # driverId => {"gapPct": [...], "teammateMs": [...]}
+    for round_rows in by_round.values():
+        gaps = qualifying_gaps(round_rows)
+        best = np.array([np.nan if row["best_ms"] is None else row["best_ms"] for row in round_rows], dtype=float)
+        gap_pct = (best / np.nanmin(best) - 1) * 100 if (~np.isnan(best)).any() else best
+
+        # deepest session in which both team-mates set a time
+        to_teammate = np.full(len(round_rows), np.nan)
+        for session in reversed(QUALIFYING_SESSIONS):
+            to_teammate = np.where(np.isnan(to_teammate), gaps[session][3], to_teammate)
+
+        for row, pct, delta in zip(round_rows, gap_pct, to_teammate):
+            entry = pace.setdefault(row["driverId"], {
+                "driverId": row["driverId"],
+                "givenName": row["forename"],
+                "familyName": row["surname"],
+                "gapPct": [],
+                "teammateMs": []
+            })
+            if not np.isnan(pct):
+                entry["gapPct"].append(pct)
+            if not np.isnan(delta):
+                entry["teammateMs"].append(delta)
+
+    drivers = []
+    for entry in pace.values():
+        gap_pct, teammate_ms = entry.pop("gapPct"), entry.pop("teammateMs")
+        if not gap_pct:
+            continue
+        entry["sessions"] = len(gap_pct)
+        entry["medianGapPct"] = round(float(np.median(gap_pct)), 3)
+        entry["medianTeammateMs"] = int(np.median(teammate_ms)) if teammate_ms else None
+        entry["aheadOfTeammate"] = sum(1 for delta in teammate_ms if delta < 0)
+        entry["teammateComparisons"] = len(teammate_ms)
+        drivers.append(entry)
+    drivers.sort(key=lambda d: d["medianGapPct"])
+
+    return jsonify({"season": season, "QualifyingPace": drivers})
+
+# 🔹 34. A whole race weekend in one payload: qualifying, sprint, race, start/finish
+#     Sessions refer to drivers/constructors by id; each appears once under Drivers/Constructors.
+WEEKEND_RACE = statement("weekend_race", """
+    SELECT r.raceId, r.name, r.date, c.name AS circuitName
+    FROM races r
+    JOIN circuits c ON r.circuitId = c.circuitId
+    WHERE r.year = %s AND r.round = %s
+""")
+WEEKEND_QUALIFYING = statement("weekend_qualifying", """
+    SELECT driverId, constructorId, position, q1, q2, q3
+    FROM qualifying
+    WHERE raceId = %s
+    ORDER BY position
+""")
+WEEKEND_SPRINT = statement("weekend_sprint", """
+    SELECT sr.driverId, sr.constructorId, sr.grid, sr.position, sr.points, COALESCE(s.status, 'Unknown')
+    FROM sprintresults sr
+    LEFT JOIN status s ON sr.statusId = s.statusId
+    WHERE sr.raceId = %s
+    ORDER BY sr.positionOrder
+""")
+WEEKEND_RACE_RESULTS = statement("weekend_race_results", """
+    SELECT res.driverId, res.constructorId, res.grid, res.position, res.points, COALESCE(s.status, 'Unknown')
+    FROM results res
+    LEFT JOIN status s ON res.statusId = s.statusId
+    WHERE res.raceId = %s
+    ORDER BY res.positionOrder
+""")
+
+def session_results(rows):
+    return [
+        {
+            "driverId": driver_id,
+            "constructorId": constructor_id,
+            "grid": grid,
+            "position": position,
+            "points": points,
+            "status": status
+        }
+        for driver_id, constructor_id, grid, position, points, status in rows
+    ]
+
+@app.route('/api/f1/<int:season>/<int:round>/weekend.json')
+def get_weekend(season, round):
+    connection = get_db_connection()
+    race = connection.fetch_prepared(WEEKEND_RACE, (season, round))
+    if not race:
+        connection.close()
+        return jsonify({"error": "No such race"}), 404
+    race_id, race_name, race_date, circuit_name = race[0]
+
+    qualifying = connection.fetch_prepared(WEEKEND_QUALIFYING, (race_id,))
+    sprint = connection.fetch_prepared(WEEKEND_SPRINT, (race_id,))
+    race_results = connection.fetch_prepared(WEEKEND_RACE_RESULTS, (race_id,))
+
+    driver_ids = sorted({row[0] for rows in (qualifying, sprint, race_results) for row in rows})
+    constructor_ids = sorted({row[1] for rows in (qualifying, sprint, race_results) for row in rows})
+    drivers, constructors = {}, {}
+    cursor = connection.cursor()
+    if driver_ids:
+        cursor.execute(f"""
+            SELECT driverId, forename, surname, code
+            FROM drivers
+            WHERE driverId IN ({", ".join(["%s"] * len(driver_ids))})
+        """, driver_ids)
+        drivers = {
+            d_id: {"driverId": d_id, "givenName": forename, "familyName": surname, "code": code}
+            for d_id, forename, surname, code in cursor.fetchall()
+        }
+    if constructor_ids:
+        cursor.execute(f"""
+            SELECT constructorId, name
+            FROM constructors
+            WHERE constructorId IN ({", ".join(["%s"] * len(constructor_ids))})
+        """, constructor_ids)
+        constructors = {c_id: {"constructorId": c_id, "name": name} for c_id, name in cursor.fetchall()}
+    cursor.close()
+    connection.close()
+
+    # Same rules as startFinish.json: classified finishers only, grid 0 (pit lane) counts as 0
+    start_finish = [
+        {
+            "driverId": driver_id,
+            "startPosition": int(grid or 0),
+            "finishPosition": int(position),
+            "positionChange": int(grid or 0) - int(position)
+        }
+        for driver_id, _, grid, position, _, _ in race_results if str(position).isdigit()
+    ]
+
+    return jsonify({
+        "MRData": {
+            "series": "f1",
+            "Weekend": {
+                "season": str(season),
+                "round": str(round),
+                "raceId": race_id,
+                "raceName": race_name,
+                "date": str(race_date),
+                "Circuit": {"circuitName": circuit_name},
+                "Drivers": drivers,
+                "Constructors": constructors,
+                "Qualifying": [
+                    {
+                        "driverId": driver_id,
+                        "constructorId": constructor_id,
+                        "position": position,
+                        "q1": q1 or "N/A",
+                        "q2": q2 or "N/A",
+                        "q3": q3 or "N/A"
+                    }
+                    for driver_id, constructor_id, position, q1, q2, q3 in qualifying
+                ],
+                "Sprint": session_results(sprint),
+                "Race": session_results(race_results),
+                "StartFinish": start_finish
+            }
+        }
+    })
+
+# 🔹 35. Download request profiles (see ProfilingMiddleware); needs X-F1-Profile: <PROFILE_TOKEN>
+#     /api/profiles.json
+#     /api/profiles/1760870400000-1a2b3c4d.json?format=folded
+def profile_access_error():
+    if not PROFILE_TOKEN:
+        return jsonify({"error": "Profiling is not enabled"}), 404
+    if not profile_token_valid(request.headers.get("X-F1-Profile")):
+        return jsonify({"error": "Missing or invalid X-F1-Profile token"}), 403
+    return None
+
+@app.route('/api/profiles.json')
+def list_profiles():
+    error = profile_access_error()
+    if error:
+        return error
+
+    profiles = []
+    names = sorted(os.listdir(PROFILE_DIR), reverse=True) if os.path.isdir(PROFILE_DIR) else []
+    for name in names:
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(PROFILE_DIR, name), encoding="utf-8") as f:
+                profile = json.load(f)
+        except (OSError, ValueError):
+            continue  # pruned or still being written
+        profiles.append({
+            key: profile[key]
+            for key in ("id", "trigger", "method", "path", "query", "status", "startedAt", "durationMs", "sqlMs")
+        })
+        profiles[-1]["statements"] = len(profile["sql"])
+
+    return jsonify({"profiles": profiles})
+
+@app.route('/api/profiles/<profile_id>.json')
+def get_profile(profile_id):
+    error = profile_access_error()
+    if error:
+        return error
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.json")
+    if not PROFILE_ID.match(profile_id) or not os.path.exists(path):
+        return jsonify({"error": f"No profile {profile_id}"}), 404
+
+    with open(path, encoding="utf-8") as f:
+        profile = json.load(f)
+
+    # Folded stacks, for flamegraph.pl / speedscope
+    if request.args.get('format') == 'folded':
+        folded = "".join(f"{entry['stack']} {entry['samples']}\n" for entry in profile["stacks"])
+        return Response(folded, mimetype="text/plain")
+    return jsonify(profile)
+
+# 🔹 Cache warming: after startup and after every ingest, replay the hot GET routes
+# through the app so the first real visitors hit a filled response cache.
+#     CACHE_WARM_SEASONS="2021,2008"          popular seasons, on top of the current one
+#     CACHE_WARM_ROUNDS="2021/22,2008/18"     popular season/round pairs
+CACHE_WARM_ENABLED = os.getenv("CACHE_WARM", "1") == "1"
+CACHE_WARM_WORKERS = int(os.getenv("CACHE_WARM_WORKERS", 4))
+CACHE_WARM_RECENT_ROUNDS = int(os.getenv("CACHE_WARM_RECENT_ROUNDS", 3))
+CACHE_WARM_CLAIM_SECONDS = int(os.getenv("CACHE_WARM_CLAIM_SECONDS", 600))
+
+def parse_warm_setting(name, parse, example):
+    """Comma-separated values of env var `name`; fails at startup rather than in the warm-up thread."""
+    values = []
+    for item in filter(None, (part.strip() for part in os.getenv(name, "").split(','))):
+        try:
+            values.append(parse(item))
+        except ValueError:
+            raise ValueError(f"{name}: {item!r} is not valid, expected e.g. {example}") from None
+    return values
+
+def parse_season_round(pair):
+    year, round_num = pair.split('/')
+    return int(year), int(round_num)
+
+CACHE_WARM_SEASONS = parse_warm_setting("CACHE_WARM_SEASONS", int, "2021,2008")
+CACHE_WARM_ROUNDS = parse_warm_setting("CACHE_WARM_ROUNDS", parse_season_round, "2021/22,2008/18")
+CACHE_WARM_SEASON_PATHS = [
+    "/api/f1/{season}.json",
+    "/api/f1/{season}/driverResultsTable.json",
+    "/api/f1/{season}/constructorResultsTable.json",
+    "/api/f1/{season}/allDriverStandings.json",
+    "/api/f1/{season}/allDriverStandings.json?format=matrix",
+    "/api/f1/{season}/allConstructorStandings.json",
+    "/api/f1/{season}/allConstructorStandings.json?format=matrix",
+    "/api/f1/{season}/gridVsFinish.json",
+]
+CACHE_WARM_ROUND_PATHS = [
+    "/api/f1/{season}/{round}/weekend.json",
+    "/api/f1/{season}/{round}/results.json",
+    "/api/f1/{season}/{round}/laptimes.json",
+    "/api/f1/{season}/{round}/driverStandings.json",
+    "/api/f1/{season}/{round}/constructorStandings.json",
+]
+_warming = threading.Lock()
+
+def cache_warm_paths():
+    """The current season's tables and latest rounds plus the configured seasons and rounds."""
+    connection = get_db_connection()
+    cursor = connection.cursor()
+    cursor.execute("""
+        SELECT r.year, r.round
+        FROM races r
+        WHERE r.year = (SELECT MAX(year) FROM races WHERE raceId IN (SELECT raceId FROM results))
+          AND r.raceId IN (SELECT raceId FROM results)
+        ORDER BY r.round DESC
+        LIMIT %s
+    """, (CACHE_WARM_RECENT_ROUNDS,))
+    recent = [(int(year), int(round_num)) for year, round_num in cursor.fetchall()]
+    cursor.close()
+    connection.close()
+
+    seasons = {year for year, _ in recent} | set(CACHE_WARM_SEASONS)
+    rounds = set(recent) | set(CACHE_WARM_ROUNDS)
+
+    paths = [p.format(season=season) for season in sorted(seasons) for p in CACHE_WARM_SEASON_PATHS]
+    paths += [p.format(season=y, round=r) for y, r in sorted(rounds) for p in CACHE_WARM_ROUND_PATHS]
+    return paths
+
+def warm_response_cache():
+    """
+    Request every cache_warm_paths() route on a thread pool. Progress is in the
+    cache_warm.* metrics; returns {"paths", "failed", "seconds"}.
+    """
+    if response_cache is None or not _warming.acquire(blocking=False):
+        return None  # nothing to fill, or a warm-up is already running
+    # A shared cache needs filling once per data version, not once per worker
+    if not response_cache.claim(f"warm:{data_version()}", CACHE_WARM_CLAIM_SECONDS):
+        _warming.release()
+        metrics.incr("cache_warm.skipped")
+        return None
+    started = time.monotonic()
+    try:
+        with app.app_context():
+            paths = cache_warm_paths()
+        metrics.set("cache_warm.running", 1)
+        metrics.set("cache_warm.total", len(paths))
+        metrics.set("cache_warm.done", 0)
+        metrics.set("cache_warm.failed", 0)
+
+        def warm(path):
+            route, _, query = path.partition('?')
+            response = run_internal_request(route, dict(p.split('=') for p in query.split('&') if p), warming=True)
+            metrics.incr("cache_warm.done")
+            if response["status"] != 200:
+                metrics.incr("cache_warm.failed")
+            return response["status"]
+
+        with ThreadPoolExecutor(max_workers=CACHE_WARM_WORKERS) as pool:
+            statuses = list(pool.map(warm, paths))
+    finally:
+        metrics.set("cache_warm.running", 0)
+        metrics.set("cache_warm.last_seconds", round(time.monotonic() - started, 3))
+        _warming.release()
+
+    return {
+        "paths": len(paths),
+        "failed": sum(1 for status in statuses if status != 200),
+        "seconds": round(time.monotonic() - started, 3)
+    }
+
+def start_cache_warming():
+    """Run warm_response_cache() in the background."""
+    if response_cache is not None and CACHE_WARM_ENABLED:
+        threading.Thread(target=warm_response_cache, name="cache-warm", daemon=True).start()
+
 #  WHAT IF FEATURES (SAME TABLE (f1data))
 # =====================================================================
 
@@ -1530,7 +4029,7 @@ def create_scenario():
     if not scenario_name or not season:
         return jsonify({"error": "scenarioName and season are required"}), 400
 
-    connection = get_db_connection()
+    connection = get_mysql_connection()
     cursor = connection.cursor()
 
     cursor.execute("""
@@ -1542,9 +4041,115 @@ def create_scenario():
 
     cursor.close()
     connection.close()
+    bump_scenario_revision(scenario_id)  # never match keys left from an earlier use of the id
 
     return jsonify({"scenarioId": scenario_id})
 
+# Scenarios branch off a parent: a clone stores only a parent pointer and its own
+# whatif_results rows, and reads resolve each race along the parent chain.
+# ingest.py adds the column (see its WHATIF_COLUMNS); until it has run, every
+# scenario is a root.
+MYSQL_BAD_FIELD = 1054  # ER_BAD_FIELD_ERROR: unknown column
+
+def is_missing_column(e):
+    return isinstance(e, mysql.connector.Error) and e.errno == MYSQL_BAD_FIELD
+
+def scenario_chain(cur, scenario_id):
+    """The scenario's id followed by its ancestors' ids, nearest first."""
+    chain = []
+    while scenario_id is not None and scenario_id not in chain:
+        chain.append(scenario_id)
+        try:
+            cur.execute("SELECT parent_scenario_id FROM whatif_scenarios WHERE scenario_id = %s", (scenario_id,))
+        except mysql.connector.Error as e:
+            if not is_missing_column(e):
+                raise
+            return chain  # no clones without the column
+        row = cur.fetchone()
+        scenario_id = row["parent_scenario_id"] if row else None
+    return chain
+
+def cached_scenario_chain(scenario_id):
+    """
+    scenario_chain() kept in the response cache backend (a chain never changes once
+    the scenario exists); None for an unknown scenario or when MySQL can't be read.
+    """
+    key = f"whatif_chain:{scenario_id}"
+    cached = response_cache.get(key)
+    if cached is not None:
+        return [int(s_id) for s_id in (cached.decode() if isinstance(cached, bytes) else cached).split(",")]
+    try:
+        connection = get_mysql_connection()
+        cursor = connection.cursor(dictionary=True)
+        chain = scenario_chain(cursor, scenario_id) if scenario_season(cursor, scenario_id) is not None else None
+        cursor.close()
+        connection.close()
+    except DB_ERRORS:
+        return None
+    if chain is not None:
+        response_cache.set(key, ",".join(str(s_id) for s_id in chain), CACHE_TTL_SECONDS)
+    return chain
+
+def bump_scenario_revision(scenario_id):
+    """After an edit: new cache keys for the scenario and every clone below it."""
+    if response_cache is not None and response_cache.shared:
+        response_cache.incr_counter(f"whatif:{scenario_id}")
+
+def scenario_overrides(cur, scenario_id):
+    """
+    raceId => override rows for a scenario, resolved along its parent chain:
+    a race the scenario overrides itself wins over the same race in any ancestor.
+    """
+    chain = scenario_chain(cur, scenario_id)
+    depth = {s_id: i for i, s_id in enumerate(chain)}
+    placeholders = ", ".join(["%s"] * len(chain))
+    cur.execute(f"""
+        SELECT scenario_id, raceId, driverId, position, points
+        FROM whatif_results
+        WHERE scenario_id IN ({placeholders})
+    """, chain)
+
+    by_race = {}
+    for row in cur.fetchall():
+        by_race.setdefault(row["raceId"], {}).setdefault(depth[row["scenario_id"]], []).append(row)
+    return {race_id: layers[min(layers)] for race_id, layers in by_race.items()}
+
+# 1b) Clone a scenario (copy-on-write: the clone only stores its own overrides)
+@app.route('/api/f1/whatif/scenario/<int:scenario_id>/clone', methods=['POST'])
+def clone_scenario(scenario_id):
+
+    data = request.get_json(silent=True) or {}
+
+    connection = get_mysql_connection()
+    cursor = connection.cursor(dictionary=True)
+
+    try:
+        cursor.execute("""
+            INSERT INTO whatif_scenarios (scenario_name, season, parent_scenario_id)
+            SELECT COALESCE(%s, CONCAT(scenario_name, ' (copy)')), season, scenario_id
+            FROM whatif_scenarios
+            WHERE scenario_id = %s
+        """, (data.get("scenarioName"), scenario_id))
+    except mysql.connector.Error as e:
+        if not is_missing_column(e):
+            raise
+        cursor.close()
+        connection.close()
+        return jsonify({"error": "Cloning needs whatif_scenarios.parent_scenario_id; run ingest.py to add it"}), 503
+    if not cursor.rowcount:
+        cursor.close()
+        connection.close()
+        return jsonify({"error": "Scenario not found"}), 404
+
+    clone_id = cursor.lastrowid
+    connection.commit()
+
+    cursor.close()
+    connection.close()
+    bump_scenario_revision(clone_id)
+
+    return jsonify({"scenarioId": clone_id, "parentScenarioId": scenario_id})
+
 # 2) Update race results for a scenario
 @app.route('/api/f1/whatif/scenario/<int:scenario_id>/updateRaceResults', methods=['POST'])
 def update_scenario_race_results(scenario_id):
@@ -1556,7 +4161,7 @@ def update_scenario_race_results(scenario_id):
     if not race_id or not isinstance(results, list):
         return jsonify({"error": "raceId and an array of results are required"}), 400
 
-    conn = get_db_connection()
+    conn = get_mysql_connection()
     cur = conn.cursor()
 
     # Remove old overrides for this scenario+race
@@ -1579,6 +4184,7 @@ def update_scenario_race_results(scenario_id):
     conn.commit()
     cur.close()
     conn.close()
+    bump_scenario_revision(scenario_id)
 
     return jsonify({"status": "ok"})
 
@@ -1586,7 +4192,7 @@ def update_scenario_race_results(scenario_id):
 @app.route('/api/f1/whatif/scenario/<int:scenario_id>', methods=['GET'])
 def get_scenario_info(scenario_id):
 
-    conn = get_db_connection()
+    conn = get_mysql_connection()
     cur = conn.cursor(dictionary=True)
 
     # scenario info
@@ -1601,134 +4207,101 @@ def get_scenario_info(scenario_id):
         conn.close()
         return jsonify({"error": "Scenario not found"}), 404
 
-    # races overridden
-    cur.execute("""
-        SELECT DISTINCT raceId 
-        FROM whatif_results
-        WHERE scenario_id = %s
-    """, (scenario_id,))
-    race_ids = [row["raceId"] for row in cur.fetchall()]
+    # races overridden, by this scenario or inherited from its ancestors
+    overrides = scenario_overrides(cur, scenario_id)
 
     cur.close()
     conn.close()
 
-    scenario["overriddenRaces"] = race_ids
+    scenario["overriddenRaces"] = sorted(overrides)
     return jsonify(scenario)
 
+def scenario_finishes(conn, cur, scenario_id, season, through_round=None):
+    """
+    season_finishes with the scenario's overrides (its own or inherited) applied: an
+    overridden race's real race and sprint rows are replaced by the override rows.
+    Override points go to the constructor the driver actually raced for that
+    weekend, and to no constructor if the driver didn't take part.
+    """
+    rows = season_finishes(conn, season, through_round)
+    overrides = scenario_overrides(cur, scenario_id)
+    if not overrides:
+        return rows
+
+    cur.execute("""
+        SELECT raceId, round
+        FROM races
+        WHERE year = %s AND round <= %s
+    """, (season, through_round if through_round is not None else 999))
+    race_rounds = {row["raceId"]: row["round"] for row in cur.fetchall()}
+
+    entries = {(row["raceId"], row["driverId"]): row for row in rows if not row["sprint"]}
+    names = {row["driverId"]: (row["forename"], row["surname"]) for row in rows}
+    missing = {o["driverId"] for race_rows in overrides.values() for o in race_rows} - set(names)
+    if missing:
+        placeholders = ", ".join(["%s"] * len(missing))
+        cur.execute(f"SELECT driverId, forename, surname FROM drivers WHERE driverId IN ({placeholders})", tuple(missing))
+        names.update({row["driverId"]: (row["forename"], row["surname"]) for row in cur.fetchall()})
+
+    merged = [row for row in rows if row["raceId"] not in overrides]
+    for race_id, override_rows in overrides.items():
+        if race_id not in race_rounds:
+            continue
+        for o in override_rows:
+            real = entries.get((race_id, o["driverId"]), {})
+            forename, surname = names.get(o["driverId"], ("", ""))
+            merged.append({
+                "round": race_rounds[race_id],
+                "raceId": race_id,
+                "driverId": o["driverId"],
+                "constructorId": real.get("constructorId"),
+                "position": o["position"],
+                "points": o["points"],
+                "sprint": 0,
+                "forename": forename,
+                "surname": surname,
+                "constructorName": real.get("constructorName")
+            })
+    return merged
+
+def scenario_season(cur, scenario_id):
+    """The scenario's season, or None if there is no such scenario."""
+    cur.execute("SELECT season FROM whatif_scenarios WHERE scenario_id = %s", (scenario_id,))
+    scenario = cur.fetchone()
+    return scenario["season"] if scenario else None
+
 # 4) Compute scenario-based driver standings
 @app.route('/api/f1/whatif/scenario/<int:scenario_id>/driverStandings', methods=['GET'])
 def get_scenario_driver_standings(scenario_id):
     """
     For each race in this scenario's season:
-      - If we have an override in whatif_results, use that data (which presumably sums up the total for the race).
-      - Otherwise, sum the real points from BOTH 'results' and 'sprintresults'.
+      - If the scenario (or an ancestor) overrides it in whatif_results, use that data.
+      - Otherwise, use the real points from BOTH 'results' and 'sprintresults'.
+    Ties are broken by countback (see compute_standings).
     """
 
-    conn = get_db_connection()
+    conn = get_mysql_connection()
     cur = conn.cursor(dictionary=True)
 
-    # 1) Find the scenario
-    cur.execute("SELECT * FROM whatif_scenarios WHERE scenario_id = %s", (scenario_id,))
-    scenario = cur.fetchone()
-    if not scenario:
+    season = scenario_season(cur, scenario_id)
+    if season is None:
         cur.close()
         conn.close()
         return jsonify({"error": "Scenario not found"}), 404
 
-    season = scenario["season"]
-
-    # 2) Get all races for that season
-    cur.execute("""
-        SELECT raceId, year, round, name
-        FROM races
-        WHERE year = %s
-        ORDER BY round ASC
-    """, (season,))
-    races = cur.fetchall()
-
-    driver_points = {}  # driverId => total points
-    driver_names  = {}  # driverId => "Forename Surname"
-
-    for race in races:
-        r_id = race["raceId"]
-
-        # check overrides for the main race
-        cur.execute("""
-            SELECT driverId, position, points
-            FROM whatif_results
-            WHERE scenario_id = %s
-              AND raceId = %s
-            ORDER BY position
-        """, (scenario_id, r_id))
-        overridden = cur.fetchall()
-
-        if overridden:
-            # SCENARIO OVERRIDE
-            for row in overridden:
-                d_id = row["driverId"]
-                pts  = float(row["points"] or 0)
-                driver_points[d_id] = driver_points.get(d_id, 0) + pts
-
-                if d_id not in driver_names:
-                    # fetch driver name
-                    name_sql = """
-                        SELECT forename, surname 
-                        FROM drivers 
-                        WHERE driverId = %s
-                    """
-                    cur.execute(name_sql, (d_id,))
-                    d_info = cur.fetchone()
-                    if d_info:
-                        driver_names[d_id] = f"{d_info['forename']} {d_info['surname']}"
+    rows = scenario_finishes(conn, cur, scenario_id, season)
+    cur.close()
+    conn.close()
 
-        else:
-            # NO OVERRIDE -> sum real results from BOTH race + sprint
-            # 1) main race
-            cur.execute("""
-                SELECT results.driverId, results.points, drivers.forename, drivers.surname
-                FROM results
-                JOIN drivers ON results.driverId = drivers.driverId
-                WHERE results.raceId = %s
-            """, (r_id,))
-            real_rows = cur.fetchall()
-            for row in real_rows:
-                d_id = row["driverId"]
-                pts  = float(row["points"] or 0)
-                driver_points[d_id] = driver_points.get(d_id, 0) + pts
-
-                if d_id not in driver_names:
-                    driver_names[d_id] = f"{row['forename']} {row['surname']}"
-
-            # 2) sprint race (if any)
-            cur.execute("""
-                SELECT sr.driverId, sr.points, d.forename, d.surname
-                FROM sprintresults sr
-                JOIN drivers d ON sr.driverId = d.driverId
-                WHERE sr.raceId = %s
-            """, (r_id,))
-            sprint_rows = cur.fetchall()
-            for row in sprint_rows:
-                d_id = row["driverId"]
-                pts  = float(row["points"] or 0)
-                driver_points[d_id] = driver_points.get(d_id, 0) + pts
-
-                if d_id not in driver_names:
-                    driver_names[d_id] = f"{row['forename']} {row['surname']}"
-
-    # Build final array
-    standings_array = []
-    for d_id, pts in driver_points.items():
-        standings_array.append({
+    names = {row["driverId"]: f"{row['forename']} {row['surname']}" for row in rows}
+    standings_array = [
+        {
             "driverId": d_id,
-            "driverName": driver_names[d_id],
+            "driverName": names[d_id],
             "points": pts
-        })
-
-    # sort descending by points
-    standings_array.sort(key=lambda x: x["points"], reverse=True)
-
-    cur.close()
-    conn.close()
+        }
+        for d_id, _, pts, _ in standings_at(season_standings(rows, "driverId"))
+    ]
 
     return jsonify({
         "scenarioId": scenario_id,
@@ -1739,7 +4312,159 @@ def get_scenario_driver_standings(scenario_id):
 # 5) Compute scenario-based constructor standings (similar logic)
 @app.route('/api/f1/whatif/scenario/<int:scenario_id>/constructorStandings', methods=['GET'])
 def get_scenario_constructor_standings(scenario_id):
-    conn = get_db_connection()
+    conn = get_mysql_connection()
+    cur = conn.cursor(dictionary=True)
+
+    season = scenario_season(cur, scenario_id)
+    if season is None:
+        cur.close()
+        conn.close()
+        return jsonify({"error": "Scenario not found"}), 404
+
+    rows = scenario_finishes(conn, cur, scenario_id, season)
+    cur.close()
+    conn.close()
+
+    names = {row["constructorId"]: row["constructorName"] for row in rows}
+    standings_array = [
+        {
+            "constructorId": c_id,
+            "constructorName": names[c_id],
+            "points": pts
+        }
+        for c_id, _, pts, _ in standings_at(season_standings(rows, "constructorId"))
+    ]
+
+    return jsonify({
+        "scenarioId": scenario_id,
+        "season": season,
+        "constructorStandings": standings_array
+    })
+
+# 6) Monte Carlo title odds from a chosen round
+SIMULATIONS_MAX = int(os.getenv("SIMULATIONS_MAX", 1000000))
+
+def season_points_table(cur, season):
+    """
+    Points per finishing position (index 0 = P1) as awarded in `season`: the most
+    common value per position, so fastest-lap bonuses and half-points races drop out.
+    """
+    cur.execute("""
+        SELECT res.position, res.points
+        FROM results res
+        JOIN races r ON res.raceId = r.raceId
+        WHERE r.year = %s
+          AND res.points > 0
+    """, (season,))
+    awarded = {}
+    for row in cur.fetchall():
+        if str(row["position"]).isdigit():
+            awarded.setdefault(int(row["position"]), Counter())[float(row["points"])] += 1
+
+    table = np.zeros(max(awarded, default=0))
+    for position, counts in awarded.items():
+        table[position - 1] = counts.most_common(1)[0][0]
+    return table
+
+def finish_cdf(driver_ids, finishes, prior_races=2.0, active=None):
+    """
+    Cumulative finish distribution per driver from (driverId, position) pairs.
+    Columns are P1..Pn for n drivers plus a final DNF column. Each driver's counts
+    get `prior_races` races' worth of the pooled distribution of every driver, so
+    the prior matters for a driver with three races and fades for one with forty.
+    Drivers outside the boolean mask `active` always DNF, i.e. never score.
+    """
+    n = len(driver_ids)
+    index = {d_id: i for i, d_id in enumerate(driver_ids)}
+
+    rows, cols = [], []
+    for d_id, position in finishes:
+        if d_id not in index:
+            continue
+        text = str(position)
+        rows.append(index[d_id])
+        cols.append(min(int(text), n) - 1 if text.isdigit() and int(text) > 0 else n)
+
+    counts = np.zeros((n, n + 1))
+    np.add.at(counts, (np.asarray(rows, dtype=int), np.asarray(cols, dtype=int)), 1)
+    pooled = counts.sum(axis=0)
+    pooled = pooled / pooled.sum() if pooled.sum() else np.full(n + 1, 1 / (n + 1))
+    counts += prior_races * pooled
+
+    probs = counts / counts.sum(axis=1, keepdims=True)
+    if active is not None:
+        probs[~active] = 0.0
+        probs[~active, -1] = 1.0
+    cdf = np.cumsum(probs, axis=1)
+    cdf[:, -1] = 1.0
+    return cdf
+
+def simulate_championships(current_points, cdf, points_table, races_left, simulations, rng, chunk_size=20000):
+    """
+    Play out `races_left` races `simulations` times, `chunk_size` seasons per NumPy pass.
+    Each race samples every driver's category from their CDF, breaks ties at random
+    and scores the resulting order with `points_table` (DNFs score nothing).
+    Returns (titles won per driver, mean final points per driver).
+    """
+    n_drivers, n_categories = cdf.shape
+    dnf = n_categories - 1
+    table = np.zeros(n_drivers)
+    table[:min(len(points_table), n_drivers)] = points_table[:n_drivers]
+
+    # Shift row d of the CDF into [d, d+1] so one searchsorted samples every driver at once
+    offsets = np.arange(n_drivers)
+    flat_cdf = (cdf + offsets[:, None]).ravel()
+
+    titles = np.zeros(n_drivers, dtype=np.int64)
+    points_sum = np.zeros(n_drivers)
+    done = 0
+    while done < simulations:
+        n = min(chunk_size, simulations - done)
+        totals = np.tile(np.asarray(current_points, dtype=float), (n, 1))
+        sims = np.arange(n)[:, None]
+
+        for _ in range(races_left):
+            check_deadline()
+            category = np.searchsorted(flat_cdf, rng.random((n, n_drivers)) + offsets, side="right")
+            category -= offsets * n_categories
+            order = np.argsort(category + rng.random((n, n_drivers)), axis=1)
+            finish = np.empty_like(order)
+            finish[sims, order] = offsets
+            totals += np.where(category == dnf, 0.0, table[finish])
+
+        # a sliver of noise settles exact points ties at random
+        champions = np.argmax(totals + rng.random(totals.shape) * 1e-6, axis=1)
+        titles += np.bincount(champions, minlength=n_drivers)
+        points_sum += totals.sum(axis=0)
+        done += n
+
+    return titles, points_sum / simulations
+
+@app.route('/api/f1/whatif/scenario/<int:scenario_id>/simulate', methods=['GET'])
+def simulate_scenario_championship(scenario_id):
+    """
+    /api/f1/whatif/scenario/12/simulate?afterRound=16&simulations=100000&historySeasons=1&seed=7
+
+    Takes the scenario's driver standings after `afterRound` (default: the last round
+    with results) and plays out the remaining races. The field is the drivers who
+    started `afterRound`; anyone else keeps their points but doesn't race again.
+    Each driver's finishes are drawn from their results so far this season plus
+    `historySeasons` earlier seasons, with scenario overrides standing in for the
+    real results. Sprints aren't simulated.
+    """
+    try:
+        simulations = min(int(request.args.get('simulations', 100000)), SIMULATIONS_MAX)
+        history_seasons = int(request.args.get('historySeasons', 1))
+        seed = request.args.get('seed')
+        seed = int(seed) if seed is not None else None
+        after_round = request.args.get('afterRound')
+        after_round = int(after_round) if after_round is not None else None
+    except ValueError:
+        return jsonify({"error": "afterRound, simulations, historySeasons and seed must be integers"}), 400
+    if simulations < 1:
+        return jsonify({"error": "simulations must be positive"}), 400
+
+    conn = get_mysql_connection()
     cur = conn.cursor(dictionary=True)
 
     cur.execute("SELECT * FROM whatif_scenarios WHERE scenario_id = %s", (scenario_id,))
@@ -1751,104 +4476,138 @@ def get_scenario_constructor_standings(scenario_id):
 
     season = scenario["season"]
     cur.execute("""
-        SELECT raceId, year, round, name
-        FROM races
-        WHERE year = %s
-        ORDER BY round ASC
+        SELECT r.raceId, r.round, EXISTS(SELECT 1 FROM results res WHERE res.raceId = r.raceId) AS hasResults
+        FROM races r
+        WHERE r.year = %s
+        ORDER BY r.round ASC
     """, (season,))
     races = cur.fetchall()
+    if after_round is None:
+        after_round = max((race["round"] for race in races if race["hasResults"]), default=0)
+
+    completed = [race for race in races if race["round"] <= after_round]
+    races_left = len(races) - len(completed)
+
+    # Standings after the chosen round, plus everyone who raced this season
+    rows = scenario_finishes(conn, cur, scenario_id, season)
+    completed_rows = [row for row in rows if row["round"] <= after_round]
+    driver_points = {
+        d_id: pts for d_id, _, pts, _ in standings_at(season_standings(completed_rows, "driverId"))
+    }
+    driver_names = {row["driverId"]: f"{row['forename']} {row['surname']}" for row in rows}
+    driver_ids = sorted(driver_names)
+
+    # Current entrants: departed drivers and one-off substitutes shouldn't dilute the odds
+    entrants = {row["driverId"] for row in completed_rows if row["round"] == after_round and not row["sprint"]}
+    active = np.array([d_id in entrants for d_id in driver_ids], dtype=bool) if entrants else None
+
+    # Finish history: earlier seasons plus this season so far, overrides swapped in
+    cur.execute("""
+        SELECT res.driverId, res.position
+        FROM results res
+        JOIN races r ON res.raceId = r.raceId
+        WHERE r.year BETWEEN %s AND %s
+    """, (season - history_seasons, season - 1))
+    finishes = [(row["driverId"], row["position"]) for row in cur.fetchall()]
+    finishes += [(row["driverId"], row["position"]) for row in completed_rows if not row["sprint"]]
 
-    constructor_points = {}
-    constructor_names  = {}
+    points_table = season_points_table(cur, season)
+    cur.close()
+    conn.close()
 
-    for race in races:
-        r_id = race["raceId"]
+    current = np.array([driver_points.get(d_id, 0.0) for d_id in driver_ids])
+    if not driver_ids:
+        titles, expected = np.zeros(0), np.zeros(0)
+    elif races_left == 0:
+        # nothing left to race: the current leader has it
+        titles = np.zeros(len(driver_ids))
+        titles[np.argmax(current)] = simulations
+        expected = current
+    else:
+        cdf = finish_cdf(driver_ids, finishes, active=active)
+        titles, expected = simulate_championships(
+            current, cdf, points_table, races_left, simulations, np.random.default_rng(seed)
+        )
 
-        # check if there's an override
-        cur.execute("""
-            SELECT driverId, position, points
-            FROM whatif_results
-            WHERE scenario_id = %s
-              AND raceId = %s
-        """, (scenario_id, r_id))
-        overridden = cur.fetchall()
-
-        if overridden:
-            # SCENARIO OVERRIDE
-            for row in overridden:
-                d_id = row["driverId"]
-                pts  = float(row["points"] or 0)
-                # find constructor from normal 'results' table (or separate logic)
-                c_sql = """
-                    SELECT constructors.constructorId, constructors.name
-                    FROM results
-                    JOIN constructors ON results.constructorId = constructors.constructorId
-                    WHERE results.raceId = %s
-                      AND results.driverId = %s
-                    LIMIT 1
-                """
-                cur.execute(c_sql, (r_id, d_id))
-                c_info = cur.fetchone()
-                if not c_info:
-                    # we won't add points for that driver if we can't find constructor
-                    continue
-                c_id = c_info["constructorId"]
-                c_name = c_info["name"]
+    drivers = [
+        {
+            "driverId": d_id,
+            "driverName": driver_names[d_id],
+            "currentPoints": float(current[i]),
+            "titleProbability": float(titles[i]) / simulations,
+            "expectedPoints": round(float(expected[i]), 2)
+        }
+        for i, d_id in enumerate(driver_ids)
+    ]
+    drivers.sort(key=lambda d: (d["titleProbability"], d["currentPoints"]), reverse=True)
 
-                constructor_points[c_id] = constructor_points.get(c_id, 0) + pts
-                constructor_names[c_id] = c_name
+    return jsonify({
+        "scenarioId": scenario_id,
+        "season": season,
+        "afterRound": after_round,
+        "remainingRaces": races_left,
+        "simulations": simulations,
+        "pointsTable": points_table.tolist(),
+        "drivers": drivers
+    })
 
-        else:
-            # NO OVERRIDE -> sum real points from both results + sprintresults
-
-            # 1) main race
-            cur.execute("""
-                SELECT results.driverId, results.points, constructors.constructorId, constructors.name
-                FROM results
-                JOIN constructors ON results.constructorId = constructors.constructorId
-                WHERE results.raceId = %s
-            """, (r_id,))
-            real_rows = cur.fetchall()
-            for row in real_rows:
-                c_id = row["constructorId"]
-                pts  = float(row["points"] or 0)
-                constructor_points[c_id] = constructor_points.get(c_id, 0) + pts
-                if c_id not in constructor_names:
-                    constructor_names[c_id] = row["name"]
-
-            # 2) sprint race
-            cur.execute("""
-                SELECT sr.driverId, sr.points,
-                       constructors.constructorId, constructors.name
-                FROM sprintresults sr
-                JOIN constructors ON sr.constructorId = constructors.constructorId
-                WHERE sr.raceId = %s
-            """, (r_id,))
-            sprint_rows = cur.fetchall()
-            for row in sprint_rows:
-                c_id = row["constructorId"]
-                pts  = float(row["points"] or 0)
-                constructor_points[c_id] = constructor_points.get(c_id, 0) + pts
-                if c_id not in constructor_names:
-                    constructor_names[c_id] = row["name"]
-
-    # Build final array
-    standings_array = []
-    for c_id, pts in constructor_points.items():
-        standings_array.append({
-            "constructorId": c_id,
-            "constructorName": constructor_names[c_id],
-            "points": pts
-        })
-    standings_array.sort(key=lambda x: x["points"], reverse=True)
+# 7) / 8) Round-by-round cumulative points for a scenario
+# (cached like every what-if GET, by the response cache; see whatif_cache_version)
+def scenario_progression(scenario_id, key, describe):
+    """
+    Rounds x entities cumulative points and positions for a scenario, from one
+    standings pass over its merged real + override finishes.
+    `describe(row)` turns a finishes row into the entity's JSON entry.
+    """
+    conn = get_mysql_connection()
+    cur = conn.cursor(dictionary=True)
+
+    season = scenario_season(cur, scenario_id)
+    if season is None:
+        cur.close()
+        conn.close()
+        return None
 
+    rows = scenario_finishes(conn, cur, scenario_id, season)
     cur.close()
     conn.close()
-    return jsonify({
+
+    rounds, entity_ids, points, ranks, _ = season_standings(rows, key)
+    entities = {row[key]: describe(row) for row in rows if row[key] is not None}
+    return {
         "scenarioId": scenario_id,
         "season": season,
-        "constructorStandings": standings_array
+        "format": "matrix",
+        "rounds": rounds.tolist(),
+        "entities": [entities[e_id] for e_id in entity_ids.tolist()],
+        "points": points.tolist(),
+        "positions": ranks.tolist()
+    }
+
+@app.route('/api/f1/whatif/scenario/<int:scenario_id>/driverProgression', methods=['GET'])
+def get_scenario_driver_progression(scenario_id):
+    payload = scenario_progression(scenario_id, "driverId", lambda row: {
+        "driverId": row["driverId"],
+        "givenName": row["forename"],
+        "familyName": row["surname"]
     })
+    if payload is None:
+        return jsonify({"error": "Scenario not found"}), 404
+
+    payload["drivers"] = payload.pop("entities")
+    return jsonify(payload)
+
+@app.route('/api/f1/whatif/scenario/<int:scenario_id>/constructorProgression', methods=['GET'])
+def get_scenario_constructor_progression(scenario_id):
+    payload = scenario_progression(scenario_id, "constructorId", lambda row: {
+        "constructorId": row["constructorId"],
+        "constructorName": row["constructorName"]
+    })
+    if payload is None:
+        return jsonify({"error": "Scenario not found"}), 404
+
+    payload["constructors"] = payload.pop("entities")
+    return jsonify(payload)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,345 @@
+"""
+ASGI serving mode for the F1 API.
+
+Serves the same URLs and payloads as app.py. The routes that spend most of
+their time waiting - the OpenAI-backed AI routes and the multi-year MySQL
+comparisons - run natively on the event loop with an async OpenAI client and
+aiomysql. Every other route is handed to the Flask app, which asgiref runs on
+a thread pool, as are the multi-year comparisons when app.DB_BACKEND isn't
+MySQL (aiomysql can't read the embedded SQLite file).
+
+The native routes go through the same admission gates, per-route deadlines,
+response cache and request log as app.py's before/after hooks. Profiled requests (see
+app.ProfilingMiddleware) are handed to the Flask app instead, since the sampler
+needs a thread that runs only that request.
+
+    uvicorn asgi:application --workers 4
+"""
+import asyncio
+import contextvars
+import os
+import time
+from urllib.parse import parse_qs, parse_qsl
+
+import aiomysql
+import openai
+from asgiref.wsgi import WsgiToAsgi
+
+import app as f1
+
+flask_application = WsgiToAsgi(f1.app)
+
+ai_client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+_pool = None
+_pool_lock = asyncio.Lock()
+
+async def get_pool():
+    """Create the aiomysql pool on first use, inside the running event loop."""
+    global _pool
+    async with _pool_lock:
+        if _pool is None:
+            _pool = await aiomysql.create_pool(
+                host=os.getenv("DB_HOST"),
+                user=os.getenv("DB_USER"),
+                password=os.getenv("DB_PASSWORD"),
+                db=os.getenv("DB_NAME"),
+                minsize=1,
+                maxsize=int(os.getenv("ASYNC_DB_POOL_SIZE", 10)),
+                autocommit=True
+            )
+    return _pool
+
+async def close_pool():
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        await _pool.wait_closed()
+        _pool = None
+
+def pyformat(sql):
+    """
+    The shared queries are written for mysql.connector, which only substitutes %s.
+    aiomysql runs them through `%` formatting, so literal percent signs must be doubled.
+    """
+    return sql.replace('%', '%%').replace('%%s', '%s')
+
+# time.monotonic() the current request must finish by (see app.ROUTE_DEADLINES_MS)
+request_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+def with_deadline_hint(sql):
+    """Cap a SELECT at the request's remaining budget, like app.DeadlineCursor."""
+    deadline = request_deadline.get()
+    if deadline is None:
+        return sql
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise f1.QueryDeadlineExceeded()
+    hint = f"SELECT /*+ MAX_EXECUTION_TIME({max(1, int(remaining * 1000))}) */"
+    return f1.SELECT_PREFIX.sub(hint, sql, count=1)
+
+async def run_query(pool, sql, params, fetch):
+    async with pool.acquire() as conn:
+        try:
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                await cur.execute(pyformat(with_deadline_hint(sql)), params)
+                return await fetch(cur)
+        except aiomysql.OperationalError as e:
+            if e.args and e.args[0] == f1.MYSQL_QUERY_TIMEOUT:
+                raise f1.QueryDeadlineExceeded() from e
+            raise
+        except asyncio.CancelledError:
+            conn.close()  # cancelled mid-result; don't return it to the pool
+            raise
+
+async def fetch_one(pool, sql, params):
+    return await run_query(pool, sql, params, lambda cur: cur.fetchone())
+
+async def fetch_all(pool, sql, params):
+    return await run_query(pool, sql, params, lambda cur: cur.fetchall())
+
+# 🔹 Native async handlers. Each takes (args, json_body) and returns (status, payload).
+
+async def multi_year_comparison(args, id_param, default_start, kind, metric_sql, id_key, table_key, missing_error):
+    """Async twin of multi_year_driver_comparison / multi_year_constructor_comparison."""
+    ids_param = args.get(id_param)
+    try:
+        start_year, end_year = f1.year_range(args, default_start)
+    except ValueError:
+        return 400, {"error": f1.YEAR_RANGE_ERROR}
+    metric = args.get('metric', 'totalPoints')
+
+    if not ids_param:
+        return 400, {"error": missing_error}
+
+    entity_ids = [e.strip() for e in ids_param.split(',') if e.strip()]
+    pool = await get_pool()
+    all_years = [row["year"] for row in await fetch_all(pool, f1.YEARS_IN_RANGE_SQL, (start_year, end_year))]
+
+    try:
+        rows = await fetch_all(
+            pool, f1.season_stats_sql(kind, len(entity_ids)), (*entity_ids, *entity_ids, start_year, end_year)
+        )
+    except aiomysql.Error:
+        rows = None  # season summary tables not built yet
+    if rows is not None:
+        results = f1.season_stats_comparison(rows, entity_ids, all_years, metric, id_key)
+    else:
+        results = await per_year_comparison(pool, metric_sql, entity_ids, all_years, metric, id_key)
+
+    return 200, {
+        "MRData": {
+            "series": "f1",
+            "startYear": start_year,
+            "endYear": end_year,
+            table_key: results
+        }
+    }
+
+async def per_year_comparison(pool, metric_sql, entity_ids, all_years, metric, id_key):
+    """Async twin of app.per_year_comparison, with every (entity, year) query in flight at once."""
+    async def metric_for(entity, year):
+        sql = metric_sql.get(metric)
+        if sql is None:
+            return 0
+        return f1.metric_value(await fetch_one(pool, sql, (entity, entity, year)), metric)
+
+    values = await asyncio.gather(*(metric_for(e, y) for e in entity_ids for y in all_years))
+
+    results = {}
+    it = iter(values)
+    for entity in entity_ids:
+        results[entity] = {id_key: entity, "yearlyPoints": [], "totalPoints": 0}
+        for y in all_years:
+            val = next(it)
+            results[entity]["yearlyPoints"].append({"year": y, "points": val})
+            results[entity]["totalPoints"] += val
+    return results
+
+async def multi_year_driver_comparison(args, body):
+    return await multi_year_comparison(
+        args, 'drivers', 1950, "driver", f1.DRIVER_METRIC_SQL,
+        "driverId", "MultiYearDriverComparison", "No drivers provided"
+    )
+
+async def multi_year_constructor_comparison(args, body):
+    return await multi_year_comparison(
+        args, 'teams', 1958, "constructor", f1.CONSTRUCTOR_METRIC_SQL,
+        "constructorId", "MultiYearConstructorComparison", "No teams provided"
+    )
+
+async def ai_insights(args, body):
+    try:
+        response = await ai_client.chat.completions.create(
+            model=f1.AI_MODEL,
+            messages=f1.insights_messages(body)
+        )
+        answer = response.choices[0].message.content
+    except Exception as e:
+        return 500, {"response": f"Error generating insights: {e}"}
+
+    return 200, {"response": answer}
+
+async def race_insights(args, body):
+    messages = f1.race_insights_messages(body)
+
+    try:
+        response = await ai_client.chat.completions.create(
+            model=f1.AI_MODEL,
+            messages=messages
+        )
+        ans = response.choices[0].message.content
+    except Exception as e:
+        ans = f"Error generating insights: {e}"
+
+    return 200, {"response": ans}
+
+ASYNC_ROUTES = {
+    ("GET", "/api/f1/multiYearDriverComparison"): multi_year_driver_comparison,
+    ("GET", "/api/f1/multiYearConstructorComparison"): multi_year_constructor_comparison,
+    ("POST", "/api/ai/insights"): ai_insights,
+    ("POST", "/api/ai/raceInsights"): race_insights,
+}
+
+# The native handlers that query MySQL through aiomysql
+MYSQL_ROUTES = {multi_year_driver_comparison, multi_year_constructor_comparison}
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+def encode_json(payload):
+    return f1.app.json.dumps(payload).encode("utf-8") + b"\n"
+
+async def send_body(send, status, body, headers=()):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            *headers,
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+async def send_json(send, status, payload, headers=()):
+    await send_body(send, status, encode_json(payload), headers)
+
+def header(scope, name):
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+def profiled_scope(scope):
+    """`scope` to hand to the Flask app for profiling, or None to serve the request here."""
+    if f1.profile_token_valid(header(scope, b"x-f1-profile")):
+        return scope
+    if f1.profile_sampled():
+        return dict(scope, headers=[*scope["headers"], (b"x-f1-profile-sampled", f1.PROFILE_FORWARD_KEY.encode())])
+    return None
+
+def cache_key(scope):
+    """Same key app.serve_cached_response uses, or None if the response isn't cached."""
+    if (f1.response_cache is None or scope["method"] != "GET"
+            or not scope["path"].startswith('/api/f1/')
+            or header(scope, b"cache-control") == "no-cache"):
+        return None
+    query = parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True)
+    return f1.response_cache_key_for(scope["path"], query)
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            f1.warm_cache_on_start()  # native routes never run the Flask hooks
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await close_pool()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+
+    handler = None
+    if scope["type"] == "http":
+        handler = ASYNC_ROUTES.get((scope["method"], scope["path"]))
+    if handler in MYSQL_ROUTES and f1.DB_BACKEND != "mysql":
+        handler = None
+    if handler is not None:
+        profiled = profiled_scope(scope)
+        if profiled is not None:
+            scope, handler = profiled, None
+    if handler is None:
+        return await flask_application(scope, receive, send)
+
+    started_at = time.time()
+    started = time.perf_counter()
+    status = await serve_native(handler, scope, receive, send)
+    if f1.request_log is not None:
+        f1.request_log.write_entry(
+            scope["method"], scope["path"], scope.get("query_string", b"").decode("latin-1"),
+            scope["path"], started_at, time.perf_counter() - started, status
+        )
+
+async def serve_native(handler, scope, receive, send):
+    """Run one of the ASYNC_ROUTES the way app.py's hooks would; returns the status sent."""
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    args = {key: values[0] for key, values in query.items()}
+
+    body = None
+    raw_body = await read_body(receive)
+    if scope["method"] == "POST":
+        try:
+            body = f1.app.json.loads(raw_body or b"{}")
+        except ValueError:
+            await send_json(send, 400, {"error": "Invalid JSON body"})
+            return 400
+
+    # Gates are threading-based and shared with the Flask routes of this process
+    gate = f1.ADMISSION_GATES[f1.ROUTE_COST_CLASSES.get(handler.__name__, "standard")]
+    if not await asyncio.to_thread(gate.acquire):
+        await send_json(
+            send, 503, {"error": f"Server busy with {gate.name} requests, retry later"},
+            [(b"retry-after", str(gate.retry_after).encode())]
+        )
+        return 503
+
+    try:
+        key = await asyncio.to_thread(cache_key, scope)
+        if key is not None:
+            cached = await asyncio.to_thread(f1.response_cache.get, key)
+            if cached is not None:
+                await send_body(send, 200, cached, [(b"x-cache", b"HIT")])
+                return 200
+
+        budget_ms = f1.route_budget_ms(handler.__name__)
+        request_deadline.set(time.monotonic() + budget_ms / 1000)
+        try:
+            status, payload = await asyncio.wait_for(handler(args, body), budget_ms / 1000)
+        except (asyncio.TimeoutError, f1.QueryDeadlineExceeded):
+            status, payload = 504, {"error": f"Request exceeded its time budget of {budget_ms} ms and was cancelled"}
+        except Exception:
+            # Like an unhandled error in the Flask app: logged with its traceback, a bare 500 to the client
+            f1.app.logger.exception("Exception on %s [%s]", scope["path"], scope["method"])
+            status, payload = 500, {"error": "Internal Server Error"}
+
+        # Same sparse fieldset handling as app.jsonify
+        fields = {f.strip() for f in args.get('fields', '').split(',') if f.strip()}
+        if fields and scope["path"].startswith('/api/f1/') and "error" not in payload:
+            payload = f1.prune_fields(payload, fields)
+
+        response_body = encode_json(payload)
+        if key is not None and status == 200:
+            await asyncio.to_thread(f1.response_cache.set, key, response_body, f1.CACHE_TTL_SECONDS)
+        await send_body(send, status, response_body)
+        return status
+    finally:
+        gate.release()
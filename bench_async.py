@@ -0,0 +1,86 @@
+"""
+Compare the sync (gunicorn/Flask) and async (uvicorn/asgi.py) serving modes.
+
+Start both servers against the same database, e.g.
+
+    gunicorn -w 4 -b 127.0.0.1:8000 app:app
+    uvicorn asgi:application --workers 4 --port 8001
+
+then fire the same request mix at both at a fixed concurrency:
+
+    python bench_async.py --sync http://127.0.0.1:8000 --async http://127.0.0.1:8001 \\
+        --concurrency 64 --requests 1000 \\
+        --path "/api/f1/multiYearDriverComparison?drivers=hamilton,alonso&startYear=2010&endYear=2020" \\
+        --path /api/f1/seasons.json
+"""
+import argparse
+import json
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_common import percentile
+
+def one_request(base_url, path, body, timeout):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(
+        base_url + path,
+        data=data,
+        headers={"Content-Type": "application/json"} if data else {}
+    )
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            resp.read()
+            ok = resp.status < 400
+    except (urllib.error.URLError, TimeoutError, ConnectionError):
+        ok = False
+    return time.perf_counter() - start, ok
+
+def run(base_url, paths, body, concurrency, total, timeout):
+    jobs = [paths[i % len(paths)] for i in range(total)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(lambda p: one_request(base_url, p, body, timeout), jobs))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(t for t, _ in outcomes)
+    errors = sum(1 for _, ok in outcomes if not ok)
+    return {
+        "requests": total,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sync", dest="sync_url", required=True, help="base URL of the sync server")
+    parser.add_argument("--async", dest="async_url", required=True, help="base URL of the ASGI server")
+    parser.add_argument("--path", action="append", required=True, help="request path (repeatable)")
+    parser.add_argument("--json", help="JSON file to POST as the body (for the /api/ai routes)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    body = None
+    if args.json:
+        with open(args.json) as f:
+            body = json.load(f)
+
+    report = {}
+    for name, url in (("sync", args.sync_url), ("async", args.async_url)):
+        report[name] = run(url.rstrip('/'), args.path, body, args.concurrency, args.requests, args.timeout)
+
+    if report["sync"]["throughput_rps"]:
+        report["async_speedup"] = round(report["async"]["throughput_rps"] / report["sync"]["throughput_rps"], 2)
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,7 @@
+"""Helpers shared by the benchmark scripts (bench_async.py, loadtest.py)."""
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
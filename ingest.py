@@ -0,0 +1,641 @@
+"""
+Bulk-load Ergast-style CSV dumps into the MySQL tables the API reads.
+
+    python ingest.py path/to/f1db_csv                     # load whatever changed
+    python ingest.py path/to/f1db_csv --seasons 2024,2025 # only look at these seasons
+    python ingest.py path/to/f1db_csv --method load-data  # LOAD DATA LOCAL INFILE
+    python ingest.py path/to/f1db_csv --full              # ignore checksums, reload everything
+    python ingest.py --export-sqlite f1.sqlite            # (re)build the embedded read-only file
+    python ingest.py --refresh-stats                      # rebuild the season summaries for every season
+
+Rows are grouped per race (per season for races.csv, the whole file for the
+reference tables) and checksummed. Only groups whose checksum changed since
+the last load are deleted and re-inserted, so after a race weekend just the
+new round is written. Groups loaded before that the CSVs no longer have are
+deleted, as are race rows whose raceId isn't in races.csv and reference rows
+whose key isn't in their file. Afterwards the derived indexes are
+checked/rebuilt, the touched tables are re-analyzed and the data version is
+bumped; the API polls it and drops its cached responses once it changes.
+
+The per-(driver, season) and per-(constructor, season) summary tables the
+multi-year comparison routes read are refreshed for the touched seasons only.
+
+Some columns are derived from a row's own values as it is written (see
+DERIVED_COLUMNS), e.g. qualifying lap times as integer milliseconds. When
+such a column is new it is added and back-filled for every existing row.
+The columns the what-if routes need on whatif_scenarios (WHATIF_COLUMNS) are
+added by every run, whatever the options, so the API itself never runs DDL.
+
+--export-sqlite copies the read-only tables from MySQL into an SQLite file
+with the same schema, for running the API with DB_BACKEND=sqlite.
+"""
+import argparse
+import csv
+import hashlib
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from decimal import Decimal
+
+import mysql.connector
+from dotenv import load_dotenv
+
+load_dotenv(".env")
+
+NULL = "\\N"
+
+# (csv file, table) - loaded whole, upserted on their primary key on change
+REFERENCE_TABLES = [
+    ("circuits.csv",     "circuits"),
+    ("constructors.csv", "constructors"),
+    ("drivers.csv",      "drivers"),
+    ("status.csv",       "status"),
+    ("seasons.csv",      "seasons"),
+]
+
+# (csv file, table) - every row carries a raceId, grouped and replaced per race
+RACE_TABLES = [
+    ("results.csv",               "results"),
+    ("sprint_results.csv",        "sprintresults"),
+    ("qualifying.csv",            "qualifying"),
+    ("lap_times.csv",             "laptimes"),
+    ("pit_stops.csv",             "pitstops"),
+    ("driver_standings.csv",      "driverstandings"),
+    ("constructor_standings.csv", "constructorstandings"),
+    ("constructor_results.csv",   "constructorresults"),
+]
+
+# Indexes the /api/f1 routes rely on: (table, index name, columns)
+DERIVED_INDEXES = [
+    ("races",                "idx_races_year_round",      "year, round"),
+    ("results",              "idx_results_race",          "raceId"),
+    ("results",              "idx_results_driver",        "driverId"),
+    ("results",              "idx_results_constructor",   "constructorId"),
+    ("sprintresults",        "idx_sprintresults_race",    "raceId"),
+    ("qualifying",           "idx_qualifying_race",       "raceId"),
+    ("laptimes",             "idx_laptimes_race_driver",  "raceId, driverId"),
+    ("driverstandings",      "idx_driverstandings_race",  "raceId"),
+    ("constructorstandings", "idx_constructorstandings_race", "raceId"),
+]
+
+def lap_ms(text):
+    """'1:29.708' -> 89708, '59.123' -> 59123; None for a missing or unparseable time."""
+    if not text:
+        return None
+    minutes, _, seconds = text.strip().rpartition(':')
+    try:
+        return round((int(minutes or 0) * 60 + float(seconds)) * 1000)
+    except ValueError:
+        return None
+
+def qualifying_ms(q1, q2, q3):
+    times = [lap_ms(q1), lap_ms(q2), lap_ms(q3)]
+    set_times = [t for t in times if t is not None]
+    return times + [min(set_times) if set_times else None]
+
+# Columns computed from other columns of the same row while loading:
+# table => (primary key, source columns, [(column, definition)], function(*sources) -> values)
+DERIVED_COLUMNS = {
+    "qualifying": (
+        "qualifyId", ("q1", "q2", "q3"),
+        [("q1_ms", "INT NULL"), ("q2_ms", "INT NULL"), ("q3_ms", "INT NULL"), ("best_ms", "INT NULL")],
+        qualifying_ms
+    ),
+}
+
+# Added to whatif_scenarios when missing; app.py only reads them.
+# parent_scenario_id links a copy-on-write clone to its parent.
+WHATIF_COLUMNS = [
+    ("parent_scenario_id", "INT NULL"),
+]
+
+STATE_TABLES_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS ingest_checksums (
+        table_name VARCHAR(64) NOT NULL,
+        group_key  VARCHAR(32) NOT NULL,
+        season     INT NOT NULL,
+        checksum   CHAR(40) NOT NULL,
+        loaded_at  DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        PRIMARY KEY (table_name, group_key)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS data_version (
+        id         TINYINT NOT NULL PRIMARY KEY,
+        version    BIGINT NOT NULL,
+        updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    )
+    """,
+]
+
+SEASON_STATS_TABLES_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS driver_season_stats (
+        driverId    INT NOT NULL,
+        year        INT NOT NULL,
+        totalPoints FLOAT NOT NULL,
+        wins        INT NOT NULL,
+        dnfs        INT NOT NULL,
+        avgFinish   DOUBLE NULL,
+        avgQual     DOUBLE NULL,
+        racePoints  DOUBLE NOT NULL,
+        raceCount   INT NOT NULL,
+        PRIMARY KEY (driverId, year)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS constructor_season_stats (
+        constructorId INT NOT NULL,
+        year          INT NOT NULL,
+        totalPoints   FLOAT NOT NULL,
+        wins          INT NOT NULL,
+        dnfs          INT NOT NULL,
+        avgFinish     DOUBLE NULL,
+        avgQual       DOUBLE NULL,
+        racePoints    DOUBLE NOT NULL,
+        raceCount     INT NOT NULL,
+        PRIMARY KEY (constructorId, year)
+    )
+    """,
+]
+
+# Same definitions as the per-year metric queries in app.py (DRIVER_METRIC_SQL etc.),
+# aggregated for every entity of the given seasons at once. {key} is driverId or
+# constructorId, {standings} the matching standings table, {seasons} the IN list.
+SEASON_STATS_REFRESH_SQL = """
+    INSERT INTO {table}
+        ({key}, year, totalPoints, wins, dnfs, avgFinish, avgQual, racePoints, raceCount)
+    SELECT res.{key}, r.year,
+           COALESCE(MAX(st.maxPoints), 0),
+           SUM(CASE WHEN res.position = '1' THEN 1 ELSE 0 END),
+           SUM(CASE WHEN s.status LIKE 'Ret%' OR s.status IN ('Crash','Engine','Accident')
+                      OR res.position = 'Ret'
+                      OR res.position REGEXP '[^0-9]+'
+                    THEN 1 ELSE 0 END),
+           AVG(CASE WHEN res.position REGEXP '^[0-9]+$' THEN res.position+0 END),
+           AVG(NULLIF(res.grid, 0)),
+           COALESCE(SUM(res.points), 0),
+           COUNT(*)
+    FROM results res
+    JOIN races r ON res.raceId = r.raceId
+    LEFT JOIN status s ON res.statusId = s.statusId
+    LEFT JOIN (
+        SELECT sd.{key}, r2.year, MAX(sd.points) AS maxPoints
+        FROM {standings} sd
+        JOIN races r2 ON sd.raceId = r2.raceId
+        WHERE r2.year IN ({seasons})
+        GROUP BY sd.{key}, r2.year
+    ) st ON st.{key} = res.{key} AND st.year = r.year
+    WHERE r.year IN ({seasons})
+    GROUP BY res.{key}, r.year
+"""
+
+SEASON_STATS = [
+    ("driver_season_stats",      "driverId",      "driverstandings"),
+    ("constructor_season_stats", "constructorId", "constructorstandings"),
+]
+
+def refresh_season_stats(connection, seasons=None):
+    """Rebuild the season summary rows for `seasons` (every season when None)."""
+    cursor = connection.cursor()
+    for sql in SEASON_STATS_TABLES_SQL:
+        cursor.execute(sql)
+
+    if seasons is None:
+        cursor.execute("SELECT DISTINCT year FROM races")
+        seasons = [row[0] for row in cursor.fetchall()]
+    seasons = sorted(seasons)
+    if not seasons:
+        return
+
+    placeholders = ", ".join(["%s"] * len(seasons))
+    for table, key, standings in SEASON_STATS:
+        cursor.execute(f"DELETE FROM {table} WHERE year IN ({placeholders})", seasons)
+        cursor.execute(
+            SEASON_STATS_REFRESH_SQL.format(table=table, key=key, standings=standings, seasons=placeholders),
+            seasons + seasons
+        )
+    connection.commit()
+    cursor.close()
+    print(f"season stats: refreshed {len(seasons)} seasons")
+
+def ensure_whatif_columns(connection):
+    """Add any missing WHATIF_COLUMNS, if this database has the what-if tables at all."""
+    cursor = connection.cursor()
+    cursor.execute("""
+        SELECT column_name
+        FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = 'whatif_scenarios'
+    """)
+    existing = {row[0] for row in cursor.fetchall()}
+    missing = [(name, definition) for name, definition in WHATIF_COLUMNS if name not in existing]
+    if existing and missing:
+        for name, definition in missing:
+            cursor.execute(f"ALTER TABLE whatif_scenarios ADD COLUMN `{name}` {definition}")
+        print(f"whatif_scenarios: added {', '.join(name for name, _ in missing)}")
+    cursor.close()
+
+def connect():
+    return mysql.connector.connect(
+        host=os.getenv("DB_HOST"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        database=os.getenv("DB_NAME"),
+        allow_local_infile=True
+    )
+
+def read_csv(path):
+    """Return (header, rows) with the Ergast \\N marker turned into None."""
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rows = [[None if value == NULL else value for value in row] for row in reader]
+    return header, rows
+
+def checksum(rows):
+    digest = hashlib.sha1()
+    for row in rows:
+        digest.update("\x1f".join(NULL if v is None else v for v in row).encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+class Ingest:
+    def __init__(self, connection, csv_dir, method="insert", batch_size=5000, seasons=None, full=False):
+        self.connection = connection
+        self.cursor = connection.cursor()
+        self.csv_dir = csv_dir
+        self.method = method
+        self.batch_size = batch_size
+        self.seasons = seasons
+        self.full = full
+
+        self.touched_tables = set()
+        self.touched_seasons = set()
+        self.race_season = {}   # raceId -> year, from races.csv
+        self.known_checksums = {}
+        self.known_seasons = {}  # (table, group_key) -> season, for every group loaded before
+
+    # -- state ----------------------------------------------------------
+
+    def load_state(self):
+        for sql in STATE_TABLES_SQL:
+            self.cursor.execute(sql)
+        self.cursor.execute("SELECT table_name, group_key, season, checksum FROM ingest_checksums")
+        rows = self.cursor.fetchall()
+        self.known_checksums = {(t, k): c for t, k, _, c in rows}
+        self.known_seasons = {(t, k): season for t, k, season, _ in rows}
+        self.ensure_derived_columns()
+
+    def ensure_derived_columns(self):
+        """Add any missing DERIVED_COLUMNS and fill them in for the rows already loaded."""
+        for table, (key, sources, columns, derive) in DERIVED_COLUMNS.items():
+            self.cursor.execute("""
+                SELECT column_name
+                FROM information_schema.columns
+                WHERE table_schema = DATABASE() AND table_name = %s
+            """, (table,))
+            existing = {row[0] for row in self.cursor.fetchall()}
+            missing = [(name, definition) for name, definition in columns if name not in existing]
+            if not existing or not missing:
+                continue
+
+            for name, definition in missing:
+                self.cursor.execute(f"ALTER TABLE `{table}` ADD COLUMN `{name}` {definition}")
+
+            self.cursor.execute(f"SELECT `{key}`, {', '.join(f'`{c}`' for c in sources)} FROM `{table}`")
+            updates = [derive(*values) + [key_value] for key_value, *values in self.cursor.fetchall()]
+            assignments = ", ".join(f"`{name}` = %s" for name, _ in columns)
+            for start in range(0, len(updates), self.batch_size):
+                self.cursor.executemany(
+                    f"UPDATE `{table}` SET {assignments} WHERE `{key}` = %s", updates[start:start + self.batch_size]
+                )
+            self.connection.commit()
+            self.touched_tables.add(table)
+            print(f"{table}: added {', '.join(name for name, _ in missing)}, back-filled {len(updates)} rows")
+
+    def changed_groups(self, table, groups):
+        """Filter {group_key: (season, rows)} down to the groups that need reloading."""
+        changed = {}
+        for key, (season, rows) in groups.items():
+            if self.seasons is not None and season != 0 and season not in self.seasons:
+                continue
+            digest = checksum(rows)
+            if self.full or self.known_checksums.get((table, str(key))) != digest:
+                changed[key] = (season, rows, digest)
+        return changed
+
+    def removed_groups(self, table, keys):
+        """{group_key: season} of the groups loaded before that aren't among `keys` any more."""
+        keys = {str(key) for key in keys}
+        return {
+            key: season for (t, key), season in self.known_seasons.items()
+            if t == table and key not in keys
+            and (self.seasons is None or season == 0 or season in self.seasons)
+        }
+
+    def forget_groups(self, table, removed):
+        keys = list(removed)
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            self.cursor.execute(
+                f"DELETE FROM ingest_checksums WHERE table_name = %s AND group_key IN ({', '.join(['%s'] * len(chunk))})",
+                [table] + chunk
+            )
+
+    def record_checksums(self, table, changed):
+        self.cursor.executemany("""
+            INSERT INTO ingest_checksums (table_name, group_key, season, checksum)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE season = VALUES(season), checksum = VALUES(checksum)
+        """, [(table, str(key), season, digest) for key, (season, _, digest) in changed.items()])
+
+    # -- writing --------------------------------------------------------
+
+    def write_rows(self, table, header, rows, replace=False):
+        if not rows:
+            return
+        if self.method == "load-data":
+            self.load_data(table, header, rows, replace)
+            return
+
+        columns = ", ".join(f"`{c}`" for c in header)
+        placeholders = ", ".join(["%s"] * len(header))
+        sql = f"INSERT INTO `{table}` ({columns}) VALUES ({placeholders})"
+        if replace:
+            sql += " ON DUPLICATE KEY UPDATE " + ", ".join(f"`{c}` = VALUES(`{c}`)" for c in header)
+
+        # mysql.connector rewrites executemany on an INSERT into multi-row INSERTs
+        for start in range(0, len(rows), self.batch_size):
+            self.cursor.executemany(sql, rows[start:start + self.batch_size])
+
+    def load_data(self, table, header, rows, replace):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", newline='', encoding='utf-8', delete=False) as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerows([[NULL if v is None else v for v in row] for row in rows])
+            path = f.name
+        try:
+            columns = ", ".join(f"`{c}`" for c in header)
+            self.cursor.execute(f"""
+                LOAD DATA LOCAL INFILE %s
+                {"REPLACE" if replace else ""} INTO TABLE `{table}`
+                FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"'
+                LINES TERMINATED BY '\\n'
+                ({columns})
+            """, (path,))
+        finally:
+            os.unlink(path)
+
+    # -- tables ---------------------------------------------------------
+
+    def load_reference_table(self, filename, table):
+        path = os.path.join(self.csv_dir, filename)
+        if not os.path.exists(path):
+            return
+        header, rows = read_csv(path)
+        changed = self.changed_groups(table, {"all": (0, rows)})
+        if not changed:
+            return
+
+        self.write_rows(table, header, rows, replace=True)
+        key = header[0]
+        self.cursor.execute(f"SELECT `{key}` FROM `{table}`")
+        in_csv = {row[0] for row in rows}
+        gone = [value for value, in self.cursor.fetchall() if str(value) not in in_csv]
+        for start in range(0, len(gone), 500):
+            chunk = gone[start:start + 500]
+            self.cursor.execute(f"DELETE FROM `{table}` WHERE `{key}` IN ({', '.join(['%s'] * len(chunk))})", chunk)
+        self.record_checksums(table, changed)
+        self.connection.commit()
+        self.touched_tables.add(table)
+        print(f"{table}: upserted {len(rows)} rows" + (f", deleted {len(gone)}" if gone else ""))
+
+    def load_races(self):
+        header, rows = read_csv(os.path.join(self.csv_dir, "races.csv"))
+        race_idx, year_idx = header.index("raceId"), header.index("year")
+
+        by_year = defaultdict(list)
+        for row in rows:
+            year = int(row[year_idx])
+            self.race_season[row[race_idx]] = year
+            by_year[year].append(row)
+
+        changed = self.changed_groups("races", {year: (year, year_rows) for year, year_rows in by_year.items()})
+        removed = self.removed_groups("races", by_year)
+        if not changed and not removed:
+            return
+
+        years = list(changed) + [int(year) for year in removed]
+        self.cursor.execute(
+            f"DELETE FROM races WHERE year IN ({', '.join(['%s'] * len(years))})", years
+        )
+        self.write_rows("races", header, [row for _, year_rows, _ in changed.values() for row in year_rows])
+        self.record_checksums("races", changed)
+        self.forget_groups("races", removed)
+        self.connection.commit()
+
+        self.touched_tables.add("races")
+        self.touched_seasons.update(years)
+        print(f"races: reloaded seasons {sorted(changed)}" + (f", deleted {sorted(map(int, removed))}" if removed else ""))
+
+    def load_race_table(self, filename, table):
+        path = os.path.join(self.csv_dir, filename)
+        if not os.path.exists(path):
+            return
+        header, rows = read_csv(path)
+        race_idx = header.index("raceId")
+
+        by_race = defaultdict(list)
+        for row in rows:
+            by_race[row[race_idx]].append(row)
+
+        # rows of a race that isn't in races.csv (any more) aren't loaded, and go if they were
+        groups = {
+            race_id: (self.race_season[race_id], race_rows)
+            for race_id, race_rows in by_race.items() if race_id in self.race_season
+        }
+        changed = self.changed_groups(table, groups)
+        removed = self.removed_groups(table, groups)
+        if not changed and not removed:
+            return
+
+        race_ids = list(changed) + list(removed)
+        for start in range(0, len(race_ids), 500):
+            chunk = race_ids[start:start + 500]
+            self.cursor.execute(
+                f"DELETE FROM `{table}` WHERE raceId IN ({', '.join(['%s'] * len(chunk))})", chunk
+            )
+        changed_rows = [row for _, race_rows, _ in changed.values() for row in race_rows]
+        if table in DERIVED_COLUMNS:
+            _, sources, columns, derive = DERIVED_COLUMNS[table]
+            source_idx = [header.index(c) for c in sources]
+            changed_rows = [row + derive(*(row[i] for i in source_idx)) for row in changed_rows]
+            header = header + [name for name, _ in columns]
+        self.write_rows(table, header, changed_rows)
+        self.record_checksums(table, changed)
+        self.forget_groups(table, removed)
+        self.connection.commit()
+
+        self.touched_tables.add(table)
+        self.touched_seasons.update(season for season, _, _ in changed.values() if season)
+        self.touched_seasons.update(season for season in removed.values() if season)
+        print(f"{table}: reloaded {len(changed)} races, {len(changed_rows)} rows"
+              + (f", deleted {len(removed)} races" if removed else ""))
+
+    # -- after the load -------------------------------------------------
+
+    def rebuild_indexes(self):
+        for table, index_name, columns in DERIVED_INDEXES:
+            self.cursor.execute("""
+                SELECT COUNT(*)
+                FROM information_schema.statistics
+                WHERE table_schema = DATABASE()
+                  AND table_name = %s
+                  AND index_name = %s
+            """, (table, index_name))
+            if self.cursor.fetchone()[0] == 0:
+                self.cursor.execute(f"CREATE INDEX `{index_name}` ON `{table}` ({columns})")
+                print(f"created index {index_name}")
+
+        for table in sorted(self.touched_tables):
+            self.cursor.execute(f"ANALYZE TABLE `{table}`")
+            self.cursor.fetchall()
+
+    def bump_data_version(self):
+        self.cursor.execute("""
+            INSERT INTO data_version (id, version) VALUES (1, 1)
+            ON DUPLICATE KEY UPDATE version = version + 1
+        """)
+        self.cursor.execute("SELECT version FROM data_version WHERE id = 1")
+        version = self.cursor.fetchone()[0]
+        self.connection.commit()
+        return version
+
+    def run(self):
+        self.load_state()
+        for filename, table in REFERENCE_TABLES:
+            self.load_reference_table(filename, table)
+        self.load_races()
+        for filename, table in RACE_TABLES:
+            self.load_race_table(filename, table)
+
+        if not self.touched_tables:
+            print("Nothing changed.")
+            return None
+
+        self.rebuild_indexes()
+        refresh_season_stats(self.connection, self.touched_seasons)
+        version = self.bump_data_version()
+
+        print(f"Touched seasons: {sorted(self.touched_seasons)}; data version is now {version}")
+        return version
+
+# Everything the read-only routes query, copied into the embedded file
+EMBEDDED_TABLES = (
+    [table for _, table in REFERENCE_TABLES]
+    + ["races"]
+    + [table for _, table in RACE_TABLES]
+    + [table for table, _, _ in SEASON_STATS]
+    + ["data_version"]
+)
+
+INTEGER_TYPES = {"tinyint", "smallint", "mediumint", "int", "bigint", "year"}
+REAL_TYPES = {"float", "double", "decimal"}
+
+def sqlite_column_type(mysql_type):
+    if mysql_type in INTEGER_TYPES:
+        return "INTEGER"
+    if mysql_type in REAL_TYPES:
+        return "REAL"
+    # NOCASE keeps ORDER BY name in line with MySQL's case-insensitive collation
+    return "TEXT COLLATE NOCASE"
+
+def sqlite_value(value):
+    if value is None or isinstance(value, (int, float, str, bytes)):
+        return value
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)  # dates, times
+
+def export_sqlite(connection, path, batch_size=10000):
+    """Copy EMBEDDED_TABLES from MySQL into a fresh SQLite file at `path`."""
+    cursor = connection.cursor()
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.unlink(tmp_path)
+    embedded = sqlite3.connect(tmp_path)
+
+    for table in EMBEDDED_TABLES:
+        cursor.execute("""
+            SELECT column_name, data_type
+            FROM information_schema.columns
+            WHERE table_schema = DATABASE() AND table_name = %s
+            ORDER BY ordinal_position
+        """, (table,))
+        columns = cursor.fetchall()
+        if not columns:
+            print(f"{table}: not in MySQL, skipped")
+            continue
+
+        column_defs = ", ".join(f'"{name}" {sqlite_column_type(data_type.lower())}' for name, data_type in columns)
+        embedded.execute(f'CREATE TABLE "{table}" ({column_defs})')
+
+        insert_sql = f'INSERT INTO "{table}" VALUES ({", ".join(["?"] * len(columns))})'
+        cursor.execute(f"SELECT * FROM `{table}`")
+        copied = 0
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            embedded.executemany(insert_sql, [tuple(sqlite_value(v) for v in row) for row in rows])
+            copied += len(rows)
+        print(f"{table}: copied {copied} rows")
+
+    existing = {row[0] for row in embedded.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    for table, index_name, index_columns in DERIVED_INDEXES:
+        if table in existing:
+            embedded.execute(f'CREATE INDEX "{index_name}" ON "{table}" ({index_columns})')
+
+    embedded.commit()
+    embedded.execute("ANALYZE")
+    embedded.close()
+    os.replace(tmp_path, path)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("csv_dir", nargs="?", help="directory holding the Ergast CSV files")
+    parser.add_argument("--method", choices=["insert", "load-data"], default="insert",
+                        help="batched multi-row INSERTs (default) or LOAD DATA LOCAL INFILE")
+    parser.add_argument("--batch-size", type=int, default=5000, help="rows per INSERT batch")
+    parser.add_argument("--seasons", help="comma-separated seasons to consider, e.g. 2024,2025")
+    parser.add_argument("--full", action="store_true", help="reload every group, ignoring checksums")
+    parser.add_argument("--refresh-stats", action="store_true", help="rebuild the season summary tables for every season")
+    parser.add_argument("--export-sqlite", metavar="PATH", help="afterwards, rebuild the embedded SQLite file at PATH")
+    args = parser.parse_args()
+
+    if not (args.csv_dir or args.refresh_stats or args.export_sqlite):
+        parser.error("give a CSV directory, --refresh-stats and/or --export-sqlite")
+    if args.csv_dir and not os.path.exists(os.path.join(args.csv_dir, "races.csv")):
+        sys.exit(f"races.csv not found in {args.csv_dir}")
+
+    seasons = {int(s) for s in args.seasons.split(',')} if args.seasons else None
+
+    started = time.perf_counter()
+    connection = connect()
+    try:
+        ensure_whatif_columns(connection)
+        if args.csv_dir:
+            Ingest(connection, args.csv_dir, args.method, args.batch_size, seasons, args.full).run()
+        if args.refresh_stats:
+            refresh_season_stats(connection)
+        if args.export_sqlite:
+            export_sqlite(connection, args.export_sqlite)
+    finally:
+        connection.close()
+    print(f"Done in {time.perf_counter() - started:.1f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+"""
+Replay recorded API traffic to size capacity before race weekends.
+
+1. Record: run any instance with REQUEST_LOG_PATH set; app.py appends one
+   JSON line per request (route, path, query, status, timing).
+
+       REQUEST_LOG_PATH=requests.log gunicorn -w 8 app:app
+
+2. Replay the log against a target at a chosen speed-up:
+
+       python loadtest.py replay requests.log --target http://127.0.0.1:8000 --speedup 10
+
+   or let the harness start a local instance on a fixture database (an
+   embedded SQLite file built with `python ingest.py --export-sqlite`):
+
+       python loadtest.py replay requests.log --fixture-db fixture.sqlite --speedup 20
+
+The report gives throughput, latency percentiles and error rates per route.
+Latency runs from each request's scheduled send time, so time spent waiting
+for a free client thread counts too instead of being hidden.
+Only GET requests are replayed unless --include-post is given (the AI and
+what-if routes need request bodies, which aren't recorded). With --fixture-db
+the what-if routes are skipped, since they always read MySQL.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_common import percentile
+
+# Routes that read MySQL even when the app runs on the embedded backend
+WHATIF_PREFIX = "/api/f1/whatif/"
+
+def read_log(path, include_post, limit):
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if entry["method"] != "GET" and not include_post:
+                continue
+            entries.append(entry)
+            if limit and len(entries) >= limit:
+                break
+    entries.sort(key=lambda e: e["ts"])
+    return entries
+
+def send(target, entry, timeout):
+    url = target + entry["path"] + (f"?{entry['query']}" if entry["query"] else "")
+    req = urllib.request.Request(url, method=entry["method"])
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            resp.read()
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, TimeoutError, ConnectionError):
+        return None  # connection failure / timeout
+
+def replay(entries, target, speedup, concurrency, timeout):
+    """
+    Fire every entry at its recorded offset / speedup; returns [(route, seconds, status)].
+    Seconds run from the scheduled send time, not from when a thread picked the entry up.
+    """
+    results = []
+    lock = threading.Lock()
+    first_ts = entries[0]["ts"]
+
+    def run(entry, scheduled):
+        status = send(target, entry, timeout)
+        elapsed = time.perf_counter() - scheduled
+        with lock:
+            results.append((entry.get("route") or entry["path"], elapsed, status))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for entry in entries:
+            scheduled = started + (entry["ts"] - first_ts) / speedup
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(run, entry, scheduled)
+    return results, time.perf_counter() - started
+
+def summarize(results, wall_seconds):
+    by_route = defaultdict(list)
+    for route, elapsed, status in results:
+        by_route[route].append((elapsed, status))
+
+    report = {}
+    for route, samples in sorted(by_route.items()):
+        latencies = sorted(elapsed for elapsed, _ in samples)
+        failed = sum(1 for _, status in samples if status is None or status >= 500)
+        shed = sum(1 for _, status in samples if status == 503)
+        report[route] = {
+            "requests": len(samples),
+            "throughput_rps": round(len(samples) / wall_seconds, 2) if wall_seconds else 0.0,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+            "p90_ms": round(percentile(latencies, 90) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+            "error_rate": round(failed / len(samples), 4),
+            "shed_503": shed,
+            "client_errors_4xx": sum(1 for _, status in samples if status and 400 <= status < 500),
+        }
+    return report
+
+def print_report(report, wall_seconds, total):
+    print(f"{total} requests in {wall_seconds:.1f}s ({total / wall_seconds:.1f} req/s)\n")
+    header = f"{'route':<55} {'reqs':>6} {'rps':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'err%':>6} {'503':>5}"
+    print(header)
+    print("-" * len(header))
+    for route, r in report.items():
+        print(f"{route[:55]:<55} {r['requests']:>6} {r['throughput_rps']:>8} {r['p50_ms']:>8} "
+              f"{r['p90_ms']:>8} {r['p99_ms']:>8} {r['error_rate'] * 100:>6.2f} {r['shed_503']:>5}")
+
+def start_fixture_server(fixture_db, port):
+    """Start app.py on the embedded backend and wait until it answers."""
+    env = dict(os.environ, DB_BACKEND="sqlite", EMBEDDED_DB_PATH=os.path.abspath(fixture_db))
+    env.pop("REQUEST_LOG_PATH", None)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "flask", "--app", "app", "run", "--port", str(port), "--with-threads"],
+        env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    target = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(target + "/api/f1/seasons.json", timeout=1).read()
+            return server, target
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    server.terminate()
+    sys.exit("fixture server didn't come up")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rp = sub.add_parser("replay", help="replay a recorded request log")
+    rp.add_argument("log", help="JSONL file written via REQUEST_LOG_PATH")
+    rp.add_argument("--target", help="base URL of the instance under test")
+    rp.add_argument("--fixture-db", help="start a local instance on this SQLite fixture instead of --target")
+    rp.add_argument("--port", type=int, default=8765, help="port for the --fixture-db instance")
+    rp.add_argument("--speedup", type=float, default=1.0, help="replay N times faster than recorded")
+    rp.add_argument("--concurrency", type=int, default=64, help="max requests in flight")
+    rp.add_argument("--limit", type=int, help="replay only the first N requests")
+    rp.add_argument("--include-post", action="store_true", help="also replay non-GET requests (without bodies)")
+    rp.add_argument("--timeout", type=float, default=60.0)
+    rp.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    if bool(args.target) == bool(args.fixture_db):
+        parser.error("give exactly one of --target or --fixture-db")
+
+    entries = read_log(args.log, args.include_post, args.limit)
+    if args.fixture_db:
+        replayable = [e for e in entries if not e["path"].startswith(WHATIF_PREFIX)]
+        if len(replayable) < len(entries):
+            print(f"skipping {len(entries) - len(replayable)} what-if requests (MySQL only)\n")
+        entries = replayable
+    if not entries:
+        sys.exit("nothing to replay")
+
+    server = None
+    target = args.target
+    if args.fixture_db:
+        server, target = start_fixture_server(args.fixture_db, args.port)
+    try:
+        results, wall_seconds = replay(entries, target.rstrip('/'), args.speedup, args.concurrency, args.timeout)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    report = summarize(results, wall_seconds)
+    print_report(report, wall_seconds, len(results))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"wall_seconds": wall_seconds, "routes": report}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
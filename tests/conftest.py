@@ -0,0 +1,161 @@
+"""
+Shared fixtures. app.py runs against a small embedded (SQLite) copy of the schema,
+so the routes are exercised without a MySQL server. Modules app.py / asgi.py only
+import (fastf1, openai, aiomysql, asgiref) are replaced with empty stand-ins when
+they aren't installed; none of the code under test calls into them.
+"""
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import types
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def stub_missing(name, **attrs):
+    try:
+        __import__(name)
+    except ImportError:
+        module = types.ModuleType(name)
+        module.__dict__.update(attrs)
+        sys.modules[name] = module
+        parent, _, child = name.rpartition('.')
+        if parent:
+            setattr(sys.modules[parent], child, module)
+
+
+class StubError(Exception):
+    pass
+
+
+stub_missing("fastf1", Cache=types.SimpleNamespace(enable_cache=lambda *args, **kwargs: None))
+stub_missing("openai", OpenAI=lambda **kwargs: None, AsyncOpenAI=lambda **kwargs: None)
+stub_missing("aiomysql", Error=StubError, OperationalError=StubError, DictCursor=object)
+stub_missing("asgiref")
+stub_missing("asgiref.wsgi", WsgiToAsgi=lambda wsgi_app: wsgi_app)
+
+# Schema: the columns the routes read, Ergast names
+TABLES = {
+    "circuits": ["circuitId", "circuitRef", "name"],
+    "constructors": ["constructorId", "constructorRef", "name"],
+    "drivers": ["driverId", "driverRef", "code", "forename", "surname"],
+    "status": ["statusId", "status"],
+    "races": ["raceId", "year", "round", "circuitId", "name", "date"],
+    "results": ["resultId", "raceId", "driverId", "constructorId", "grid", "position", "positionOrder",
+                "points", "statusId", "rank"],
+    "sprintresults": ["resultId", "raceId", "driverId", "constructorId", "grid", "position", "positionOrder",
+                      "points", "statusId"],
+    "qualifying": ["qualifyId", "raceId", "driverId", "constructorId", "position", "q1", "q2", "q3",
+                   "q1_ms", "q2_ms", "q3_ms", "best_ms"],
+    "laptimes": ["raceId", "driverId", "lap", "position", "time", "milliseconds"],
+    "driverstandings": ["driverStandingsId", "raceId", "driverId", "points", "position", "wins"],
+    "constructorstandings": ["constructorStandingsId", "raceId", "constructorId", "points", "position", "wins"],
+    "data_version": ["id", "version"],
+    "whatif_scenarios": ["scenario_id INTEGER PRIMARY KEY AUTOINCREMENT", "scenario_name", "season",
+                         "parent_scenario_id"],
+    "whatif_results": ["scenario_id", "raceId", "driverId", "position", "points"],
+}
+
+# 2023: rounds 1 and 2 raced (round 2 with a sprint), round 3 still to come; 2022 for history.
+# Drivers 1, 2 drive for Red Bull (9), 3, 4 for Mercedes (131).
+ROWS = {
+    "circuits": [(1, "bahrain", "Bahrain International Circuit"), (2, "jeddah", "Jeddah Corniche Circuit"),
+                 (3, "albert_park", "Albert Park Grand Prix Circuit")],
+    "constructors": [(9, "red_bull", "Red Bull"), (131, "mercedes", "Mercedes")],
+    "drivers": [(1, "max_verstappen", "VER", "Max", "Verstappen"), (2, "perez", "PER", "Sergio", "Pérez"),
+                (3, "hamilton", "HAM", "Lewis", "Hamilton"), (4, "russell", "RUS", "George", "Russell"),
+                (5, "raikkonen", "RAI", "Kimi", "Räikkönen")],
+    "status": [(1, "Finished"), (2, "Retired")],
+    "races": [(1, 2023, 1, 1, "Bahrain Grand Prix", "2023-03-05"),
+              (2, 2023, 2, 2, "Saudi Arabian Grand Prix", "2023-03-19"),
+              (3, 2023, 3, 3, "Australian Grand Prix", "2023-04-02"),
+              (10, 2022, 1, 1, "Bahrain Grand Prix", "2022-03-20")],
+    "results": [(1, 1, 1, 9, 1, 1, 1, 25.0, 1, 1), (2, 1, 2, 9, 2, 2, 2, 18.0, 1, 2),
+                (3, 1, 3, 131, 5, 3, 3, 15.0, 1, 3), (4, 1, 4, 131, 4, None, 4, 0.0, 2, 4),
+                (5, 2, 2, 9, 1, 1, 1, 25.0, 1, 2), (6, 2, 1, 9, 15, 2, 2, 18.0, 1, 1),
+                (7, 2, 4, 131, 3, 3, 3, 15.0, 1, 3), (8, 2, 3, 131, 7, 4, 4, 12.0, 1, 4),
+                (20, 10, 1, 9, 1, 1, 1, 25.0, 1, 1), (21, 10, 3, 131, 2, 2, 2, 18.0, 1, 2)],
+    "sprintresults": [(1, 2, 1, 9, 1, 1, 1, 8.0, 1), (2, 2, 2, 9, 2, 2, 2, 7.0, 1),
+                      (3, 2, 3, 131, 3, 3, 3, 6.0, 1), (4, 2, 4, 131, 4, 4, 4, 5.0, 1)],
+    "qualifying": [(1, 1, 1, 9, 1, "1:31.295", "1:30.503", "1:29.708", 91295, 90503, 89708, 89708),
+                   (2, 1, 2, 9, 2, "1:31.479", "1:30.746", "1:29.846", 91479, 90746, 89846, 89846),
+                   (3, 1, 3, 131, 3, "1:31.500", "1:31.000", None, 91500, 91000, None, 91000),
+                   (4, 1, 4, 131, 4, "1:31.600", None, None, 91600, None, None, 91600)],
+    "laptimes": [(1, 1, 1, 1, "1:37.284", 97284), (1, 2, 1, 2, "1:37.901", 97901),
+                 (1, 1, 2, 1, "1:36.992", 96992), (1, 2, 2, 2, "1:37.110", 97110)],
+    "driverstandings": [(1, 1, 1, 25.0, 1, 1), (2, 1, 2, 18.0, 2, 0), (3, 1, 3, 15.0, 3, 0), (4, 1, 4, 0.0, 4, 0),
+                        (5, 2, 1, 51.0, 1, 1), (6, 2, 2, 50.0, 2, 1), (7, 2, 3, 33.0, 3, 0), (8, 2, 4, 20.0, 4, 0),
+                        (9, 10, 1, 25.0, 1, 1), (10, 10, 3, 18.0, 2, 0)],
+    "constructorstandings": [(1, 1, 9, 43.0, 1, 1), (2, 1, 131, 15.0, 2, 0),
+                             (3, 2, 9, 101.0, 1, 2), (4, 2, 131, 53.0, 2, 0),
+                             (5, 10, 9, 25.0, 1, 1), (6, 10, 131, 18.0, 2, 0)],
+    "data_version": [(1, 1)],
+}
+
+
+def column_type(values):
+    """The type ingest.export_sqlite would give a column holding `values`."""
+    kinds = {type(value) for value in values if value is not None}
+    if kinds <= {int}:
+        return "INTEGER"
+    if kinds <= {int, float}:
+        return "REAL"
+    return "TEXT COLLATE NOCASE"
+
+
+def build_fixture_db(path):
+    connection = sqlite3.connect(path)
+    for table, columns in TABLES.items():
+        rows = ROWS.get(table, [])
+        column_defs = [
+            column if " " in column else f'"{column}" {column_type(row[i] for row in rows)}'
+            for i, column in enumerate(columns)
+        ]
+        connection.execute(f'CREATE TABLE "{table}" ({", ".join(column_defs)})')
+        if rows:
+            placeholders = ", ".join(["?"] * len(rows[0]))
+            connection.executemany(f'INSERT INTO "{table}" VALUES ({placeholders})', rows)
+    connection.commit()
+    connection.close()
+
+
+FIXTURE_DB = os.path.join(tempfile.mkdtemp(prefix="f1-tests-"), "fixture.sqlite")
+build_fixture_db(FIXTURE_DB)
+
+os.environ.update({"DB_BACKEND": "sqlite", "EMBEDDED_DB_PATH": FIXTURE_DB, "CACHE_BACKEND": "none"})
+for name in ("REQUEST_LOG_PATH", "PROFILE_TOKEN", "PROFILE_SAMPLE_RATE"):
+    os.environ.pop(name, None)
+
+import app as f1  # noqa: E402  (after the environment is set up)
+
+# Warm-up and index threads would race the per-test databases; tests start them explicitly
+f1._warm_on_start["pending"] = False
+
+
+class WritableConnection(f1.EmbeddedConnection):
+    """EmbeddedConnection opened read-write, standing in for MySQL on the what-if routes."""
+    def __init__(self, path):
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.create_function("REGEXP", 2, f1._sqlite_regexp, deterministic=True)
+        self._connection.create_function("CONCAT", -1, f1._sqlite_concat, deterministic=True)
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    """A fresh copy of the fixture database behind both get_db_connection and get_mysql_connection."""
+    path = str(tmp_path / "f1.sqlite")
+    shutil.copy(FIXTURE_DB, path)
+    monkeypatch.setattr(f1, "EMBEDDED_DB_PATH", path)
+    monkeypatch.setattr(f1, "get_mysql_connection", lambda: f1.ManagedConnection(WritableConnection(path)))
+    f1.season_cache.clear()
+    return path
+
+
+@pytest.fixture
+def client(db_path):
+    return f1.app.test_client()
@@ -0,0 +1,50 @@
+import threading
+import time
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def closed_cheap_gate(monkeypatch):
+    gate = app.AdmissionGate("cheap", limit=0, queue=0, timeout=0.01, retry_after=7)
+    monkeypatch.setitem(app.ADMISSION_GATES, "cheap", gate)
+    return gate
+
+
+def test_full_gate_sheds_with_retry_after(client, closed_cheap_gate):
+    response = client.get("/api/f1/seasons.json")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "7"
+    assert "cheap" in response.get_json()["error"]
+
+    assert client.get("/api/f1/2023/1/results.json").status_code == 200  # other classes are unaffected
+    assert client.get("/api/metrics.json").status_code == 200  # exempt
+
+
+def test_cache_warm_requests_skip_admission(client, closed_cheap_gate):
+    assert app.run_internal_request("/api/f1/seasons.json")["status"] == 503
+    assert app.run_internal_request("/api/f1/seasons.json", warming=True)["status"] == 200
+
+
+def test_gate_queues_then_times_out():
+    gate = app.AdmissionGate("test", limit=1, queue=1, timeout=0.05, retry_after=1)
+    assert gate.acquire()
+    assert not gate.acquire()  # queued, nothing released in time
+    assert gate.waiting == 0
+
+
+def test_gate_admits_a_queued_request_on_release():
+    gate = app.AdmissionGate("test", limit=1, queue=1, timeout=5, retry_after=1)
+    assert gate.acquire()
+    admitted = []
+    waiter = threading.Thread(target=lambda: admitted.append(gate.acquire()))
+    waiter.start()
+    while gate.waiting == 0:
+        time.sleep(0.001)
+    assert not gate.acquire()  # the one queue slot is taken
+
+    gate.release()
+    waiter.join()
+    assert admitted == [True] and gate.active == 1
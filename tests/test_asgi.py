@@ -0,0 +1,85 @@
+import asyncio
+import json
+
+import pytest
+
+import app
+import asgi
+
+
+def call(target, method, path, query=b"", body=b"", native=False):
+    """Run one request through asgi.application (or serve_native, with `target` as the handler); returns (status, body)."""
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": method, "path": path, "query_string": query, "headers": []}
+    if native:
+        asyncio.run(asgi.serve_native(target, scope, receive, send))
+    else:
+        asyncio.run(target(scope, receive, send))
+    payload = b"".join(message.get("body", b"") for message in sent[1:])
+    return sent[0]["status"], json.loads(payload)
+
+
+@pytest.fixture
+def native_mysql(monkeypatch):
+    monkeypatch.setattr(app, "DB_BACKEND", "mysql")
+
+
+def test_native_and_flask_reject_bad_years_alike(client, native_mysql):
+    status, body = call(asgi.application, "GET", "/api/f1/multiYearDriverComparison",
+                        b"drivers=hamilton&startYear=abc")
+    flask_response = client.get("/api/f1/multiYearDriverComparison?drivers=hamilton&startYear=abc")
+
+    assert status == flask_response.status_code == 400
+    assert body == flask_response.get_json() == {"error": app.YEAR_RANGE_ERROR}
+
+
+def test_native_handler_errors_are_500s(caplog):
+    async def broken(args, body):
+        raise KeyError("internal detail")
+
+    status, body = call(broken, "GET", "/api/f1/multiYearDriverComparison", native=True)
+
+    assert status == 500
+    assert body == {"error": "Internal Server Error"}
+    assert "internal detail" in caplog.text  # logged, not sent
+
+
+def test_native_deadline_is_a_504(monkeypatch):
+    async def slow(args, body):
+        await asyncio.sleep(1)
+
+    monkeypatch.setitem(app.ROUTE_DEADLINES_MS, "slow", 10)
+    status, body = call(slow, "GET", "/api/f1/slow", native=True)
+    assert status == 504
+    assert "10 ms" in body["error"]
+
+
+def test_multi_year_routes_go_to_flask_on_the_embedded_backend(client, monkeypatch):
+    handed = []
+
+    async def flask_application(scope, receive, send):
+        handed.append(scope["path"])
+        await asgi.send_json(send, 200, {})
+
+    monkeypatch.setattr(asgi, "flask_application", flask_application)
+    monkeypatch.setattr(app, "DB_BACKEND", "sqlite")
+    call(asgi.application, "GET", "/api/f1/multiYearDriverComparison", b"drivers=1")
+
+    monkeypatch.setattr(app, "DB_BACKEND", "mysql")
+    call(asgi.application, "GET", "/api/f1/multiYearDriverComparison", b"drivers=1&startYear=x")
+
+    assert handed == ["/api/f1/multiYearDriverComparison"]
+
+
+def test_multi_year_comparison_on_the_embedded_backend(client):
+    body = client.get("/api/f1/multiYearDriverComparison?drivers=1,3&startYear=2022&endYear=2023").get_json()
+    results = body["MRData"]["MultiYearDriverComparison"]
+    assert [point["year"] for point in results["1"]["yearlyPoints"]] == [2022, 2023]
+    assert results["1"]["yearlyPoints"][1]["points"] == 51
@@ -0,0 +1,48 @@
+import pytest
+
+import app
+
+
+def test_batch_runs_sub_requests_in_order(client):
+    response = client.post("/api/f1/batch", json={"requests": [
+        "/api/f1/seasons.json",
+        {"path": "/api/f1/2023/1/results.json", "args": {"fields": "position"}},
+        "/api/f1/2023/drivers.json",
+    ]})
+    assert response.status_code == 200
+    responses = response.get_json()["responses"]
+
+    assert [r["path"] for r in responses] == [
+        "/api/f1/seasons.json", "/api/f1/2023/1/results.json", "/api/f1/2023/drivers.json"
+    ]
+    assert all(r["status"] == 200 for r in responses)
+    seasons = responses[0]["body"]["MRData"]["SeasonTable"]["Seasons"]
+    assert [s["season"] for s in seasons] == ["2023", "2022"]
+    results = responses[1]["body"]["MRData"]["RaceTable"]["Races"][0]["Results"]
+    assert results[0] == {"position": 1}
+
+
+@pytest.mark.parametrize("body, error", [
+    ({"requests": ["/api/f1/batch"]}, "Batches can't be nested"),
+    ({"requests": []}, "requests must be a non-empty array"),
+    ({"requests": ["/api/ai/insights"]}, "Invalid batch entry"),
+    ({"requests": [{"path": "/api/f1/seasons.json?x=1", "args": {"y": "2"}}]}, "either a query string or args"),
+    (["/api/f1/seasons.json"], "Body must be a JSON object"),
+])
+def test_batch_rejects_invalid_bodies(client, body, error):
+    response = client.post("/api/f1/batch", json=body)
+    assert response.status_code == 400
+    assert error in response.get_json()["error"]
+
+
+def test_batch_sub_request_failure_is_generic(client, monkeypatch):
+    def broken(**kwargs):
+        raise RuntimeError("SELECT secret FROM internals")
+
+    monkeypatch.setitem(app.app.view_functions, "get_season_races", broken)
+    response = client.post("/api/f1/batch", json={"requests": ["/api/f1/2023.json", "/api/f1/seasons.json"]})
+
+    failed, ok = response.get_json()["responses"]
+    assert failed["status"] == 500
+    assert failed["body"] == {"error": "Internal Server Error"}
+    assert ok["status"] == 200
@@ -0,0 +1,43 @@
+import numpy as np
+
+import app
+
+
+def test_byte_budget_lru_evicts_least_recently_used():
+    item = app.object_bytes(list(range(100)))
+    cache = app.ByteBudgetLRU("test", max_bytes=3 * item)
+    for key in "abc":
+        cache.set(key, list(range(100)))
+    cache.get("a")  # "b" is now the least recently used
+    cache.set("d", list(range(100)))
+
+    assert cache.get("b") is None
+    assert all(cache.get(key) is not None for key in "acd")
+    assert cache._bytes == 3 * item
+
+
+def test_byte_budget_lru_skips_values_over_the_budget():
+    cache = app.ByteBudgetLRU("test", max_bytes=1024)
+    cache.set("small", 1)
+    cache.set("big", np.zeros(1024))
+
+    assert cache.get("big") is None
+    assert cache.get("small") == 1
+
+
+def test_byte_budget_lru_replacing_a_key_keeps_accounting():
+    cache = app.ByteBudgetLRU("test", max_bytes=1 << 20, max_entries=2)
+    cache.set("a", list(range(10)))
+    cache.set("a", list(range(1000)))
+    assert cache._bytes == app.object_bytes(list(range(1000)))
+
+    cache.set("b", 1)
+    cache.set("c", 2)
+    assert cache.get("a") is None
+    assert len(cache._entries) == 2
+
+
+def test_object_bytes_counts_view_buffers():
+    base = np.zeros(1000)
+    assert app.object_bytes(base[:500]) >= 500 * base.itemsize
+
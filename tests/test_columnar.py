@@ -0,0 +1,86 @@
+import sys
+
+import pytest
+
+import app
+
+pa = pytest.importorskip("pyarrow")
+
+ARROW = {"Accept": "application/vnd.apache.arrow.stream"}
+
+
+def read_arrow(response):
+    return pa.ipc.open_stream(response.get_data()).read_all()
+
+
+def test_all_driver_standings_as_arrow(client):
+    response = client.get("/api/f1/2023/allDriverStandings.json", headers=ARROW)
+    assert response.mimetype == "application/vnd.apache.arrow.stream"
+    assert "Accept" in response.headers["Vary"]
+    assert 'filename="allDriverStandings-2023.arrow"' in response.headers["Content-Disposition"]
+
+    table = read_arrow(response)
+    assert table.schema.field("points").type == pa.float64()
+    lists = client.get("/api/f1/2023/allDriverStandings.json").get_json()["standings"]
+    rows = table.to_pylist()
+    assert [(row["round"], row["driverId"], row["points"]) for row in rows] == [
+        (int(round_num), entry["driverId"], entry["points"])
+        for round_num, entries in lists.items() for entry in entries
+    ]
+
+
+def test_json_stays_the_default(client):
+    for accept in (None, "*/*", "application/json, application/vnd.apache.arrow.stream"):
+        response = client.get("/api/f1/2023/gridVsFinish.json", headers={"Accept": accept} if accept else {})
+        assert response.mimetype == "application/json"
+        assert "Accept" in response.headers["Vary"]
+
+
+def test_grid_vs_finish_as_parquet(client):
+    import pyarrow.parquet as pq
+
+    response = client.get("/api/f1/2023/gridVsFinish.json", headers={"Accept": "application/vnd.apache.parquet"})
+    assert response.mimetype == "application/vnd.apache.parquet"
+
+    table = pq.read_table(pa.BufferReader(response.get_data()))
+    data = client.get("/api/f1/2023/gridVsFinish.json").get_json()["data"]
+    assert table.to_pylist() == data
+
+
+def test_results_table_as_arrow_has_a_row_per_result(client):
+    rows = read_arrow(client.get("/api/f1/2023/driverResultsTable.json", headers=ARROW)).to_pylist()
+    drivers = client.get("/api/f1/2023/driverResultsTable.json").get_json()["MRData"]["StandingsTable"]["DriverResults"]
+
+    assert [(row["driverId"], row["round"], row["position"]) for row in rows] == [
+        (entry["Driver"]["driverId"], int(rnd), str(pos))
+        for entry in drivers for rnd, pos in entry["Races"].items() if pos != ""
+    ]
+    assert rows[0]["totalPoints"] == drivers[0]["TotalPoints"]
+
+
+def test_columnar_responses_bypass_the_response_cache(client, monkeypatch):
+    monkeypatch.setattr(app, "response_cache", app.LRUCacheBackend(1 << 20))
+    assert client.get("/api/f1/2023/allConstructorStandings.json").headers["X-Cache"] == "MISS"
+    response = client.get("/api/f1/2023/allConstructorStandings.json", headers=ARROW)
+    assert response.mimetype == "application/vnd.apache.arrow.stream"
+    assert "X-Cache" not in response.headers
+
+
+def test_columnar_without_pyarrow_is_a_406(client, monkeypatch):
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    response = client.get("/api/f1/2023/allDriverStandings.json", headers=ARROW)
+    assert response.status_code == 406
+    assert "pyarrow" in response.get_json()["error"]
+
+
+def test_write_columnar_types_numbers_and_keeps_nulls(tmp_path):
+    path = str(tmp_path / "out.arrow")
+    batches = [[(1, 1.5, "a", None), (2, None, "b", None)], [(None, 2.0, 3, None)]]
+    app.write_columnar(["id", "time", "label", "empty"], iter(batches), "arrow", path)
+
+    with pa.OSFile(path) as source:
+        table = pa.ipc.open_stream(source).read_all()
+    assert [field.type for field in table.schema] == [pa.int64(), pa.float64(), pa.string(), pa.string()]
+    assert table.column("id").to_pylist() == [1, 2, None]
+    assert table.column("time").to_pylist() == [1.5, None, 2.0]
+    assert table.column("label").to_pylist() == ["a", "b", "3"]  # mixed types become strings
@@ -0,0 +1,100 @@
+import threading
+
+import mysql.connector
+import pytest
+
+import app
+
+get_mysql_connection = app.get_mysql_connection  # conftest swaps in the SQLite stand-in per test
+
+
+class FakeCursor:
+    def __init__(self, raw):
+        self.raw = raw
+
+    def execute(self, sql, params=()):
+        self.raw.executed.append(sql)
+        if self.raw.failures:
+            self.raw.failures -= 1
+            raise mysql.connector.Error("Lost connection to MySQL server during query", errno=2013)
+
+    def fetchall(self):
+        return [(1, "a")]
+
+    def close(self):
+        pass
+
+
+class FakeRawConnection:
+    connection_id = 1
+    in_transaction = False
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.executed = []
+        self.cursors = 0
+        self.closed = False
+
+    def cursor(self, prepared=False):
+        self.cursors += 1
+        return FakeCursor(self)
+
+    def close(self):
+        self.closed = True
+
+
+class ExhaustedPool:
+    def get_connection(self):
+        raise mysql.connector.errors.PoolError("Failed getting connection; pool exhausted")
+
+
+@pytest.fixture
+def exhausted_pool(monkeypatch):
+    monkeypatch.setattr(app, "_mysql_pool", ExhaustedPool())
+    monkeypatch.setattr(app, "_overflow_slots", threading.BoundedSemaphore(2))
+    monkeypatch.setattr(app.mysql.connector, "connect", lambda **config: FakeRawConnection())
+
+
+def test_overflow_connections_are_capped(exhausted_pool):
+    first, second = get_mysql_connection(), get_mysql_connection()
+    with pytest.raises(app.DatabaseBusy):
+        get_mysql_connection()
+
+    first.close()
+    third = get_mysql_connection()  # the closed connection's slot is free again
+    second.close()
+    third.close()
+
+
+def test_failed_overflow_connect_frees_its_slot(exhausted_pool, monkeypatch):
+    def refuse(**config):
+        raise mysql.connector.errors.InterfaceError("Can't connect")
+
+    monkeypatch.setattr(app.mysql.connector, "connect", refuse)
+    for _ in range(3):
+        with pytest.raises(mysql.connector.errors.InterfaceError):
+            get_mysql_connection()
+
+
+def test_busy_database_is_a_503(client, monkeypatch):
+    def busy():
+        raise app.DatabaseBusy()
+
+    monkeypatch.setattr(app, "get_mysql_connection", busy)
+    monkeypatch.setattr(app, "DB_BUSY_RETRY_AFTER", 3)
+    response = client.get("/api/f1/whatif/scenario/1")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "3"
+    assert response.get_json() == {"error": "Database busy, retry later"}
+
+
+def test_fetch_prepared_reuses_and_reprepares_statements():
+    raw = FakeRawConnection()
+    connection = app.ManagedConnection(raw)
+    assert connection.fetch_prepared(app.LAPTIMES, (2023, 1)) == [(1, "a")]
+    assert connection.fetch_prepared(app.LAPTIMES, (2023, 2)) == [(1, "a")]
+    assert raw.cursors == 1  # prepared once
+
+    raw.failures = 1  # e.g. the statement went with a reconnect
+    assert connection.fetch_prepared(app.LAPTIMES, (2023, 3)) == [(1, "a")]
+    assert raw.cursors == 2 and len(raw.executed) == 4
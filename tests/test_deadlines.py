@@ -0,0 +1,54 @@
+import time
+
+import numpy as np
+import pytest
+
+import app
+
+
+@pytest.fixture
+def spent_budget():
+    """A request context whose deadline has already passed."""
+    with app.app.test_request_context("/api/f1/export/results.ndjson",
+                                      environ_base={"f1.deadline": time.monotonic() - 1}):
+        yield
+
+
+def test_spent_budget_is_a_504(client, monkeypatch):
+    monkeypatch.setitem(app.ROUTE_DEADLINES_MS, "get_seasons", 0)
+    response = client.get("/api/f1/seasons.json")
+    assert response.status_code == 504
+    assert response.get_json() == {"error": "Request exceeded its time budget of 0 ms and was cancelled"}
+
+
+def test_simulation_stops_at_the_deadline(spent_budget):
+    cdf = np.array([[1.0, 1.0, 1.0], [0.0, 1.0, 1.0]])
+    with pytest.raises(app.QueryDeadlineExceeded):
+        app.simulate_championships([0, 0], cdf, np.array([25, 18]), races_left=3, simulations=10,
+                                   rng=np.random.default_rng(7))
+
+
+def test_rescore_stops_between_seasons(client, monkeypatch):
+    standings_at = app.standings_at
+
+    def slow_standings_at(standings):
+        time.sleep(0.2)
+        return standings_at(standings)
+
+    monkeypatch.setattr(app, "standings_at", slow_standings_at)
+    monkeypatch.setitem(app.ROUTE_DEADLINES_MS, "rescore_seasons", 300)
+    response = client.get("/api/f1/rescore.json?startYear=2022&endYear=2023")
+    assert response.status_code == 504
+
+
+def test_streamed_exports_run_without_the_deadline(db_path, spent_budget, monkeypatch):
+    interrupted = []
+    monkeypatch.setattr(app.EmbeddedConnection, "set_deadline", lambda self, deadline: interrupted.append(deadline))
+
+    columns, batches = app.open_export("results", 2023, 2023, streamed=True)
+    assert sum(len(rows) for rows in batches) == 8
+    assert interrupted == []
+
+    with pytest.raises(app.QueryDeadlineExceeded):
+        app.open_export("results", 2023, 2023)
+    assert len(interrupted) == 1
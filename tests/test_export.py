@@ -0,0 +1,54 @@
+import csv
+import io
+import json
+
+import pytest
+
+import app
+
+
+def test_ndjson_export_streams_one_object_per_row(client):
+    response = client.get("/api/f1/export/results.ndjson?startYear=2023")
+    assert response.is_streamed
+    assert response.mimetype == "application/x-ndjson"
+    assert response.headers["Content-Disposition"] == 'attachment; filename="results-2023-2023.ndjson"'
+
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert len(rows) == 8
+    assert (rows[0]["year"], rows[0]["round"], rows[0]["raceId"]) == (2023, 1, 1)
+    assert [(row["year"], row["round"]) for row in rows] == sorted((row["year"], row["round"]) for row in rows)
+
+
+def test_csv_export_by_accept_header(client):
+    response = client.get("/api/f1/2022/export/results", headers={"Accept": "text/csv"})
+    assert response.mimetype == "text/csv"
+
+    header, *rows = csv.reader(io.StringIO(response.get_data(as_text=True)))
+    assert header[:4] == ["year", "round", "resultId", "raceId"]
+    assert [row[2] for row in rows] == ["20", "21"]
+
+
+def test_export_clamps_to_existing_seasons(client):
+    response = client.get("/api/f1/export/driverStandings.csv?startYear=1900&endYear=2100")
+    assert 'filename="driverStandings-2022-2023.csv"' in response.headers["Content-Disposition"]
+    assert len(response.get_data(as_text=True).splitlines()) == 1 + 10
+
+
+def test_export_in_small_chunks(client, monkeypatch):
+    monkeypatch.setattr(app, "EXPORT_CHUNK_ROWS", 3)
+    response = client.get("/api/f1/export/results.ndjson")
+    chunks = list(response.response)
+    assert len(chunks) == 4  # 10 rows in batches of 3
+    assert len(b"".join(chunks).splitlines()) == 10
+
+
+@pytest.mark.parametrize("url, status", [
+    ("/api/f1/export/nothing.csv", 404),
+    ("/api/f1/export/results.xml", 404),
+    ("/api/f1/export/results.csv?startYear=x", 400),
+    ("/api/f1/export/results.csv?startYear=1990&endYear=1991", 404),
+])
+def test_export_errors(client, url, status):
+    response = client.get(url)
+    assert response.status_code == status
+    assert "error" in response.get_json()
@@ -0,0 +1,40 @@
+import app
+
+
+def test_prune_fields_keeps_requested_keys_and_their_containers():
+    body = {"MRData": {"series": "f1", "Results": [
+        {"position": 1, "points": 25.0, "Driver": {"driverId": 1, "givenName": "Max"}},
+        {"position": 2, "points": 18.0, "Driver": {"driverId": 2, "givenName": "Sergio"}},
+    ]}}
+
+    assert app.prune_fields(body, {"driverId", "points"}) == {"MRData": {"Results": [
+        {"points": 25.0, "Driver": {"driverId": 1}},
+        {"points": 18.0, "Driver": {"driverId": 2}},
+    ]}}
+    # a requested container keeps everything in it
+    assert app.prune_fields(body, {"Driver"})["MRData"]["Results"][0] == {"Driver": {"driverId": 1, "givenName": "Max"}}
+    assert app.prune_fields(body, {"nothing"}) == {}
+
+
+def test_results_fields(client):
+    body = client.get("/api/f1/2023/1/results.json?fields=position,driverId").get_json()
+    results = body["MRData"]["RaceTable"]["Races"][0]["Results"]
+    assert results[:2] == [
+        {"position": 1, "Driver": {"driverId": 1}},
+        {"position": 2, "Driver": {"driverId": 2}},
+    ]
+
+    full = client.get("/api/f1/2023/1/results.json").get_json()
+    assert full["MRData"]["RaceTable"]["Races"][0]["Results"][0]["status"] == "Finished"
+
+
+def test_results_table_fields_skip_unrequested_columns(client):
+    body = client.get("/api/f1/2023/driverResultsTable.json?fields=driverId,TotalPoints").get_json()
+    drivers = body["MRData"]["StandingsTable"]["DriverResults"]
+    assert drivers[0] == {"Driver": {"driverId": 1}, "TotalPoints": 51.0}
+
+
+def test_error_bodies_are_not_pruned(client):
+    response = client.get("/api/f1/search.json?type=teams&fields=driverId")
+    assert response.status_code == 400
+    assert "error" in response.get_json()
@@ -0,0 +1,116 @@
+import sys
+
+import pytest
+
+import ingest
+
+
+class FakeCursor:
+    """Records statements; SELECTs return whatever `results` holds for their first matching prefix."""
+    def __init__(self, results):
+        self.results = results
+        self.executed = []
+        self._rows = []
+
+    def execute(self, sql, params=()):
+        sql = " ".join(sql.split())
+        self.executed.append((sql, list(params)))
+        self._rows = next((rows for prefix, rows in self.results.items() if sql.startswith(prefix)), [])
+
+    def executemany(self, sql, rows):
+        self.executed.append((" ".join(sql.split()), list(rows)))
+
+    def fetchall(self):
+        return self._rows
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else (1,)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, results=None):
+        self.fake_cursor = FakeCursor(results or {})
+
+    def cursor(self):
+        return self.fake_cursor
+
+    def commit(self):
+        pass
+
+
+def write_csv(directory, name, lines):
+    (directory / name).write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+@pytest.fixture
+def csv_dir(tmp_path):
+    write_csv(tmp_path, "races.csv", ["raceId,year,round", "1,2023,1", "2,2023,2", "10,2022,1"])
+    write_csv(tmp_path, "results.csv", ["resultId,raceId,points", "1,1,25", "2,2,25", "3,10,25", "4,99,25"])
+    return tmp_path
+
+
+def loaded(csv_dir, state, seasons=None):
+    connection = FakeConnection({"SELECT table_name, group_key, season, checksum": state})
+    job = ingest.Ingest(connection, str(csv_dir), seasons=seasons)
+    job.load_state()
+    connection.fake_cursor.executed.clear()
+    return job, connection.fake_cursor
+
+
+def statements(cursor, prefix):
+    return [params for sql, params in cursor.executed if sql.startswith(prefix)]
+
+
+def test_races_gone_from_the_csv_are_deleted(csv_dir):
+    state = [("races", "2023", 2023, "x"), ("races", "2021", 2021, "x"),
+             ("results", "1", 2023, "x"), ("results", "50", 2021, "x")]
+    job, cursor = loaded(csv_dir, state)
+    job.load_races()
+    job.load_race_table("results.csv", "results")
+
+    assert statements(cursor, "DELETE FROM races") == [[2023, 2022, 2021]]
+    # race 99 isn't in races.csv: never loaded; race 50 was, and goes
+    assert statements(cursor, "DELETE FROM `results`") == [["1", "2", "10", "50"]]
+    assert statements(cursor, "DELETE FROM ingest_checksums") == [["races", "2021"], ["results", "50"]]
+    inserted = statements(cursor, "INSERT INTO `results`")[0]
+    assert [row[1] for row in inserted] == ["1", "2", "10"]
+    assert job.touched_seasons == {2021, 2022, 2023}
+
+
+def test_removed_groups_outside_seasons_are_kept(csv_dir):
+    state = [("results", "50", 2021, "x"), ("results", "60", 2022, "x")]
+    job, cursor = loaded(csv_dir, state, seasons={2022})
+    job.load_races()
+    job.load_race_table("results.csv", "results")
+
+    assert statements(cursor, "DELETE FROM ingest_checksums") == [["results", "60"]]
+    assert statements(cursor, "DELETE FROM `results`") == [["10", "60"]]
+
+
+def test_unchanged_groups_are_skipped(csv_dir):
+    _, rows = ingest.read_csv(str(csv_dir / "results.csv"))
+    digest = ingest.checksum([row for row in rows if row[1] == "1"])
+    job, cursor = loaded(csv_dir, [("results", "1", 2023, digest)])
+    job.load_races()
+    job.load_race_table("results.csv", "results")
+
+    assert statements(cursor, "DELETE FROM `results`") == [["2", "10"]]
+
+
+def test_reference_rows_gone_from_the_csv_are_deleted(tmp_path):
+    write_csv(tmp_path, "drivers.csv", ["driverId,driverRef", "1,max_verstappen", "2,perez"])
+    connection = FakeConnection({"SELECT `driverId` FROM `drivers`": [(1,), (2,), (3,)]})
+    job = ingest.Ingest(connection, str(tmp_path))
+    job.load_reference_table("drivers.csv", "drivers")
+
+    assert statements(connection.fake_cursor, "DELETE FROM `drivers`") == [[3]]
+
+
+def test_run_leaves_invalidation_to_the_data_version(csv_dir, monkeypatch):
+    monkeypatch.setitem(sys.modules, "app", None)  # importing app would fail
+    connection = FakeConnection({"SELECT version FROM data_version": [(7,)]})
+
+    assert ingest.Ingest(connection, str(csv_dir)).run() == 7
@@ -0,0 +1,84 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from werkzeug.test import Client
+
+import app
+import loadtest
+
+
+def test_request_log_records_replayable_entries(db_path, tmp_path):
+    log = tmp_path / "requests.log"
+    client = Client(app.RequestLogMiddleware(app.app.wsgi_app, str(log)))
+    client.get("/api/f1/2023/1/results.json?fields=position")
+    client.get("/api/f1/nothing")
+
+    first, second = [json.loads(line) for line in log.read_text().splitlines()]
+    assert first["route"] == "/api/f1/<int:season>/<int:round>/results.json"
+    assert (first["method"], first["path"], first["query"], first["status"]) == (
+        "GET", "/api/f1/2023/1/results.json", "fields=position", 200
+    )
+    assert second["route"] is None and second["status"] == 404
+
+
+def write_log(path, entries):
+    path.write_text("".join(json.dumps(entry) + "\n" for entry in entries) + "\n")
+
+
+def entry(ts, path, method="GET", query=""):
+    return {"ts": ts, "method": method, "path": path, "query": query, "route": path}
+
+
+def test_read_log_filters_and_sorts(tmp_path):
+    log = tmp_path / "requests.log"
+    write_log(log, [entry(3, "/c"), entry(1, "/a", method="POST"), entry(2, "/b"), entry(4, "/d")])
+
+    assert [e["path"] for e in loadtest.read_log(log, include_post=False, limit=None)] == ["/b", "/c", "/d"]
+    assert [e["path"] for e in loadtest.read_log(log, include_post=True, limit=None)] == ["/a", "/b", "/c", "/d"]
+    assert [e["path"] for e in loadtest.read_log(log, include_post=False, limit=2)] == ["/b", "/c"]
+
+
+def test_summarize():
+    results = [("/a", 0.010, 200), ("/a", 0.030, 503), ("/a", 0.020, None), ("/a", 0.040, 404), ("/b", 0.5, 200)]
+    report = loadtest.summarize(results, wall_seconds=2.0)
+
+    assert report["/a"]["requests"] == 4
+    assert report["/a"]["throughput_rps"] == 2.0
+    assert report["/a"]["error_rate"] == 0.5  # the 503 and the connection failure
+    assert report["/a"]["shed_503"] == 1
+    assert report["/a"]["client_errors_4xx"] == 1
+    assert report["/b"]["p50_ms"] == report["/b"]["p99_ms"] == 500.0
+
+
+@pytest.fixture
+def stub_target():
+    seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            seen.append(self.path)
+            self.send_response(503 if self.path.startswith("/busy") else 200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", seen
+    server.shutdown()
+    server.server_close()
+
+
+def test_replay_keeps_the_recorded_pacing(stub_target):
+    target, seen = stub_target
+    entries = [entry(100.0, "/a", query="x=1"), entry(100.5, "/busy"), entry(101.0, "/a")]
+    results, wall_seconds = loadtest.replay(entries, target, speedup=10, concurrency=4, timeout=5)
+
+    assert sorted(seen) == ["/a", "/a?x=1", "/busy"]
+    assert sorted((route, status) for route, _, status in results) == [("/a", 200), ("/a", 200), ("/busy", 503)]
+    assert wall_seconds >= 0.1  # one recorded second at 10x
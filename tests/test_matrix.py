@@ -0,0 +1,34 @@
+def test_all_driver_standings_matrix(client):
+    body = client.get("/api/f1/2023/allDriverStandings.json?format=matrix").get_json()
+
+    assert body["format"] == "matrix"
+    assert body["rounds"] == [1, 2]
+    assert [d["driverId"] for d in body["drivers"]] == [1, 2, 3, 4]  # final-table order
+    assert body["drivers"][1] == {"driverId": 2, "givenName": "Sergio", "familyName": "Pérez"}
+    assert body["points"] == [[25.0, 18.0, 15.0, 0.0], [51.0, 50.0, 33.0, 20.0]]
+
+
+def test_all_constructor_standings_matrix(client):
+    body = client.get("/api/f1/2023/allConstructorStandings.json?format=matrix").get_json()
+
+    assert body["rounds"] == [1, 2]
+    assert body["constructors"] == [
+        {"constructorId": 9, "constructorName": "Red Bull"},
+        {"constructorId": 131, "constructorName": "Mercedes"},
+    ]
+    assert body["points"] == [[43.0, 15.0], [101.0, 53.0]]
+
+
+def test_matrix_matches_per_round_lists(client):
+    matrix = client.get("/api/f1/2023/allDriverStandings.json?format=matrix").get_json()
+    lists = client.get("/api/f1/2023/allDriverStandings.json").get_json()["standings"]
+
+    ids = [d["driverId"] for d in matrix["drivers"]]
+    for i, round_num in enumerate(matrix["rounds"]):
+        by_driver = {entry["driverId"]: entry["points"] for entry in lists[str(round_num)]}
+        assert [by_driver[d_id] for d_id in ids] == matrix["points"][i]
+
+
+def test_matrix_of_a_season_without_standings(client):
+    body = client.get("/api/f1/1949/allDriverStandings.json?format=matrix").get_json()
+    assert body["rounds"] == [] and body["drivers"] == [] and body["points"] == []
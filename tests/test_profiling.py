@@ -0,0 +1,70 @@
+import itertools
+import os
+
+import pytest
+
+import app
+
+TOKEN = "s3cret"
+
+
+@pytest.fixture
+def profiling(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "PROFILE_TOKEN", TOKEN)
+    monkeypatch.setattr(app, "PROFILE_DIR", str(tmp_path / "profiles"))
+    monkeypatch.setattr(app.app, "wsgi_app", app.ProfilingMiddleware(app.app.wsgi_app))
+    return tmp_path / "profiles"
+
+
+def test_sample_rate_needs_a_token():
+    with pytest.raises(ValueError, match="PROFILE_TOKEN"):
+        app.check_profile_settings(None, 0.01)
+    with pytest.raises(ValueError, match="between 0 and 1"):
+        app.check_profile_settings(TOKEN, 5)
+    assert app.check_profile_settings(TOKEN, 0.01) == 0.01
+    assert app.check_profile_settings(None, 0) == 0
+
+
+def test_profiles_need_the_token(client, monkeypatch):
+    assert client.get("/api/profiles.json").status_code == 404  # profiling off
+    monkeypatch.setattr(app, "PROFILE_TOKEN", TOKEN)
+    assert client.get("/api/profiles.json", headers={"X-F1-Profile": "wrong"}).status_code == 403
+    assert client.get("/api/profiles.json", headers={"X-F1-Profile": TOKEN}).status_code == 200
+
+
+def test_requested_profile_is_saved_with_its_sql(client, profiling):
+    response = client.get("/api/f1/2023/1/results.json", headers={"X-F1-Profile": TOKEN})
+    assert response.status_code == 200
+    response.get_data()  # saved once the body has been sent
+    profile_id = response.headers["X-F1-Profile-Id"]
+    assert os.listdir(profiling) == [f"{profile_id}.json"]
+
+    profile = client.get(f"/api/profiles/{profile_id}.json", headers={"X-F1-Profile": TOKEN}).get_json()
+    assert (profile["trigger"], profile["path"], profile["status"]) == ("requested", "/api/f1/2023/1/results.json", 200)
+    assert profile["sql"] and all(q["durationMs"] is not None for q in profile["sql"])
+
+    listed = client.get("/api/profiles.json", headers={"X-F1-Profile": TOKEN}).get_json()["profiles"]
+    assert [p["id"] for p in listed] == [profile_id]
+
+    assert "X-F1-Profile-Id" not in client.get("/api/f1/seasons.json").headers  # no token, no profile
+
+
+class SavedProfile:
+    def __init__(self, n):
+        self.id = f"{1_000_000 + n}-ab"
+        self.trigger = "sampled"
+
+    def to_dict(self, status):
+        return {"id": self.id}
+
+
+def test_profiles_are_pruned_every_few_saves(profiling, monkeypatch):
+    monkeypatch.setattr(app, "PROFILE_KEEP", 3)
+    monkeypatch.setattr(app, "PROFILE_PRUNE_EVERY", 2)
+    monkeypatch.setattr(app, "_profiles_saved", itertools.count(1))
+
+    for n in range(1, 6):
+        app.save_profile(SavedProfile(n), 200)
+
+    # pruned to 3 after the 4th save; the 5th is kept until the next prune
+    assert sorted(os.listdir(profiling)) == [f"{1_000_000 + n}-ab.json" for n in (2, 3, 4, 5)]
@@ -0,0 +1,47 @@
+import pytest
+
+import app
+from test_response_cache import FakeRedis
+
+
+@pytest.fixture
+def scenario(client):
+    scenario_id = client.post("/api/f1/whatif/newScenario",
+                              json={"scenarioName": "test", "season": 2023}).get_json()["scenarioId"]
+    client.post(f"/api/f1/whatif/scenario/{scenario_id}/updateRaceResults", json={
+        "raceId": 1, "results": [{"driverId": 4, "position": 1, "points": 25}],
+    })
+    return scenario_id
+
+
+def test_driver_progression(client, scenario):
+    body = client.get(f"/api/f1/whatif/scenario/{scenario}/driverProgression").get_json()
+
+    assert body["format"] == "matrix" and body["rounds"] == [1, 2]
+    assert [d["driverId"] for d in body["drivers"]] == [4, 2, 1, 3]
+    assert body["points"] == [[25.0, 0.0, 0.0, 0.0], [45.0, 32.0, 26.0, 18.0]]
+    assert body["positions"] == [[1, 0, 0, 0], [1, 2, 3, 4]]
+
+
+def test_constructor_progression(client, scenario):
+    body = client.get(f"/api/f1/whatif/scenario/{scenario}/constructorProgression").get_json()
+    assert body["constructors"] == [
+        {"constructorId": 131, "constructorName": "Mercedes"},
+        {"constructorId": 9, "constructorName": "Red Bull"},
+    ]
+    assert body["points"][-1] == [63.0, 58.0]
+    assert client.get("/api/f1/whatif/scenario/999/constructorProgression").status_code == 404
+
+
+def test_progression_follows_edits_through_the_response_cache(client, scenario, monkeypatch):
+    monkeypatch.setattr(app, "response_cache", app.RedisCacheBackend(client=FakeRedis()))
+    url = f"/api/f1/whatif/scenario/{scenario}/driverProgression"
+    assert client.get(url).headers["X-Cache"] == "MISS"
+    assert client.get(url).headers["X-Cache"] == "HIT"
+
+    client.post(f"/api/f1/whatif/scenario/{scenario}/updateRaceResults", json={
+        "raceId": 1, "results": [{"driverId": 3, "position": 1, "points": 25}],
+    })
+    response = client.get(url)
+    assert response.headers["X-Cache"] == "MISS"
+    assert response.get_json()["drivers"][0]["driverId"] == 3
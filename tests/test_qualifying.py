@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+import app
+import ingest
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1:29.708", 89708),
+    ("59.123", 59123),
+    (" 1:30.000 ", 90000),
+    ("", None),
+    (None, None),
+    ("\\N", None),
+    ("DNF", None),
+])
+def test_lap_ms(text, expected):
+    assert ingest.lap_ms(text) == expected
+
+
+def test_qualifying_ms_best_of_set_times():
+    assert ingest.qualifying_ms("1:31.295", "1:30.503", "1:29.708") == [91295, 90503, 89708, 89708]
+    assert ingest.qualifying_ms("1:31.600", None, "") == [91600, None, None, 91600]
+    assert ingest.qualifying_ms(None, None, None) == [None, None, None, None]
+
+
+def qualifying_row(constructor_id, q1, q2=None, q3=None):
+    return {"constructorId": constructor_id, "q1_ms": q1, "q2_ms": q2, "q3_ms": q3}
+
+
+def test_qualifying_gaps():
+    rows = [
+        qualifying_row(9, 91295, 90503, 89708),
+        qualifying_row(9, 91479, 90746, 89846),
+        qualifying_row(131, 91500, 91000),
+        qualifying_row(131, 91600),
+    ]
+    gaps = app.qualifying_gaps(rows)
+
+    ms, to_pole, to_cutoff, to_teammate = gaps["q1"]
+    assert list(to_pole) == [0, 184, 205, 305]
+    assert list(to_cutoff) == [-205, -21, 0, 100]  # cutoff: slowest car into Q2
+    assert list(to_teammate) == [-184, 184, -100, 100]
+
+    ms, to_pole, to_cutoff, to_teammate = gaps["q2"]
+    assert np.isnan(to_pole[3]) and np.isnan(to_teammate[2])  # no team-mate time to compare
+    assert list(to_cutoff[:2]) == [-243, 0]
+
+    ms, to_pole, to_cutoff, to_teammate = gaps["q3"]
+    assert list(to_pole[:2]) == [0, 138]
+    assert np.isnan(to_cutoff).all()  # nothing after Q3
+
+
+def qualifying_results(client, query=""):
+    body = client.get(f"/api/f1/2023/1/qualifying.json{query}").get_json()
+    return body["MRData"]["QualifyingTable"]["Races"][0]["QualifyingResults"]
+
+
+def test_qualifying_route_with_gaps(client):
+    results = qualifying_results(client, "?mode=gaps")
+
+    assert [r["bestMs"] for r in results] == [89708, 89846, 91000, 91600]
+    assert results[0]["gaps"]["q1"] == {"ms": 91295, "toPole": 0, "toCutoff": -205, "toTeammate": -184}
+    assert results[2]["gaps"]["q2"] == {"ms": 91000, "toPole": 497, "toCutoff": 254, "toTeammate": None}
+    assert results[3]["gaps"]["q3"] == {"ms": None, "toPole": None, "toCutoff": None, "toTeammate": None}
+
+
+def test_qualifying_route_without_gaps_is_unchanged(client):
+    results = qualifying_results(client)
+    assert results[0]["q1"] == "1:31.295"
+    assert "gaps" not in results[0] and "bestMs" not in results[0]
@@ -0,0 +1,40 @@
+def standings(client, query):
+    response = client.get(f"/api/f1/rescore.json?{query}")
+    assert response.status_code == 200
+    season, = response.get_json()["MRData"]["StandingsTable"]["StandingsLists"]
+    return season
+
+
+def points(table, key):
+    return {row[key][f"{key.lower()}Id"]: row["points"] for row in table}
+
+
+def test_rescore_under_an_older_system(client):
+    season = standings(client, "season=2023&system=1991")
+
+    assert points(season["DriverStandings"], "Driver") == {1: 16.0, 2: 16.0, 3: 7.0, 4: 4.0}
+    assert points(season["ConstructorStandings"], "Constructor") == {9: 32.0, 131: 11.0}
+    assert [row["position"] for row in season["DriverStandings"]] == ["1", "2", "3", "4"]
+
+
+def test_rescore_with_sprints_and_fastest_laps(client):
+    season = standings(client, "season=2023&system=2022")
+
+    drivers = season["DriverStandings"]
+    assert [row["Driver"]["driverId"] for row in drivers] == [1, 2, 3, 4]
+    assert points(drivers, "Driver") == {1: 53.0, 2: 50.0, 3: 33.0, 4: 20.0}
+
+
+def test_rescore_with_a_custom_table_over_several_seasons(client):
+    response = client.get("/api/f1/rescore.json?startYear=2022&endYear=2023&race=3,2,1&sprint=")
+    seasons = response.get_json()["MRData"]["StandingsTable"]["StandingsLists"]
+
+    assert [s["season"] for s in seasons] == ["2022", "2023"]
+    assert points(seasons[0]["DriverStandings"], "Driver") == {1: 3.0, 3: 2.0}
+    assert points(seasons[1]["DriverStandings"], "Driver") == {1: 5.0, 2: 5.0, 3: 1.0, 4: 1.0}
+
+
+def test_rescore_rejects_bad_arguments(client):
+    assert client.get("/api/f1/rescore.json?season=2023&system=1900").status_code == 400
+    assert client.get("/api/f1/rescore.json?season=2023&race=25,x").status_code == 400
+    assert client.get("/api/f1/rescore.json").status_code == 400
@@ -0,0 +1,107 @@
+import pytest
+
+import app
+
+
+class FakeRedis:
+    """The redis-py calls RedisCacheBackend makes, over a dict."""
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        value = self.data.get(key)
+        return str(value).encode() if isinstance(value, int) else value
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def incr(self, key):
+        self.data[key] = int(self.data.get(key) or 0) + 1
+        return self.data[key]
+
+
+@pytest.fixture
+def redis_cache(monkeypatch):
+    cache = app.RedisCacheBackend(client=FakeRedis())
+    monkeypatch.setattr(app, "response_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def scenario(client, redis_cache):
+    return client.post("/api/f1/whatif/newScenario",
+                       json={"scenarioName": "test", "season": 2023}).get_json()["scenarioId"]
+
+
+def test_redis_cache_backend_with_stand_in_client():
+    cache = app.RedisCacheBackend(client=FakeRedis())
+    cache.set("k", b"v", 60)
+    assert cache.get("k") == b"v"
+    assert cache.get_version() == 0
+    assert cache.bump_version() == 1 and cache.get_version() == 1
+    assert cache.claim("warm", 60) is True
+    assert cache.claim("warm", 60) is False
+
+
+def test_counters_never_restart_after_eviction():
+    client = FakeRedis()
+    cache = app.RedisCacheBackend(client=client)
+    first = cache.get_counter("c")
+    assert cache.incr_counter("c") == first + 1
+
+    client.data.clear()
+    assert cache.get_counter("c") > first + 1
+
+
+def test_whatif_hit_needs_no_database(client, scenario, monkeypatch):
+    url = f"/api/f1/whatif/scenario/{scenario}/driverStandings"
+    assert client.get(url).headers["X-Cache"] == "MISS"
+
+    opened = []
+    connect = app.get_mysql_connection
+    monkeypatch.setattr(app, "get_mysql_connection", lambda: opened.append(1) or connect())
+    assert client.get(url).headers["X-Cache"] == "HIT"
+    assert opened == []
+
+
+def test_whatif_edit_changes_the_key_of_the_scenario_and_its_clones(client, scenario):
+    clone = client.post(f"/api/f1/whatif/scenario/{scenario}/clone").get_json()["scenarioId"]
+    urls = [f"/api/f1/whatif/scenario/{s_id}/driverStandings" for s_id in (scenario, clone)]
+    before = [client.get(url).get_json() for url in urls]
+
+    client.post(f"/api/f1/whatif/scenario/{scenario}/updateRaceResults", json={
+        "raceId": 1, "results": [{"driverId": 4, "position": 1, "points": 100}],
+    })
+    for url, old in zip(urls, before):
+        response = client.get(url)
+        assert response.headers["X-Cache"] == "MISS"
+        assert response.get_json() != old
+        assert response.get_json()["driverStandings"][0]["driverId"] == 4
+
+
+def test_whatif_is_not_cached_on_a_per_worker_backend(client, monkeypatch):
+    monkeypatch.setattr(app, "response_cache", app.LRUCacheBackend(1 << 20))
+    scenario = client.post("/api/f1/whatif/newScenario",
+                           json={"scenarioName": "test", "season": 2023}).get_json()["scenarioId"]
+    url = f"/api/f1/whatif/scenario/{scenario}/driverStandings"
+    assert "X-Cache" not in client.get(url).headers
+    assert client.get("/api/f1/seasons.json").headers["X-Cache"] == "MISS"
+    assert client.get("/api/f1/seasons.json").headers["X-Cache"] == "HIT"
+
+
+def test_warming_starts_on_a_workers_first_request_even_a_cache_hit(client, monkeypatch):
+    assert app.app.before_request_funcs[None][0] is app.warm_cache_on_start
+
+    monkeypatch.setattr(app, "response_cache", app.LRUCacheBackend(1 << 20))
+    assert client.get("/api/f1/seasons.json").headers["X-Cache"] == "MISS"
+
+    started = []
+    monkeypatch.setattr(app, "start_cache_warming", lambda: started.append("cache"))
+    monkeypatch.setattr(app, "start_search_index_build", lambda: started.append("search"))
+    monkeypatch.setitem(app._warm_on_start, "pending", True)
+    assert client.get("/api/f1/seasons.json").headers["X-Cache"] == "HIT"
+    client.get("/api/f1/seasons.json")
+    assert started == ["search", "cache"]
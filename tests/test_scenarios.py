@@ -0,0 +1,54 @@
+import pytest
+
+
+@pytest.fixture
+def scenarios(client):
+    """A (overrides race 1) <- B (overrides race 2) <- C (overrides race 1 again)."""
+    def override(scenario_id, race_id, driver_id, points):
+        response = client.post(f"/api/f1/whatif/scenario/{scenario_id}/updateRaceResults", json={
+            "raceId": race_id, "results": [{"driverId": driver_id, "position": 1, "points": points}],
+        })
+        assert response.status_code == 200
+
+    a = client.post("/api/f1/whatif/newScenario", json={"scenarioName": "A", "season": 2023}).get_json()["scenarioId"]
+    override(a, 1, 4, 100)
+    b = client.post(f"/api/f1/whatif/scenario/{a}/clone", json={"scenarioName": "B"}).get_json()["scenarioId"]
+    override(b, 2, 3, 100)
+    c = client.post(f"/api/f1/whatif/scenario/{b}/clone").get_json()["scenarioId"]
+    override(c, 1, 2, 50)
+    return a, b, c
+
+
+def driver_points(client, scenario_id):
+    body = client.get(f"/api/f1/whatif/scenario/{scenario_id}/driverStandings").get_json()
+    return {row["driverId"]: row["points"] for row in body["driverStandings"]}
+
+
+def test_clone_records_its_parent(client, scenarios):
+    a, b, c = scenarios
+    info = client.get(f"/api/f1/whatif/scenario/{c}").get_json()
+    assert info["parent_scenario_id"] == b
+    assert info["scenario_name"] == "B (copy)"
+    assert info["season"] == 2023
+    assert info["overriddenRaces"] == [1, 2]
+    assert client.get(f"/api/f1/whatif/scenario/{a}").get_json()["overriddenRaces"] == [1]
+
+
+def test_nearest_override_wins(client, scenarios):
+    a, b, c = scenarios
+    assert driver_points(client, a) == {4: 120.0, 2: 32.0, 1: 26.0, 3: 18.0}
+    assert driver_points(client, b) == {4: 100.0, 3: 100.0}
+    assert driver_points(client, c) == {3: 100.0, 2: 50.0}
+
+
+def test_clones_see_later_edits_to_their_parent(client, scenarios):
+    a, b, c = scenarios
+    client.post(f"/api/f1/whatif/scenario/{a}/updateRaceResults", json={
+        "raceId": 1, "results": [{"driverId": 1, "position": 1, "points": 7}],
+    })
+    assert driver_points(client, b) == {3: 100.0, 1: 7.0}
+    assert driver_points(client, c) == {3: 100.0, 2: 50.0}  # overrides race 1 itself
+
+
+def test_clone_of_a_missing_scenario(client):
+    assert client.post("/api/f1/whatif/scenario/999/clone").status_code == 404
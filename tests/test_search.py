@@ -0,0 +1,37 @@
+import pytest
+
+import app
+
+
+@pytest.fixture
+def search(client, monkeypatch):
+    monkeypatch.setitem(app._search_index, "index", None)  # built from this test's database
+    return lambda query: client.get(f"/api/f1/search.json?{query}")
+
+
+def test_name_search_index_ranks_exact_before_prefix():
+    index = app.NameSearchIndex([
+        {"type": "driver", "idKey": "driverId", "id": 1, "ref": "max_verstappen", "name": "Max Verstappen"},
+        {"type": "driver", "idKey": "driverId", "id": 2, "ref": "jos_verstappen", "name": "Jos Verstappen"},
+        {"type": "driver", "idKey": "driverId", "id": 3, "ref": "perez", "name": "Sergio Pérez"},
+        {"type": "constructor", "idKey": "constructorId", "id": 9, "ref": "red_bull", "name": "Red Bull"},
+    ])
+
+    assert [hit["driverId"] for hit in index.search("verst", {"driver"}, 10)] == [2, 1]
+    assert index.search("max verstappen", {"driver"}, 10)[0]["score"] == 0
+    assert index.search("perez", {"driver"}, 10)[0]["driverId"] == 3
+    assert index.search("red", {"driver"}, 10) == []
+    assert index.search("verst", {"driver"}, 1) == [index.search("verst", {"driver"}, 10)[0]]
+
+
+def test_search_folds_accents(search):
+    hits = search("q=raikkonen").get_json()["MRData"]["SearchResults"]
+    assert [hit["driverId"] for hit in hits] == [5]
+    assert search("q=PÉREZ&type=drivers").get_json()["MRData"]["SearchResults"][0]["driverId"] == 2
+
+
+def test_search_by_type(search):
+    hits = search("q=red&type=constructors").get_json()["MRData"]["SearchResults"]
+    assert [hit["constructorId"] for hit in hits] == [9]
+    assert search("q=red&type=drivers").get_json()["MRData"]["SearchResults"] == []
+    assert search("q=red&type=teams").status_code == 400
@@ -0,0 +1,43 @@
+import pytest
+
+import app
+import ingest
+from conftest import WritableConnection
+
+
+@pytest.fixture
+def with_season_stats(db_path):
+    connection = WritableConnection(db_path)
+    ingest.refresh_season_stats(connection)
+    connection.close()
+
+
+def comparisons(client, route, param, ids):
+    return {
+        metric: client.get(f"/api/f1/{route}?{param}={ids}&startYear=2022&endYear=2023&metric={metric}").get_json()
+        for metric in sorted(app.SEASON_STAT_METRICS)
+    }
+
+
+@pytest.mark.parametrize("route, param, ids", [
+    ("multiYearDriverComparison", "drivers", "1,hamilton,russell,5"),
+    ("multiYearConstructorComparison", "teams", "red_bull,131"),
+])
+def test_season_stats_match_the_per_year_queries(client, db_path, route, param, ids):
+    per_year = comparisons(client, route, param, ids)
+
+    connection = WritableConnection(db_path)
+    ingest.refresh_season_stats(connection)
+    connection.close()
+    from_stats = comparisons(client, route, param, ids)
+
+    assert from_stats == per_year
+
+
+def test_season_stats_values(client, with_season_stats, monkeypatch):
+    monkeypatch.setattr(app, "per_year_comparison", None)  # the summary tables answer on their own
+    body = client.get("/api/f1/multiYearDriverComparison?drivers=max_verstappen,4&startYear=2023&endYear=2023"
+                      "&metric=wins").get_json()
+    results = body["MRData"]["MultiYearDriverComparison"]
+    assert results["max_verstappen"]["totalPoints"] == 1
+    assert results["4"]["yearlyPoints"] == [{"year": 2023, "points": 0}]
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+import app
+
+
+def test_finish_cdf_inactive_drivers_always_dnf():
+    cdf = app.finish_cdf([1, 2], [(1, 1), (2, 2), (2, "R")], active=np.array([True, False]))
+    assert cdf.shape == (2, 3)
+    assert (cdf[:, -1] == 1.0).all()
+    assert list(cdf[1]) == [0.0, 0.0, 1.0]
+
+
+def test_simulate_championships_certain_winner():
+    # driver 0 always wins, driver 1 always second
+    cdf = np.array([[1.0, 1.0, 1.0], [0.0, 1.0, 1.0]])
+    titles, mean_points = app.simulate_championships(
+        [0, 0], cdf, np.array([25, 18]), races_left=3, simulations=1000,
+        rng=np.random.default_rng(7), chunk_size=300
+    )
+    assert list(titles) == [1000, 0]
+    assert list(mean_points) == [75, 54]
+
+
+@pytest.fixture
+def scenario(client):
+    return client.post("/api/f1/whatif/newScenario",
+                       json={"scenarioName": "test", "season": 2023}).get_json()["scenarioId"]
+
+
+def test_simulate_route(client, scenario):
+    url = f"/api/f1/whatif/scenario/{scenario}/simulate?simulations=2000&seed=7"
+    body = client.get(url).get_json()
+
+    assert (body["afterRound"], body["remainingRaces"], body["simulations"]) == (2, 1, 2000)
+    odds = {d["driverId"]: d for d in body["drivers"]}
+    assert odds[1]["currentPoints"] == 51.0
+    assert odds[4]["titleProbability"] == 0  # 31 behind with one race left
+    assert sum(d["titleProbability"] for d in body["drivers"]) == pytest.approx(1)
+    assert body["drivers"][0]["driverId"] == 1
+    assert client.get(url).get_json() == body  # same seed, same draws
+
+
+def test_simulate_after_the_last_race(client, scenario):
+    body = client.get(f"/api/f1/whatif/scenario/{scenario}/simulate?afterRound=3").get_json()
+    assert body["remainingRaces"] == 0
+    assert body["drivers"][0] == {"driverId": 1, "driverName": "Max Verstappen", "currentPoints": 51.0,
+                                  "titleProbability": 1.0, "expectedPoints": 51.0}
+
+
+def test_simulate_rejects_bad_arguments(client, scenario):
+    assert client.get(f"/api/f1/whatif/scenario/{scenario}/simulate?seed=x").status_code == 400
+    assert client.get(f"/api/f1/whatif/scenario/{scenario}/simulate?simulations=0").status_code == 400
+    assert client.get("/api/f1/whatif/scenario/999/simulate").status_code == 404
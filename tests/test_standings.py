@@ -0,0 +1,92 @@
+import app
+
+
+def test_compute_standings_countback_breaks_points_ties():
+    # 1 and 2 tie on points and on wins; 2 has a second place, 1 only a third
+    rounds, entities, points, ranks, wins = app.compute_standings(
+        [1, 1, 1, 2, 2, 2],
+        [1, 2, 3, 2, 3, 1],
+        [25, 18, 15, 25, 18, 18],
+        [1, 2, 3, 1, 2, 3],
+    )
+    assert list(rounds) == [1, 2]
+    assert list(entities) == [2, 1, 3]
+    assert list(points[-1]) == [43, 43, 33]
+    assert list(ranks[-1]) == [1, 2, 3]
+    assert list(wins[-1]) == [1, 1, 0]
+
+
+def test_compute_standings_ranks_zero_before_first_entry():
+    rounds, entities, points, ranks, wins = app.compute_standings(
+        [1, 2, 2], [1, 1, 2], [25, 25, 18], [1, 1, 2]
+    )
+    assert list(entities) == [1, 2]
+    assert list(ranks[0]) == [1, 0]
+    assert list(ranks[1]) == [1, 2]
+
+
+def test_compute_standings_empty():
+    rounds, entities, points, ranks, wins = app.compute_standings([], [], [], [])
+    assert len(rounds) == 0 and ranks.shape == (0, 0)
+
+
+def test_driver_standings_shape(client):
+    standings = client.get("/api/f1/2023/2/driverStandings.json").get_json()
+    rows = standings["MRData"]["StandingsTable"]["StandingsLists"][0]["DriverStandings"]
+    assert rows[:2] == [
+        {"Driver": {"driverId": 1, "givenName": "Max", "familyName": "Verstappen"}, "points": 51.0},
+        {"Driver": {"driverId": 2, "givenName": "Sergio", "familyName": "Pérez"}, "points": 50.0},
+    ]
+
+
+def test_constructor_standings_shape(client):
+    standings = client.get("/api/f1/2023/1/constructorStandings.json").get_json()
+    rows = standings["MRData"]["StandingsTable"]["StandingsLists"][0]["ConstructorStandings"]
+    assert rows == [
+        {"Constructor": {"constructorId": 9, "name": "Red Bull"}, "points": 43.0},
+        {"Constructor": {"constructorId": 131, "name": "Mercedes"}, "points": 15.0},
+    ]
+
+
+def test_all_standings_shape(client):
+    drivers = client.get("/api/f1/2023/allDriverStandings.json").get_json()["standings"]
+    assert list(drivers) == ["1", "2"]
+    assert drivers["2"][0] == {"driverId": 1, "givenName": "Max", "familyName": "Verstappen", "points": 51.0}
+
+    constructors = client.get("/api/f1/2023/allConstructorStandings.json").get_json()["standings"]
+    assert constructors["2"] == [
+        {"constructorId": 9, "constructorName": "Red Bull", "points": 101.0},
+        {"constructorId": 131, "constructorName": "Mercedes", "points": 53.0},
+    ]
+
+
+def test_results_table_uses_the_official_totals(client):
+    table = client.get("/api/f1/2023/driverResultsTable.json").get_json()["MRData"]["StandingsTable"]
+    assert [(row["Driver"]["driverId"], row["TotalPoints"]) for row in table["DriverResults"]] == [
+        (1, 51.0), (2, 50.0), (3, 33.0), (4, 20.0)
+    ]
+
+
+def test_whatif_standings_break_ties_by_countback(client):
+    scenario = client.post("/api/f1/whatif/newScenario",
+                           json={"scenarioName": "test", "season": 2023}).get_json()["scenarioId"]
+    client.post(f"/api/f1/whatif/scenario/{scenario}/updateRaceResults", json={"raceId": 2, "results": [
+        {"driverId": 3, "position": 1, "points": 25},
+        {"driverId": 2, "position": 2, "points": 18},
+        {"driverId": 4, "position": 3, "points": 15},
+        {"driverId": 1, "position": 4, "points": 15},
+    ]})
+
+    drivers = client.get(f"/api/f1/whatif/scenario/{scenario}/driverStandings").get_json()["driverStandings"]
+    # Hamilton and Verstappen both have 40 points and a win; Hamilton also has a third place
+    assert drivers == [
+        {"driverId": 3, "driverName": "Lewis Hamilton", "points": 40.0},
+        {"driverId": 1, "driverName": "Max Verstappen", "points": 40.0},
+        {"driverId": 2, "driverName": "Sergio Pérez", "points": 36.0},
+        {"driverId": 4, "driverName": "George Russell", "points": 15.0},
+    ]
+    constructors = client.get(f"/api/f1/whatif/scenario/{scenario}/constructorStandings").get_json()
+    assert constructors["constructorStandings"] == [
+        {"constructorId": 9, "constructorName": "Red Bull", "points": 76.0},
+        {"constructorId": 131, "constructorName": "Mercedes", "points": 55.0},
+    ]
@@ -0,0 +1,41 @@
+def weekend(client, season, round_num):
+    return client.get(f"/api/f1/{season}/{round_num}/weekend.json").get_json()["MRData"]["Weekend"]
+
+
+def test_sprint_weekend(client):
+    body = weekend(client, 2023, 2)
+
+    assert (body["raceId"], body["raceName"], body["date"]) == (2, "Saudi Arabian Grand Prix", "2023-03-19")
+    assert body["Circuit"] == {"circuitName": "Jeddah Corniche Circuit"}
+    assert body["Qualifying"] == []
+    assert [r["driverId"] for r in body["Sprint"]] == [1, 2, 3, 4]
+    assert body["Race"][1] == {"driverId": 1, "constructorId": 9, "grid": 15, "position": 2,
+                               "points": 18.0, "status": "Finished"}
+    assert body["StartFinish"][1] == {"driverId": 1, "startPosition": 15, "finishPosition": 2,
+                                      "positionChange": 13}
+
+
+def test_drivers_and_constructors_appear_once(client):
+    body = weekend(client, 2023, 1)
+
+    assert sorted(body["Drivers"]) == ["1", "2", "3", "4"]
+    assert body["Drivers"]["2"] == {"driverId": 2, "givenName": "Sergio", "familyName": "Pérez", "code": "PER"}
+    assert body["Constructors"] == {"9": {"constructorId": 9, "name": "Red Bull"},
+                                    "131": {"constructorId": 131, "name": "Mercedes"}}
+    assert body["Qualifying"][0] == {"driverId": 1, "constructorId": 9, "position": 1,
+                                     "q1": "1:31.295", "q2": "1:30.503", "q3": "1:29.708"}
+    assert body["Qualifying"][3]["q2"] == "N/A"
+    assert body["Sprint"] == []
+
+
+def test_start_finish_leaves_out_unclassified_drivers(client):
+    body = weekend(client, 2023, 1)
+
+    assert body["Race"][3]["status"] == "Retired"
+    assert [row["driverId"] for row in body["StartFinish"]] == [1, 2, 3]
+
+
+def test_unknown_round_is_a_404(client):
+    response = client.get("/api/f1/2023/9/weekend.json")
+    assert response.status_code == 404
+    assert response.get_json() == {"error": "No such race"}